@@ -2,6 +2,7 @@
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+from urllib.parse import parse_qsl, unquote, urlparse
 from django.utils.translation import gettext_lazy as _
 
 load_dotenv()
@@ -9,11 +10,33 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-SECRET_KEY = 'django-insecure-*iq*@(q!x(8078)y-&1e2+(s=-o&y+^(*k4*82l8r^9xcjl3qi'
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
 
-DEBUG = True
+
+# Deployment profile: 'development' (default) or 'production'. The production
+# profile turns off DEBUG and turns on the performance settings below; each
+# of them can still be overridden individually through its own variable.
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development').lower()
+PRODUCTION = DJANGO_ENV == 'production'
+
+# Worker processes serving the app (gunicorn.conf.py exports its worker count).
+# More than one process needs a shared cache: see CACHES below.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY') or 1)
+MULTI_PROCESS = PRODUCTION or WEB_CONCURRENCY > 1
+
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY',
+    'django-insecure-*iq*@(q!x(8078)y-&1e2+(s=-o&y+^(*k4*82l8r^9xcjl3qi',
+)
+
+DEBUG = env_bool('DEBUG', default=not PRODUCTION)
 
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'sokohub-8yi7.onrender.com']
+ALLOWED_HOSTS += [h.strip() for h in os.environ.get('ALLOWED_HOSTS', '').split(',') if h.strip()]
 
 
 # Application definition
@@ -36,15 +59,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "core.middleware.AsyncWhiteNoiseMiddleware",
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.locale.LocaleMiddleware',
+    'core.middleware.SignedCookieLocaleMiddleware',
 ]
 
 ROOT_URLCONF = 'SokoHub.urls'
@@ -58,9 +82,9 @@ ROOT_URLCONF = 'SokoHub.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.perf.DjangoTemplates',  # Django's backend, timed for Server-Timing
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
+        'APP_DIRS': not PRODUCTION,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
@@ -75,18 +99,105 @@ TEMPLATES = [
     },
 ]
 
+if PRODUCTION:
+    # Compile each template once per process
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'SokoHub.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Seconds a connection is kept open between requests (0 closes it after each
+# request). Health checks discard connections the server has dropped.
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600 if PRODUCTION else 0))
+
+
+def database_from_url(url):
+    """Build a DATABASES entry from a postgres:// DATABASE_URL."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('postgres', 'postgresql'):
+        raise ValueError(f'Unsupported DATABASE_URL scheme: {parsed.scheme}')
+    options = dict(parse_qsl(parsed.query))
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': unquote(parsed.path.lstrip('/')),
+        'USER': unquote(parsed.username or ''),
+        'PASSWORD': unquote(parsed.password or ''),
+        'HOST': parsed.hostname or '',
+        'PORT': str(parsed.port or ''),
+        'OPTIONS': options,
+        'CONN_HEALTH_CHECKS': True,
     }
-}
+    if env_bool('DB_POOL', default=PRODUCTION):
+        # psycopg 3 connection pool; persistent connections must be off with a pool
+        config['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+        config['CONN_MAX_AGE'] = 0
+    else:
+        config['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    return config
+
+
+if os.environ.get('DATABASE_URL'):
+    DATABASES = {'default': database_from_url(os.environ['DATABASE_URL'])}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Wait for locks instead of failing with "database is locked"
+                'timeout': 20,
+                # Take the write lock up front so concurrent writers queue cleanly
+                'transaction_mode': 'IMMEDIATE',
+                # WAL lets readers run alongside the single writer
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA mmap_size=134217728;'
+                ),
+            },
+        }
+    }
+
+
+# Cache: Redis when REDIS_URL is set (shared by all workers, required for
+# cross-process invalidation of core.site_cache snapshots), otherwise a
+# per-process local-memory cache.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.perf.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'sokohub',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.perf.LocMemCache',
+            'LOCATION': 'sokohub',
+            'TIMEOUT': 300,
+        }
+    }
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 
 # Email configuration
@@ -160,6 +271,17 @@ SUPPORTED_CURRENCIES = {
 DEFAULT_CURRENCY = 'RWF'
 CURRENCY_COOKIE_NAME = 'inkingi_currency'
 
+# Seconds the admin dashboard statistics are served from cache before recomputing
+DASHBOARD_STATS_TTL = int(os.environ.get('DASHBOARD_STATS_TTL', 60))
+
+# Completed and cancelled orders older than this many days are moved to the
+# archive tables by `manage.py archive_orders`
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', 180))
+
+# Seconds browsers and proxies may reuse exchange-rate/convert API responses
+# before revalidating them with If-None-Match
+EXCHANGE_RATES_MAX_AGE = int(os.environ.get('EXCHANGE_RATES_MAX_AGE', 300))
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
@@ -201,29 +323,44 @@ if os.environ.get('EMAIL_HOST'):
     EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
     EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
     DEFAULT_FROM_EMAIL = os.environ.get('EMAIL_HOST', 'webmaster@localhost')
-else:
+elif DEBUG:
     # Development: use console backend when debugging
-    if DEBUG:
-        EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
-        DEFAULT_FROM_EMAIL = 'webmaster@localhost'
-
-        # Stripe settings (read from environment). Provide defaults for development.
-        STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY', '')
-        STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY', '')
-        STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
-        STRIPE_CURRENCY = os.environ.get('STRIPE_CURRENCY', 'usd')
-        STRIPE_SUCCESS_URL = os.environ.get('STRIPE_SUCCESS_URL', 'http://localhost:8000/orders/stripe/success/{order_id}/')
-        STRIPE_CANCEL_URL = os.environ.get('STRIPE_CANCEL_URL', 'http://localhost:8000/orders/stripe/cancel/{order_id}/')
-    else:
-        # In production we expect EMAIL_HOST to be set; if not, fall back to SMTP backend
-        EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-
-print(EMAIL_BACKEND)
-print(DEFAULT_FROM_EMAIL)
-print(EMAIL_HOST)
-print(EMAIL_PORT)
-print(EMAIL_HOST_USER)
-print(EMAIL_HOST_PASSWORD)
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+    DEFAULT_FROM_EMAIL = 'webmaster@localhost'
+else:
+    # In production we expect EMAIL_HOST to be set; if not, fall back to SMTP backend
+    EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+# Stripe settings (read from environment). Provide defaults for development.
+STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY', '')
+STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY', '')
+STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
+STRIPE_CURRENCY = os.environ.get('STRIPE_CURRENCY', 'usd')
+STRIPE_SUCCESS_URL = os.environ.get('STRIPE_SUCCESS_URL', 'http://localhost:8000/orders/stripe/success/{order_id}/')
+STRIPE_CANCEL_URL = os.environ.get('STRIPE_CANCEL_URL', 'http://localhost:8000/orders/stripe/cancel/{order_id}/')
+# Alternative Stripe API host (e.g. stripe-mock, or the stub started by scripts/benchmark.py)
+STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE', '')
+
+# Request instrumentation (core.middleware.PerformanceMiddleware): who gets
+# the Server-Timing header ('staff', 'all' or 'off'), share of requests
+# logged to 'core.perf', and the latency above which a request is logged as
+# slow together with its slowest queries
+PERF_SERVER_TIMING = os.environ.get('PERF_SERVER_TIMING', 'staff')
+PERF_LOG_SAMPLE_RATE = float(os.environ.get('PERF_LOG_SAMPLE_RATE', 0.01 if PRODUCTION else 0))
+PERF_SLOW_REQUEST_MS = float(os.environ.get('PERF_SLOW_REQUEST_MS', 1000))
+PERF_SLOW_TOP_QUERIES = int(os.environ.get('PERF_SLOW_TOP_QUERIES', 5))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO' if PRODUCTION else 'WARNING'),
+    },
+}
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 # Add at the bottom:
@@ -0,0 +1,82 @@
+"""
+Aggregate statistics for the company admin dashboard.
+
+Each table is scanned once with conditional aggregates instead of one
+``.count()`` per figure, and the result is cached for a short TTL.
+"""
+import time
+from datetime import datetime, time as dt_time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from core.cache_utils import cached_compute
+from orders.models import ArchivedOrder, DailySalesSummary, Order, VendorStats
+from products.models import Product
+
+DASHBOARD_STATS_CACHE_KEY = 'company_admin:dashboard_stats'
+
+
+def local_day_start(day=None):
+    """Return the aware datetime at midnight (site time zone) of ``day``."""
+    day = day or timezone.localdate()
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def compute_dashboard_stats():
+    """Compute the dashboard figures with one aggregate query per table."""
+    User = get_user_model()
+    start = time.perf_counter()
+
+    users = User.objects.aggregate(
+        total_vendors=Count('id', filter=Q(user_type='vendor')),
+        total_customers=Count('id', filter=Q(user_type='customer')),
+    )
+    products = Product.objects.aggregate(
+        total_products=Count('id'),
+        active_products=Count('id', filter=Q(status=Product.STATUS_ACTIVE)),
+    )
+    # A split cart is counted through its per-vendor sub-orders, not its parent
+    orders = Order.objects.filter(is_split=False).aggregate(
+        total_orders=Count('id'),
+        pending_orders=Count('id', filter=Q(status__in=[Order.STATUS_PENDING, Order.STATUS_AWAITING_CONFIRMATION])),
+        processing_orders=Count('id', filter=Q(status=Order.STATUS_PROCESSING)),
+        completed_orders=Count('id', filter=Q(status__in=[Order.STATUS_DELIVERED, Order.STATUS_COMPLETED])),
+    )
+    # Archived orders are all finished (completed or cancelled)
+    archived = ArchivedOrder.objects.filter(is_split=False).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status=Order.STATUS_COMPLETED)),
+    )
+    orders['total_orders'] += archived['total']
+    orders['completed_orders'] += archived['completed']
+    net = F('gross') - F('refunded_amount')
+    revenue = DailySalesSummary.objects.aggregate(
+        total_revenue=Sum(net),
+        today_revenue=Sum(net, filter=Q(date=timezone.localdate())),
+    )
+
+    top_vendors = [
+        {'id': v['vendor'], 'username': v['vendor__username'], 'total_sales': v['lifetime_sales']}
+        for v in VendorStats.objects.order_by('-lifetime_sales').values(
+            'vendor', 'vendor__username', 'lifetime_sales'
+        )[:5]
+    ]
+
+    stats = {**users, **products, **orders}
+    stats['total_revenue'] = revenue['total_revenue'] or Decimal('0')
+    stats['today_revenue'] = revenue['today_revenue'] or Decimal('0')
+    stats['top_vendors'] = top_vendors
+    stats['computed_at'] = timezone.now()
+    stats['compute_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return stats
+
+
+def get_dashboard_stats():
+    """Return cached dashboard stats, recomputing at most once per TTL."""
+    ttl = getattr(settings, 'DASHBOARD_STATS_TTL', 60)
+    stats, from_cache = cached_compute(DASHBOARD_STATS_CACHE_KEY, compute_dashboard_stats, ttl)
+    return {**stats, 'stats_cached': from_cache}
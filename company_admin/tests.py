@@ -0,0 +1,116 @@
+import csv
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from unittest.mock import patch
+from products.models import Product
+from orders.models import Order, Purchase
+
+User = get_user_model()
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username='staff', password='pass', email='s@example.com', is_staff=True)
+        self.vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        self.product = Product.objects.create(vendor=self.vendor, name='Plank', price=100, stock=10)
+        Order.objects.create(customer=self.customer, total=100, status='processing', delivery_address='', phone='')
+        Purchase.objects.create(customer=self.customer, product=self.product, quantity=1, amount=100)
+        Purchase.objects.create(customer=self.customer, product=self.product, quantity=1, amount=50, refunded=True)
+        self.client.login(username='staff', password='pass')
+
+    def test_dashboard_figures(self):
+        resp = self.client.get(reverse('company_admin:dashboard'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['total_vendors'], 1)
+        self.assertEqual(resp.context['total_customers'], 2)  # staff defaults to customer
+        self.assertEqual(resp.context['processing_orders'], 1)
+        self.assertEqual(resp.context['total_revenue'], 100)
+        self.assertEqual(resp.context['today_revenue'], 100)
+        self.assertEqual(resp.context['top_vendors'][0]['username'], 'vendor1')
+        self.assertFalse(resp.context['stats_cached'])
+
+    def test_second_render_uses_cache(self):
+        self.client.get(reverse('company_admin:dashboard'))
+        Order.objects.create(customer=self.customer, total=10, status='processing', delivery_address='', phone='')
+        resp = self.client.get(reverse('company_admin:dashboard'))
+        self.assertTrue(resp.context['stats_cached'])
+        self.assertEqual(resp.context['processing_orders'], 1)
+
+    def test_vendor_management_reads_vendor_stats(self):
+        other = User.objects.create_user(username='vendor2', password='pass', user_type='vendor', email='v2@example.com')
+        resp = self.client.get(reverse('company_admin:vendor_management'))
+        self.assertEqual(resp.status_code, 200)
+        vendors = list(resp.context['vendors'])
+        self.assertEqual([v.username for v in vendors], ['vendor1', 'vendor2'])
+        self.assertEqual(vendors[0].total_sales, 100)
+        self.assertEqual(vendors[0].product_count, 1)
+        self.assertEqual(vendors[1].product_count, 0)
+
+
+class OrderManagementTests(TestCase):
+    def setUp(self):
+        from datetime import datetime
+        from zoneinfo import ZoneInfo
+        self.staff = User.objects.create_user(username='staff', password='pass', email='s@example.com', is_staff=True)
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        kigali = ZoneInfo('Africa/Kigali')
+        # 23:30 on Jan 1st in Kigali is still Jan 1st locally but 21:30 UTC
+        self.late = Order.objects.create(customer=self.customer, total=10, status='pending', delivery_address='', phone='')
+        self.early = Order.objects.create(customer=self.customer, total=10, status='pending', delivery_address='', phone='')
+        Order.objects.filter(id=self.late.id).update(created_at=datetime(2026, 1, 1, 23, 30, tzinfo=kigali))
+        Order.objects.filter(id=self.early.id).update(created_at=datetime(2026, 1, 2, 0, 30, tzinfo=kigali))
+        self.client.login(username='staff', password='pass')
+
+    def test_date_filter_uses_local_days(self):
+        resp = self.client.get(reverse('company_admin:order_management'), {'date_from': '2026-01-01', 'date_to': '2026-01-01'})
+        self.assertEqual([o.id for o in resp.context['orders']], [self.late.id])
+
+    def test_keyset_pagination(self):
+        from company_admin import views
+        with patch.object(views, 'ORDERS_PER_PAGE', 1):
+            first = self.client.get(reverse('company_admin:order_management')).context['page']
+            self.assertEqual([o.id for o in first], [self.early.id])
+            second = self.client.get(reverse('company_admin:order_management'), {'cursor': first.next_cursor}).context['page']
+        self.assertEqual([o.id for o in second], [self.late.id])
+        self.assertFalse(second.has_next)
+
+    def test_csv_export_streams_filtered_orders(self):
+        resp = self.client.get(reverse('company_admin:order_export'), {'date_from': '2026-01-02'})
+        self.assertEqual(resp['Content-Type'], 'text/csv')
+        lines = b''.join(resp.streaming_content).decode().strip().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f'{self.early.id},2026-01-02 00:30:00,cust1'))
+
+    def test_csv_export_neutralises_formulas(self):
+        User.objects.filter(id=self.customer.id).update(username='=HYPERLINK("http://x")', email='@evil.example')
+        Order.objects.filter(id=self.early.id).update(payment_reference='-2+3', total=-5)
+        resp = self.client.get(reverse('company_admin:order_export'), {'date_from': '2026-01-02'})
+        row = next(csv.reader(b''.join(resp.streaming_content).decode().splitlines()[1:]))
+        self.assertEqual(row[2:4], ["'=HYPERLINK(\"http://x\")", "'@evil.example"])
+        self.assertEqual(row[6], "'-2+3")
+        self.assertEqual(row[-1], '-5.00')
+
+    def test_archived_orders_stay_listed(self):
+        from company_admin import views
+        from orders.archive import archive_batch
+        Order.objects.filter(id=self.late.id).update(status='completed')
+        archive_batch([self.late.id])
+        self.assertFalse(Order.objects.filter(id=self.late.id).exists())
+
+        with patch.object(views, 'ORDERS_PER_PAGE', 1):
+            first = self.client.get(reverse('company_admin:order_management')).context['page']
+            second = self.client.get(reverse('company_admin:order_management'), {'cursor': first.next_cursor}).context['page']
+        self.assertEqual([o.id for o in first], [self.early.id])
+        self.assertEqual([(o.id, o.is_archived) for o in second], [(self.late.id, True)])
+
+        resp = self.client.get(reverse('company_admin:order_export'))
+        lines = b''.join(resp.streaming_content).decode().strip().splitlines()
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], [str(self.early.id), str(self.late.id)])
+
+        resp = self.client.get(reverse('company_admin:order_detail', args=[self.late.id]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotContains(resp, reverse('company_admin:update_order_status', args=[self.late.id]))
@@ -12,6 +12,7 @@ urlpatterns = [
 
     # Order management
     path('orders/', views.order_management, name='order_management'),
+    path('orders/export/', views.order_export, name='order_export'),
     path('orders/<int:order_id>/', views.order_detail_admin, name='order_detail'),
     path('orders/<int:order_id>/update-status/', views.update_order_status, name='update_order_status'),
 
@@ -29,4 +30,5 @@ urlpatterns = [
 
     # Refunds
     path('refund/<int:purchase_id>/', views.refund_purchase, name='refund_purchase'),
+    path('refund/bulk/', views.bulk_refund_purchases, name='bulk_refund_purchases'),
 ]
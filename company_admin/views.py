@@ -4,36 +4,29 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from products.models import Product
-from orders.models import Purchase, PurchaseLog, Order, OrderItem
+from orders.models import Purchase, PurchaseLog, Order, OrderVendor, DailySalesSummary, ArchivedOrder, ArchivedOrderItem
+from orders.refunds import refund_purchases
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum, Count, Avg
-from django.db.models.functions import TruncDate, TruncMonth
+from django.db.models import Sum, Count, Avg, DecimalField, ExpressionWrapper, F
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
 from decimal import Decimal
+from .stats import get_dashboard_stats, local_day_start
+from core.pagination import keyset_paginate, keyset_paginate_merged
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+import csv
+import heapq
 
 
 @staff_member_required
 def dashboard(request):
     User = get_user_model()
 
-    # Get statistics
-    total_vendors = User.objects.filter(user_type='vendor').count()
-    total_customers = User.objects.filter(user_type='customer').count()
-    total_products = Product.objects.count()
-    active_products = Product.objects.filter(status='active').count()
-    total_orders = Order.objects.count()
-    pending_orders = Order.objects.filter(status__in=['pending', 'awaiting_confirmation']).count()
-    processing_orders = Order.objects.filter(status='processing').count()
-    completed_orders = Order.objects.filter(status__in=['delivered', 'completed']).count()
-
-    # Revenue statistics
-    total_revenue = Purchase.objects.filter(refunded=False).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    today_revenue = Purchase.objects.filter(
-        refunded=False,
-        created_at__date=timezone.now().date()
-    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    # Counts, revenue and top vendors come from the cached aggregate snapshot
+    stats = get_dashboard_stats()
 
     # Recent data
     vendors = User.objects.filter(user_type='vendor').order_by('-date_joined')[:10]
@@ -42,31 +35,16 @@ def dashboard(request):
     recent_orders = Order.objects.select_related('customer').prefetch_related('items')[:20]
     purchases = Purchase.objects.select_related('customer', 'product').all()[:50]
 
-    # Top vendors by sales
-    top_vendors = User.objects.filter(user_type='vendor').annotate(
-        total_sales=Sum('products__purchases__amount')
-    ).order_by('-total_sales')[:5]
-
     # Orders awaiting confirmation
     awaiting_confirmation = Order.objects.filter(status='awaiting_confirmation').select_related('customer')[:10]
 
     return render(request, 'company_admin/dashboard.html', {
-        'total_vendors': total_vendors,
-        'total_customers': total_customers,
-        'total_products': total_products,
-        'active_products': active_products,
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'processing_orders': processing_orders,
-        'completed_orders': completed_orders,
-        'total_revenue': total_revenue,
-        'today_revenue': today_revenue,
+        **stats,
         'vendors': vendors,
         'customers': customers,
         'products': products,
         'recent_orders': recent_orders,
         'purchases': purchases,
-        'top_vendors': top_vendors,
         'awaiting_confirmation': awaiting_confirmation,
     })
 
@@ -76,11 +54,15 @@ def vendor_management(request):
     """View all vendors and their performance"""
     User = get_user_model()
 
+    # Figures come from the maintained VendorStats row (one-to-one join, no fan-out)
     vendors = User.objects.filter(user_type='vendor').annotate(
-        product_count=Count('products'),
-        total_sales=Sum('products__purchases__amount'),
-        order_count=Count('products__purchases', distinct=True)
-    ).order_by('-total_sales')
+        product_count=Coalesce('vendor_stats__product_count', 0),
+        active_product_count=Coalesce('vendor_stats__active_product_count', 0),
+        out_of_stock_count=Coalesce('vendor_stats__out_of_stock_count', 0),
+        total_sales=F('vendor_stats__lifetime_sales'),
+        sales_30d=F('vendor_stats__sales_30d'),
+        order_count=Coalesce('vendor_stats__order_count', 0),
+    ).order_by(F('vendor_stats__lifetime_sales').desc(nulls_last=True), '-date_joined')
 
     return render(request, 'company_admin/vendor_management.html', {
         'vendors': vendors,
@@ -98,26 +80,58 @@ def vendor_detail(request, vendor_id):
     total_products = products.count()
     active_products = products.filter(status='active').count()
 
-    # Sales statistics
-    purchases = Purchase.objects.filter(product__vendor=vendor)
-    total_sales = purchases.filter(refunded=False).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    total_orders = purchases.count()
-    refunded_count = purchases.filter(refunded=True).count()
-
-    # Recent orders
-    recent_orders = OrderItem.objects.filter(product__vendor=vendor).select_related(
-        'order', 'order__customer', 'product'
-    ).order_by('-order__created_at')[:20]
+    # Sales statistics (from the daily rollup rather than raw purchases)
+    sales = DailySalesSummary.objects.filter(vendor=vendor)
+    net = F('gross') - F('refunded_amount')
+    totals = sales.aggregate(total=Sum(net), orders=Sum('order_count'), refunds=Sum('refund_count'))
+    total_sales = totals['total'] or Decimal('0')
+    total_orders = totals['orders'] or 0
+    refunded_count = totals['refunds'] or 0
+
+    # Recent orders and order value per status, from the vendor's order rows. Archived
+    # orders have no OrderVendor rows, so their share is summed from the archived items.
+    links = OrderVendor.objects.filter(vendor=vendor)
+    line_total = ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    archived_lines = ArchivedOrderItem.objects.filter(product__vendor=vendor).order_by()
+    status_labels = dict(Order.STATUS_CHOICES)
+
+    recent_orders = list(
+        links.order_by('-created_at')
+        .values('order_id', 'status', 'created_at', 'subtotal', 'quantity', customer=F('order__customer__username'))[:20]
+    )
+    recent_orders += [
+        {'order_id': row['order_id'], 'status': row['order_status'], 'created_at': row['ordered_at'],
+         'subtotal': row['order_subtotal'], 'quantity': row['units'], 'customer': row['customer']}
+        for row in archived_lines.values('order_id').annotate(
+            order_status=F('order__status'), ordered_at=F('order__created_at'), customer=F('order__customer__username'),
+            order_subtotal=Sum(line_total), units=Sum('quantity'),
+        ).order_by('-ordered_at', '-order_id')[:20]
+    ]
+    recent_orders = sorted(recent_orders, key=lambda row: (row['created_at'], row['order_id']), reverse=True)[:20]
+    for row in recent_orders:
+        row['label'] = status_labels.get(row['status'], row['status'])
+
+    by_status = {
+        row['status']: row
+        for row in links.order_by('status').values('status').annotate(orders=Count('id'), revenue=Sum('subtotal'))
+    }
+    for row in archived_lines.values(status=F('order__status')).annotate(
+            orders=Count('order', distinct=True), revenue=Sum(line_total)):
+        totals_row = by_status.setdefault(row['status'], {'status': row['status'], 'orders': 0, 'revenue': 0})
+        totals_row['orders'] += row['orders']
+        totals_row['revenue'] += row['revenue'] or 0
+    orders_by_status = [
+        {'label': status_labels.get(status, status), **by_status[status]} for status in sorted(by_status)
+    ]
 
     # Monthly sales trend (last 6 months)
-    monthly_sales = purchases.filter(
-        refunded=False,
-        created_at__gte=timezone.now() - timezone.timedelta(days=180)
+    monthly_sales = sales.filter(
+        date__gte=timezone.localdate() - timezone.timedelta(days=180)
     ).annotate(
-        month=TruncMonth('created_at')
+        month=TruncMonth('date')
     ).values('month').annotate(
-        total=Sum('amount'),
-        count=Count('id')
+        total=Sum(net),
+        count=Sum(F('order_count') - F('refund_count'))
     ).order_by('month')
 
     return render(request, 'company_admin/vendor_detail.html', {
@@ -129,49 +143,137 @@ def vendor_detail(request, vendor_id):
         'total_orders': total_orders,
         'refunded_count': refunded_count,
         'recent_orders': recent_orders,
+        'orders_by_status': orders_by_status,
         'monthly_sales': list(monthly_sales),
     })
 
 
-@staff_member_required
-def order_management(request):
-    """View all orders with filtering and management"""
+ORDERS_PER_PAGE = 100
+
+
+def _parse_day(value):
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
+
+
+def _filtered_orders(request, model=Order):
+    """Apply the order_management filters; returns the queryset and the raw filter values.
+
+    Dates are whole days in the site time zone, turned into half-open
+    ``created_at`` ranges so the (status, created_at) index can be used.
+    ``model`` is ``ArchivedOrder`` for the archived side of the listing.
+    """
     status_filter = request.GET.get('status', '')
     date_from = request.GET.get('date_from', '')
     date_to = request.GET.get('date_to', '')
 
-    orders = Order.objects.select_related('customer').prefetch_related('items', 'items__product')
+    orders = model.objects.all()
 
     if status_filter:
         orders = orders.filter(status=status_filter)
-    if date_from:
-        orders = orders.filter(created_at__date__gte=date_from)
-    if date_to:
-        orders = orders.filter(created_at__date__lte=date_to)
+    day_from = _parse_day(date_from)
+    day_to = _parse_day(date_to)
+    if day_from:
+        orders = orders.filter(created_at__gte=local_day_start(day_from))
+    if day_to:
+        orders = orders.filter(created_at__lt=local_day_start(day_to + timezone.timedelta(days=1)))
+
+    return orders, {'status_filter': status_filter, 'date_from': date_from, 'date_to': date_to}
 
-    orders = orders.order_by('-created_at')[:100]
+
+@staff_member_required
+def order_management(request):
+    """View all orders with filtering and management"""
+    orders, filters = _filtered_orders(request)
+    archived, _ = _filtered_orders(request, ArchivedOrder)
+    listings = [qs.select_related('customer').annotate(item_count=Count('items')) for qs in (orders, archived)]
+
+    page = keyset_paginate_merged(listings, request.GET.get('cursor'), ORDERS_PER_PAGE)
+
+    query = request.GET.copy()
+    query.pop('cursor', None)
 
     return render(request, 'company_admin/order_management.html', {
-        'orders': orders,
-        'status_filter': status_filter,
-        'date_from': date_from,
-        'date_to': date_to,
+        'orders': page,
+        'page': page,
+        'filter_query': query.urlencode(),
         'status_choices': Order.STATUS_CHOICES,
+        **filters,
     })
 
 
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+# Leading characters that make Excel/Sheets evaluate a cell as a formula
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_safe(value):
+    """Neutralise customer-entered text that a spreadsheet would run as a formula."""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+@staff_member_required
+def order_export(request):
+    """Stream the filtered orders as CSV without loading them all into memory"""
+    orders, _ = _filtered_orders(request)
+    archived, _ = _filtered_orders(request, ArchivedOrder)
+    # Both sides come newest first, so merging the two streams keeps the export sorted
+    orders = heapq.merge(*(
+        qs.select_related('customer').annotate(item_count=Count('items')).order_by('-created_at', '-id').iterator(chunk_size=2000)
+        for qs in (orders, archived)
+    ), key=lambda order: (order.created_at, order.id), reverse=True)
+
+    writer = csv.writer(_Echo())
+
+    def rows():
+        yield writer.writerow([
+            'order_id', 'created_at', 'customer', 'email', 'status', 'payment_method',
+            'payment_reference', 'items', 'delivery_cost', 'tax_amount', 'total',
+        ])
+        for order in orders:
+            yield writer.writerow([_csv_safe(value) for value in (
+                order.id,
+                timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M:%S'),
+                order.customer.username,
+                order.customer.email,
+                order.status,
+                order.payment_method,
+                order.payment_reference or '',
+                order.item_count,
+                order.delivery_cost,
+                order.tax_amount,
+                order.total,
+            )])
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    filename = f"orders-{timezone.localdate():%Y%m%d}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @staff_member_required
 def order_detail_admin(request, order_id):
     """Admin view of order details"""
-    order = get_object_or_404(Order, id=order_id)
+    from core.models import ArchivedDeliveryTracking, DeliveryTracking
+    order = Order.objects.filter(id=order_id).first()
+    tracking_model = DeliveryTracking
+    if order is None:
+        order = get_object_or_404(ArchivedOrder, id=order_id)
+        tracking_model = ArchivedDeliveryTracking
     items = order.items.select_related('product', 'product__vendor')
 
     # Get tracking info if exists
-    from core.models import DeliveryTracking
-    try:
-        tracking = DeliveryTracking.objects.get(order=order)
-    except DeliveryTracking.DoesNotExist:
-        tracking = None
+    tracking = tracking_model.objects.filter(order=order).first()
 
     return render(request, 'company_admin/order_detail.html', {
         'order': order,
@@ -190,7 +292,7 @@ def update_order_status(request, order_id):
         if new_status in dict(Order.STATUS_CHOICES):
             old_status = order.status
             order.status = new_status
-            order.save()
+            order.save(update_fields=['status', 'updated_at'])
 
             # Create tracking if shipped
             if new_status == Order.STATUS_SHIPPED:
@@ -358,35 +460,30 @@ def refund_purchase(request, purchase_id):
     # get reason from POST (fallback message)
     reason = request.POST.get('reason', '').strip() or 'Refunded via admin dashboard'
 
-    # Restock product
-    product = purchase.product
-    product.stock = product.stock + purchase.quantity
-    product.save()
+    # Restock, mark refunded, log and queue notifications in one transaction
+    result = refund_purchases(Purchase.objects.filter(id=purchase.id), request.user, reason)
+    if not result.count:
+        messages.info(request, 'Purchase already refunded.')
+        return redirect('company_admin:dashboard')
+
+    messages.success(request, f'Purchase #{purchase.id} refunded and {result.restocked_units} items restocked.')
+    return redirect('company_admin:dashboard')
 
-    # mark refunded and record metadata
-    purchase.refunded = True
-    purchase.refunded_at = timezone.now()
-    purchase.refunded_by = request.user
-    purchase.refund_reason = reason
-    purchase.save()
 
-    # log and notify using HTML templates
-    PurchaseLog.objects.create(purchase=purchase, action=PurchaseLog.ACTION_REFUND, actor=request.user, note=reason)
-    try:
-        from django.template.loader import render_to_string
-        from django.core.mail import EmailMessage
-        html = render_to_string('emails/refund.html', {'purchase': purchase, 'user': purchase.customer})
-        msg = EmailMessage(subject=f'Purchase #{purchase.id} refunded', body=html, from_email=settings.DEFAULT_FROM_EMAIL, to=[purchase.customer.email])
-        msg.content_subtype = 'html'
-        msg.send(fail_silently=True)
-        vendor_email = getattr(product.vendor, 'email', None)
-        if vendor_email:
-            vhtml = render_to_string('emails/refund.html', {'purchase': purchase, 'user': product.vendor})
-            vmsg = EmailMessage(subject=f'Purchase #{purchase.id} refunded', body=vhtml, from_email=settings.DEFAULT_FROM_EMAIL, to=[vendor_email])
-            vmsg.content_subtype = 'html'
-            vmsg.send(fail_silently=True)
-    except Exception:
-        pass
-
-    messages.success(request, f'Purchase #{purchase.id} refunded and {purchase.quantity} items restocked.')
+@staff_member_required
+def bulk_refund_purchases(request):
+    """Refund every purchase id posted as ``purchase_ids`` in one transaction."""
+    if request.method != 'POST':
+        return redirect('company_admin:dashboard')
+    purchase_ids = [int(pid) for pid in request.POST.getlist('purchase_ids') if pid.isdigit()]
+    if not purchase_ids:
+        messages.error(request, 'No purchases selected.')
+        return redirect('company_admin:dashboard')
+    reason = request.POST.get('reason', '').strip() or 'Refunded via admin dashboard'
+
+    result = refund_purchases(Purchase.objects.filter(id__in=purchase_ids), request.user, reason)
+    if result.count:
+        messages.success(request, f'{result.count} purchase(s) refunded and {result.restocked_units} items restocked.')
+    if result.skipped:
+        messages.info(request, f'{result.skipped} purchase(s) were already refunded.')
     return redirect('company_admin:dashboard')
@@ -5,3 +5,11 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
     verbose_name = 'Core Settings'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import checks, signals  # noqa: F401
+
+        if getattr(settings, 'PRODUCTION', False):
+            checks.log_optimization_report()
@@ -0,0 +1,68 @@
+# core/cache_utils.py
+"""
+Caching helpers shared by the dashboards and context processors.
+"""
+import logging
+import time
+from typing import Any, Callable, Tuple
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# How long a stale value may still be served while one worker recomputes it
+STALE_GRACE_SECONDS = 60
+# Upper bound for a recompute; the lock expires after this even if a worker dies
+LOCK_TIMEOUT_SECONDS = 30
+# How long a caller without a stale value waits for another worker's recompute
+WAIT_FOR_RECOMPUTE_SECONDS = 5.0
+
+
+def cached_compute(key: str, compute: Callable[[], Any], ttl: int) -> Tuple[Any, bool]:
+    """
+    Return ``compute()`` through the cache with single-flight recomputation.
+
+    Only one caller at a time recomputes an expired entry (guarded by a
+    ``cache.add`` lock). Other callers are served the stale value for up to
+    ``STALE_GRACE_SECONDS``, or wait briefly for the fresh one when nothing
+    is cached yet.
+
+    Args:
+        key: Cache key for the computed value
+        compute: Zero-argument callable producing the value (must be picklable)
+        ttl: Seconds the value is considered fresh
+
+    Returns:
+        Tuple[Any, bool]: The value and whether it came from the cache
+    """
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None and entry['fresh_until'] > now:
+        return entry['value'], True
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT_SECONDS):
+        try:
+            value = compute()
+            cache.set(
+                key,
+                {'value': value, 'fresh_until': time.time() + ttl},
+                ttl + STALE_GRACE_SECONDS,
+            )
+        finally:
+            cache.delete(lock_key)
+        return value, False
+
+    # Another worker is recomputing; serve stale data rather than piling on
+    if entry is not None:
+        return entry['value'], True
+
+    deadline = time.monotonic() + WAIT_FOR_RECOMPUTE_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value'], True
+
+    logger.warning(f'Timed out waiting for recompute of {key}; computing locally')
+    return compute(), False
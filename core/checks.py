@@ -0,0 +1,103 @@
+# core/checks.py
+"""
+Startup self-check of the performance-related settings.
+
+``optimization_report()`` lists which optimizations the active settings
+profile turns on. The production profile logs the report once at startup
+(see ``CoreConfig.ready``), ``manage.py check --deploy`` prints it, and the
+regular system checks warn about production misconfigurations and about a
+per-process cache whenever several worker processes serve the app.
+"""
+import logging
+
+from django.conf import settings
+from django.core import checks
+
+logger = logging.getLogger('core.startup')
+
+
+def _template_loaders():
+    options = settings.TEMPLATES[0].get('OPTIONS', {})
+    loaders = options.get('loaders')
+    if loaders is None:
+        # Django wraps the default loaders in the cached loader itself
+        return 'cached (Django default)'
+    for loader in loaders:
+        if isinstance(loader, (list, tuple)) and loader[0] == 'django.template.loaders.cached.Loader':
+            return 'cached'
+    return 'uncached'
+
+
+def optimization_report():
+    """Return ``(name, active, detail)`` for each performance optimization."""
+    db = settings.DATABASES['default']
+    engine = db['ENGINE'].rsplit('.', 1)[-1]
+    options = db.get('OPTIONS', {})
+    cache_backend = settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+    loaders = _template_loaders()
+
+    report = [
+        ('debug off', not settings.DEBUG, f'DEBUG={settings.DEBUG}'),
+        ('persistent connections', bool(db.get('CONN_MAX_AGE')),
+         f"CONN_MAX_AGE={db.get('CONN_MAX_AGE', 0)}, health checks={db.get('CONN_HEALTH_CHECKS', False)}"),
+        ('shared cache', cache_backend != 'LocMemCache', cache_backend),
+        ('cached sessions', settings.SESSION_ENGINE.endswith('cached_db') or settings.SESSION_ENGINE.endswith('.cache'),
+         settings.SESSION_ENGINE),
+        ('cached templates', loaders != 'uncached', loaders),
+    ]
+    if engine == 'sqlite3':
+        report.append(('sqlite WAL', 'journal_mode=WAL' in options.get('init_command', ''),
+                       options.get('init_command', 'no pragmas')))
+    elif engine == 'postgresql':
+        pool = options.get('pool')
+        report.append(('connection pool', bool(pool), f'pool={pool}' if pool else 'no pool'))
+    return report
+
+
+def log_optimization_report():
+    lines = [f"  [{'x' if active else ' '}] {name}: {detail}" for name, active, detail in optimization_report()]
+    logger.info(f"Settings profile '{settings.DJANGO_ENV}':\n" + '\n'.join(lines))
+
+
+@checks.register(checks.Tags.compatibility, deploy=True)
+def report_optimizations(app_configs, **kwargs):
+    """List the active optimizations when running ``manage.py check --deploy``."""
+    return [
+        checks.Info(f"{name}: {'on' if active else 'off'} ({detail})", id='core.I001')
+        for name, active, detail in optimization_report()
+    ]
+
+
+@checks.register(checks.Tags.compatibility)
+def check_production_profile(app_configs, **kwargs):
+    if not getattr(settings, 'PRODUCTION', False):
+        return []
+    messages = []
+    if settings.DEBUG:
+        messages.append(checks.Warning(
+            'DEBUG is on in the production profile.',
+            hint='Unset DEBUG or set it to False.',
+            id='core.W001',
+        ))
+    if settings.SECRET_KEY.startswith('django-insecure-'):
+        messages.append(checks.Warning(
+            'The production profile is using the development SECRET_KEY.',
+            hint='Set SECRET_KEY.',
+            id='core.W003',
+        ))
+    return messages
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Snapshot versions (core.site_cache) only reach other processes through a shared cache."""
+    if not getattr(settings, 'MULTI_PROCESS', False):
+        return []
+    if not settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+        return []
+    return [checks.Warning(
+        f"{settings.WEB_CONCURRENCY} worker process(es) in the '{settings.DJANGO_ENV}' profile "
+        'are using the per-process local-memory cache.',
+        hint='Set REDIS_URL so all workers share cached data and snapshot invalidations.',
+        id='core.W002',
+    )]
@@ -2,73 +2,46 @@ from django.conf import settings
 
 
 def site_settings(request):
-    """Add site settings to all template contexts"""
-    try:
-        from .models import SiteSettings, AdvertisingBanner
-        from django.utils import timezone
+    """Add site settings to all template contexts.
 
-        site = SiteSettings.get_settings()
+    Both values are lazy and served from the process-local snapshots in
+    ``core.site_cache``, so templates that never touch them cost nothing and
+    the rest cost no queries once the snapshot is warm.
+    """
+    from django.utils.functional import SimpleLazyObject
+    from .site_cache import get_active_banners, get_site_settings
 
-        # Get active banners
-        now = timezone.now()
+    def site():
         try:
-            banners = AdvertisingBanner.objects.filter(is_active=True)
+            return get_site_settings()
+        except Exception:
+            # Database not ready (e.g. before migrate)
+            return None
 
-            # Filter by date if set
-            active_banners = []
-            for banner in banners:
-                if banner.start_date and banner.start_date > now:
-                    continue
-                if banner.end_date and banner.end_date < now:
-                    continue
-                active_banners.append(banner)
+    def banners():
+        try:
+            return get_active_banners()
         except Exception:
-            active_banners = []
+            return ()
 
-        return {
-            'site_settings': site,
-            'advertising_banners': active_banners,
-        }
-    except Exception:
-        # Return empty context if database not ready
-        return {
-            'site_settings': None,
-            'advertising_banners': [],
-        }
+    return {
+        'site_settings': SimpleLazyObject(site),
+        'advertising_banners': SimpleLazyObject(banners),
+    }
 
 
 def currency_context(request):
-    """Add currency information to all template contexts"""
-    try:
-        from .models import Currency
-
-        # Get current currency from session or cookie
-        current_currency_code = request.session.get('currency')
-        if not current_currency_code:
-            current_currency_code = request.COOKIES.get(settings.CURRENCY_COOKIE_NAME, settings.DEFAULT_CURRENCY)
-
-        # Get currency object
-        try:
-            current_currency = Currency.objects.get(code=current_currency_code, is_active=True)
-        except Currency.DoesNotExist:
-            # Fallback to RWF
-            try:
-                current_currency, _ = Currency.objects.get_or_create(
-                    code='RWF',
-                    defaults={'name': 'Rwandan Franc', 'symbol': 'RWF', 'exchange_rate': 1.0}
-                )
-            except Exception:
-                current_currency = None
+    """Add currency information to all template contexts.
 
-        # Get all active currencies
-        try:
-            currencies = Currency.objects.filter(is_active=True)
-        except Exception:
-            currencies = []
+    Served from the in-memory currency snapshot; the current currency comes
+    from the currency cookie only, so the session is never loaded here.
+    """
+    try:
+        from .currency import get_currency_table, get_request_currency
 
         return {
-            'current_currency': current_currency,
-            'currencies': currencies,
+            'current_currency': get_request_currency(request),
+            'currencies': get_currency_table().currencies,
             'supported_currencies': settings.SUPPORTED_CURRENCIES,
         }
     except Exception:
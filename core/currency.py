@@ -0,0 +1,212 @@
+# core/currency.py
+"""
+Currency conversion and formatting engine.
+
+The Currency table is tiny and read on every page render, so each worker
+keeps an immutable snapshot (see ``core.site_cache.LocalSnapshot``) that is
+rebuilt only when a ``Currency`` row is saved or deleted. Every entry carries
+its ``Decimal`` rate, quantizer and format pattern precomputed, so converting
+and formatting a price costs no queries and no float round-trips.
+Resolving the visitor's currency needs only the currency cookie.
+"""
+from dataclasses import dataclass, field
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from .preferences import get_preference_cookie
+from .site_cache import LocalSnapshot
+
+BASE_CURRENCY = 'RWF'
+
+# Currencies shown without minor units when they only exist in settings
+ZERO_DECIMAL_CURRENCIES = frozenset({'JPY', 'KES', 'UGX', 'TZS', 'RWF'})
+
+# Largest amount accepted for conversion; keeps converted and quantized values within the Decimal context precision
+MAX_AMOUNT = Decimal('1e15')
+
+
+def to_decimal(value) -> Decimal:
+    """Coerce a price (Decimal, int, float or numeric string) to Decimal.
+
+    Raises:
+        ValueError: If ``value`` is not a finite number
+    """
+    if isinstance(value, Decimal):
+        amount = value
+    else:
+        try:
+            amount = Decimal(str(value))
+        except (InvalidOperation, ValueError, TypeError):
+            raise ValueError(f'Invalid amount: {value!r}')
+    if not amount.is_finite():
+        raise ValueError(f'Invalid amount: {value!r}')
+    return amount
+
+
+@dataclass(frozen=True)
+class CurrencyInfo:
+    """Read-only copy of a ``Currency`` row with precomputed conversion state."""
+    code: str
+    name: str
+    symbol: str
+    exchange_rate: Decimal
+    decimal_places: int
+    is_active: bool = True
+    quantizer: Decimal = field(init=False, repr=False, compare=False)
+    _pattern: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'exchange_rate', to_decimal(self.exchange_rate))
+        object.__setattr__(self, 'quantizer', Decimal(1).scaleb(-self.decimal_places))
+        if self.decimal_places == 0:
+            pattern = f'{self.symbol} {{:,.0f}}'
+        else:
+            pattern = f'{self.symbol}{{:,.{self.decimal_places}f}}'
+        object.__setattr__(self, '_pattern', pattern)
+
+    def __str__(self):
+        return f"{self.code} - {self.name}"
+
+    def quantize(self, amount: Decimal) -> Decimal:
+        return amount.quantize(self.quantizer, rounding=ROUND_HALF_UP)
+
+    def format(self, amount) -> str:
+        """Format an amount already expressed in this currency."""
+        return self._pattern.format(self.quantize(to_decimal(amount)))
+
+    def convert_from_rwf(self, amount) -> Decimal:
+        """Convert amount from RWF to this currency"""
+        return self.quantize(to_decimal(amount) * self.exchange_rate)
+
+    def convert_to_rwf(self, amount) -> Decimal:
+        """Convert amount from this currency to RWF"""
+        amount = to_decimal(amount)
+        if self.exchange_rate == 0:
+            return amount
+        return (amount / self.exchange_rate).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    def format_from_rwf(self, amount) -> str:
+        """Convert an RWF amount to this currency and format it."""
+        return self._pattern.format(self.convert_from_rwf(amount))
+
+
+@dataclass(frozen=True)
+class CurrencyTable:
+    """Immutable set of active currencies keyed by code."""
+    currencies: Tuple[CurrencyInfo, ...]
+    by_code: Mapping[str, CurrencyInfo]
+    default: CurrencyInfo
+    # Currencies configured in settings.SUPPORTED_CURRENCIES but not in the database
+    fallbacks: Mapping[str, CurrencyInfo] = field(default_factory=lambda: MappingProxyType({}))
+
+    def get(self, code: Optional[str]) -> CurrencyInfo:
+        """Return the active currency ``code``, falling back to the base currency."""
+        if not isinstance(code, str):
+            return self.default
+        return self.by_code.get(code) or self.default
+
+    def lookup(self, code: str) -> Optional[CurrencyInfo]:
+        """Return currency ``code`` from the database or settings, or None if unknown."""
+        if not isinstance(code, str):
+            return None
+        return self.by_code.get(code) or self.fallbacks.get(code)
+
+    def convert(self, amount, to_code: str, from_code: str = BASE_CURRENCY) -> Decimal:
+        """Convert one amount between two known currencies.
+
+        Raises:
+            KeyError: If either currency is unknown
+            ValueError: If ``amount`` is not a number or exceeds ``MAX_AMOUNT``
+            ArithmeticError: If the result cannot be represented
+        """
+        return self.convert_many([amount], [to_code], from_code)[to_code][0]
+
+    def convert_many(self, amounts: Iterable, to_codes: Sequence[str],
+                     from_code: str = BASE_CURRENCY) -> Dict[str, List[Decimal]]:
+        """Convert a list of amounts into every currency of ``to_codes`` at once.
+
+        The amounts are parsed once and each target applies a single
+        precomputed cross rate, so a whole price list costs one pass per
+        currency.
+
+        Raises:
+            KeyError: If a currency is unknown
+            ValueError: If an amount is not a number or exceeds ``MAX_AMOUNT``
+            ArithmeticError: If a result cannot be represented
+        """
+        source = self.lookup(from_code)
+        if source is None:
+            raise KeyError(from_code)
+        values = [to_decimal(a) for a in amounts]
+        if any(abs(v) > MAX_AMOUNT for v in values):
+            raise ValueError(f'Amounts are limited to {MAX_AMOUNT:,f}')
+        if source.exchange_rate != 1 and source.exchange_rate != 0:
+            values = [v / source.exchange_rate for v in values]
+        result = {}
+        for code in to_codes:
+            target = self.lookup(code)
+            if target is None:
+                raise KeyError(code)
+            rate, quantizer = target.exchange_rate, target.quantizer
+            result[code] = [(v * rate).quantize(quantizer, rounding=ROUND_HALF_UP) for v in values]
+        return result
+
+
+def _fallback_base_currency() -> CurrencyInfo:
+    info = settings.SUPPORTED_CURRENCIES.get(BASE_CURRENCY, {})
+    return CurrencyInfo(
+        code=BASE_CURRENCY,
+        name=info.get('name', 'Rwandan Franc'),
+        symbol=info.get('symbol', BASE_CURRENCY),
+        exchange_rate=Decimal('1'),
+        decimal_places=0,
+    )
+
+
+def _load_currency_table():
+    from .models import Currency
+
+    currencies = tuple(c.as_info() for c in Currency.objects.filter(is_active=True))
+    by_code = {c.code: c for c in currencies}
+    default = by_code.get(settings.DEFAULT_CURRENCY) or by_code.get(BASE_CURRENCY) or _fallback_base_currency()
+    fallbacks = {
+        code: CurrencyInfo(
+            code=code,
+            name=info.get('name', code),
+            symbol=info.get('symbol', code),
+            exchange_rate=Decimal(str(info.get('rate', 1))),
+            decimal_places=0 if code in ZERO_DECIMAL_CURRENCIES else 2,
+            is_active=False,
+        )
+        for code, info in settings.SUPPORTED_CURRENCIES.items()
+        if code not in by_code
+    }
+    table = CurrencyTable(
+        currencies=currencies,
+        by_code=MappingProxyType(by_code),
+        default=default,
+        fallbacks=MappingProxyType(fallbacks),
+    )
+    return table, None
+
+
+currency_snapshot = LocalSnapshot('currencies', _load_currency_table)
+
+
+def get_currency_table() -> CurrencyTable:
+    """Return this worker's snapshot of the active currencies."""
+    return currency_snapshot.get()
+
+
+async def aget_currency_table() -> CurrencyTable:
+    """Async :func:`get_currency_table` for async views."""
+    return await currency_snapshot.aget()
+
+
+def get_request_currency(request) -> CurrencyInfo:
+    """Resolve the visitor's currency from the signed currency cookie alone."""
+    code = get_preference_cookie(request, settings.CURRENCY_COOKIE_NAME)
+    return get_currency_table().get(code or settings.DEFAULT_CURRENCY)
@@ -0,0 +1,134 @@
+# core/middleware.py
+import json
+import logging
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.locale import LocaleMiddleware
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import perf
+from .preferences import get_preference_cookie
+
+perf_logger = logging.getLogger('core.perf')
+
+
+class SignedCookieLocaleMiddleware(LocaleMiddleware):
+    """``LocaleMiddleware`` that only honours a correctly signed language cookie.
+
+    The verified value is handed to Django's language negotiation in place
+    of the raw cookie; unsigned or tampered cookies are ignored and the
+    ``Accept-Language`` header decides instead.
+    """
+
+    def process_request(self, request):
+        name = settings.LANGUAGE_COOKIE_NAME
+        if name in request.COOKIES:
+            language = get_preference_cookie(request, name)
+            if language:
+                request.COOKIES[name] = language
+            else:
+                del request.COOKIES[name]
+        return super().process_request(request)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """``WhiteNoiseMiddleware`` that can also run natively under ASGI.
+
+    WhiteNoise's middleware is sync-only, which makes Django wrap every
+    request that passes through it in a thread, so async views lose their
+    concurrency. The static-file lookup is an in-memory dict read, so it is
+    safe to do on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class PerformanceMiddleware:
+    """Measure each request and report it (see ``core.perf``).
+
+    Staff users get a ``Server-Timing`` header (visible in the browser's
+    network panel); ``PERF_SERVER_TIMING`` widens it to ``'all'`` users
+    (used by ``scripts/benchmark.py``) or turns it ``'off'``. A sample of
+    ``PERF_LOG_SAMPLE_RATE`` requests is logged to ``core.perf`` as JSON,
+    and every request slower than ``PERF_SLOW_REQUEST_MS`` is logged as a
+    warning with its slowest queries.
+    Place it first in ``MIDDLEWARE`` so the total covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = perf.RequestMetrics()
+        token = perf.activate(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            perf.deactivate(token)
+        metrics.finish()
+        self.report(request, response, metrics, getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        metrics = perf.RequestMetrics()
+        token = perf.activate(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            perf.deactivate(token)
+        metrics.finish()
+        user = None
+        if settings.PERF_SERVER_TIMING == 'staff' and hasattr(request, 'auser'):
+            user = await request.auser()
+        self.report(request, response, metrics, user)
+        return response
+
+    def report(self, request, response, metrics, user=None):
+        mode = settings.PERF_SERVER_TIMING
+        if mode == 'all' or (mode == 'staff' and getattr(user, 'is_staff', False)):
+            response['Server-Timing'] = metrics.server_timing()
+
+        slow = metrics.total_ms >= settings.PERF_SLOW_REQUEST_MS
+        if not slow and random.random() >= settings.PERF_LOG_SAMPLE_RATE:
+            return
+        entry = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **metrics.as_dict(),
+        }
+        if slow:
+            entry['top_queries'] = [
+                {'ms': round(duration, 2), 'sql': sql[:500]}
+                for duration, sql in metrics.top_queries(settings.PERF_SLOW_TOP_QUERIES)
+            ]
+            perf_logger.warning('slow request %s', json.dumps(entry))
+        else:
+            perf_logger.info('request %s', json.dumps(entry))
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('orders', '0023_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedDeliveryTracking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending Pickup'), ('picked_up', 'Picked Up'), ('in_transit', 'In Transit'), ('out_for_delivery', 'Out for Delivery'), ('delivered', 'Delivered'), ('failed', 'Delivery Failed')], max_length=20)),
+                ('driver_name', models.CharField(blank=True, max_length=100)),
+                ('driver_phone', models.CharField(blank=True, max_length=20)),
+                ('vehicle_number', models.CharField(blank=True, max_length=20)),
+                ('current_latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('current_longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('destination_latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('destination_longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('estimated_delivery', models.DateTimeField(blank=True, null=True)),
+                ('picked_up_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tracking', to='orders.archivedorder')),
+            ],
+            options={
+                'verbose_name': 'Archived Delivery Tracking',
+                'verbose_name_plural': 'Archived Delivery Tracking',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedDeliveryTrackingHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('status', models.CharField(max_length=20)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('recorded_at', models.DateTimeField()),
+                ('tracking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='core.archiveddeliverytracking')),
+            ],
+            options={
+                'verbose_name': 'Archived Tracking History',
+                'verbose_name_plural': 'Archived Tracking History',
+                'ordering': ['-recorded_at'],
+            },
+        ),
+    ]
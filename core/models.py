@@ -82,15 +82,25 @@ class Currency(models.Model):
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+    def as_info(self):
+        """Return an immutable ``core.currency.CurrencyInfo`` copy of this row"""
+        from .currency import CurrencyInfo
+        return CurrencyInfo(
+            code=self.code,
+            name=self.name,
+            symbol=self.symbol,
+            exchange_rate=self.exchange_rate,
+            decimal_places=self.decimal_places,
+            is_active=self.is_active,
+        )
+
     def convert_from_rwf(self, amount):
         """Convert amount from RWF to this currency"""
-        return round(float(amount) * float(self.exchange_rate), self.decimal_places)
+        return self.as_info().convert_from_rwf(amount)
 
     def convert_to_rwf(self, amount):
         """Convert amount from this currency to RWF"""
-        if self.exchange_rate == 0:
-            return amount
-        return round(float(amount) / float(self.exchange_rate), 2)
+        return self.as_info().convert_to_rwf(amount)
 
 
 class DeliveryTracking(models.Model):
@@ -165,6 +175,51 @@ class DeliveryTrackingHistory(models.Model):
         return f"{self.tracking.order_id} - {self.recorded_at}"
 
 
+class ArchivedDeliveryTracking(models.Model):
+    """Tracking of an archived order, moved by ``manage.py archive_orders``"""
+    id = models.BigIntegerField(primary_key=True)
+    order = models.OneToOneField('orders.ArchivedOrder', on_delete=models.CASCADE, related_name='tracking')
+    status = models.CharField(max_length=20, choices=DeliveryTracking.STATUS_CHOICES)
+    driver_name = models.CharField(max_length=100, blank=True)
+    driver_phone = models.CharField(max_length=20, blank=True)
+    vehicle_number = models.CharField(max_length=20, blank=True)
+    current_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    current_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    destination_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    destination_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    estimated_delivery = models.DateTimeField(null=True, blank=True)
+    picked_up_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Archived Delivery Tracking'
+        verbose_name_plural = 'Archived Delivery Tracking'
+
+    def __str__(self):
+        return f"Tracking for archived order #{self.order_id}"
+
+
+class ArchivedDeliveryTrackingHistory(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    tracking = models.ForeignKey(ArchivedDeliveryTracking, on_delete=models.CASCADE, related_name='history')
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    status = models.CharField(max_length=20)
+    note = models.CharField(max_length=255, blank=True)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-recorded_at']
+        verbose_name = 'Archived Tracking History'
+        verbose_name_plural = 'Archived Tracking History'
+
+    def __str__(self):
+        return f"{self.tracking.order_id} - {self.recorded_at}"
+
+
 class AdvertisingBanner(models.Model):
     """Promotional banners for the site"""
     title = models.CharField(max_length=100)
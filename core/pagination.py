@@ -0,0 +1,152 @@
+# core/pagination.py
+"""
+Pagination helpers for large tables.
+
+Keyset (seek) pagination fetches each page of a newest-first listing with
+an indexed range predicate on ``(field, id)``, so page 1,000 costs the same
+as page 1; ``keyset_paginate_merged`` does the same across several tables.
+``EstimatedCountPaginator`` avoids full-table ``COUNT(*)`` scans by trusting
+the query planner's row estimate once a result set is large.
+"""
+import base64
+import binascii
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class KeysetPage:
+    """One page of results and the cursor to the next page."""
+    object_list: List[Any]
+    next_cursor: Optional[str]
+    cursor: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self) -> bool:
+        return not self.cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(value, pk) -> str:
+    """Encode a ``(datetime, pk)`` position as an opaque URL-safe token."""
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Return the ``(datetime, pk)`` position of a cursor, or None if malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        value = parse_datetime(value)
+        if value is None:
+            return None
+        return value, int(pk)
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(queryset, cursor: Optional[str], per_page: int, field: str = 'created_at') -> KeysetPage:
+    """
+    Return the page of ``queryset`` (newest first by ``field``, then id) after ``cursor``.
+
+    Args:
+        queryset: Unordered or arbitrarily ordered queryset; ordering is replaced
+        cursor: Token from a previous page's ``next_cursor`` (None for page one)
+        per_page: Page size
+        field: Datetime column to order by; should be indexed together with
+            any equality filters applied to the queryset
+
+    Returns:
+        KeysetPage: The page; malformed cursors fall back to the first page
+    """
+    return keyset_paginate_merged([queryset], cursor, per_page, field)
+
+
+def keyset_paginate_merged(querysets, cursor: Optional[str], per_page: int, field: str = 'created_at') -> KeysetPage:
+    """
+    Like ``keyset_paginate``, for one listing spread over several tables.
+
+    Each queryset (e.g. live and archived orders) is read one page deep from
+    the cursor and the results are merged newest first. Primary keys must be
+    unique across the querysets, since they break ties in the cursor.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if not position:
+        cursor = None
+
+    rows = []
+    for queryset in querysets:
+        qs = queryset.order_by(f'-{field}', '-id')
+        if position:
+            value, pk = position
+            qs = qs.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+        rows.extend(qs[:per_page + 1])
+    if len(querysets) > 1:
+        rows.sort(key=lambda row: (getattr(row, field), row.pk), reverse=True)
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(object_list=rows, next_cursor=next_cursor, cursor=cursor)
+
+
+def estimate_count(queryset) -> Optional[int]:
+    """
+    Return the planner's row estimate for ``queryset``, or None if unavailable.
+
+    Only PostgreSQL exposes a cheap estimate (``EXPLAIN``); other backends
+    return None so callers fall back to an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (DatabaseError, KeyError, IndexError, TypeError, ValueError):
+        logger.exception('Could not estimate row count')
+        return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that uses the planner estimate instead of COUNT(*) for big result sets.
+
+    Below ``exact_count_threshold`` estimated rows the exact count is still
+    used, so small tables and narrow filters keep precise page numbers.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate > self.exact_count_threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,167 @@
+# core/perf.py
+"""
+Per-request performance instrumentation.
+
+``core.middleware.PerformanceMiddleware`` opens a :class:`RequestMetrics`
+for every request in a context variable. While it is open:
+
+- each SQL statement is timed by :func:`record_query`, an execute wrapper
+  added to every database connection when it is created (so queries run in
+  ``sync_to_async`` threads are counted too);
+- top-level template renders are timed by the :class:`DjangoTemplates`
+  backend below (the time includes queries run while rendering);
+- cache reads through the :class:`LocMemCache` and :class:`RedisCache`
+  backends below are counted as hits or misses.
+
+Outside a request the hooks cost one context-variable lookup.
+"""
+import contextvars
+import time
+from operator import itemgetter
+from typing import Optional
+
+from django.core.cache.backends import locmem, redis
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+_current = contextvars.ContextVar('core_perf_metrics', default=None)
+
+_MISSING = object()
+
+
+class RequestMetrics:
+    """Timings and counters collected while one request is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.queries = []  # (duration_ms, sql)
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def query_count(self) -> int:
+        return len(self.queries)
+
+    def finish(self) -> None:
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def top_queries(self, limit: int):
+        """Return the ``limit`` slowest queries as ``(duration_ms, sql)``, slowest first."""
+        return sorted(self.queries, key=itemgetter(0), reverse=True)[:limit]
+
+    def server_timing(self) -> str:
+        """Format the metrics as a ``Server-Timing`` header value."""
+        return ', '.join([
+            f'db;dur={self.db_ms:.1f};desc="{self.query_count} queries"',
+            f'tpl;dur={self.template_ms:.1f};desc="templates"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'total;dur={self.total_ms:.1f}',
+        ])
+
+    def as_dict(self) -> dict:
+        return {
+            'total_ms': round(self.total_ms, 2),
+            'db_ms': round(self.db_ms, 2),
+            'queries': self.query_count,
+            'template_ms': round(self.template_ms, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def activate(metrics: RequestMetrics) -> contextvars.Token:
+    return _current.set(metrics)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    """Return the metrics of the request being handled, if any."""
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper timing each statement into the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - start) * 1000
+        metrics.db_ms += duration
+        metrics.queries.append((duration, sql))
+
+
+def install_query_recorder(connection) -> None:
+    """Add :func:`record_query` to a database connection (once)."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            # Templates rendered from inside another template are already timed
+            if metrics.template_depth == 0:
+                metrics.template_ms += (time.perf_counter() - start) * 1000
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """The Django template backend, timing renders into the current request."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def _count_cache_reads(hits, misses):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+class CacheMetricsMixin:
+    """Count ``get()`` hits and misses into the current request."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            _count_cache_reads(0, 1)
+            return default
+        _count_cache_reads(1, 0)
+        return value
+
+
+class LocMemCache(CacheMetricsMixin, locmem.LocMemCache):
+    # get_many() and the async methods go through get()
+    pass
+
+
+class RedisCache(CacheMetricsMixin, redis.RedisCache):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        _count_cache_reads(len(found), len(keys) - len(found))
+        return found
@@ -0,0 +1,30 @@
+# core/preferences.py
+"""
+Visitor preferences (language, currency) stored in signed cookies.
+
+Preferences never touch the session, so anonymous storefront requests
+neither load nor create session rows and their responses only vary on the
+cookies themselves.
+"""
+from django.conf import settings
+
+PREFERENCE_COOKIE_SALT = 'core.preferences'
+
+
+def get_preference_cookie(request, name):
+    """Return the value of signed preference cookie ``name``, or None if absent or tampered with."""
+    if request is None or name not in request.COOKIES:
+        return None
+    return request.get_signed_cookie(name, default=None, salt=PREFERENCE_COOKIE_SALT)
+
+
+def set_preference_cookie(response, name, value, max_age=None):
+    """Store a preference in a signed, site-wide cookie."""
+    response.set_signed_cookie(
+        name,
+        value,
+        salt=PREFERENCE_COOKIE_SALT,
+        max_age=max_age or settings.LANGUAGE_COOKIE_AGE,
+        samesite='Lax',
+        secure=settings.SESSION_COOKIE_SECURE,
+    )
@@ -0,0 +1,34 @@
+# core/signals.py
+"""
+Signal handlers invalidating the process-local snapshots of ``core.site_cache``
+and ``core.currency``, and instrumenting new database connections for
+``core.perf``.
+"""
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .currency import currency_snapshot
+from .models import AdvertisingBanner, Currency, SiteSettings
+from .perf import install_query_recorder
+from .site_cache import banners_snapshot, site_settings_snapshot
+
+
+@receiver([post_save, post_delete], sender=SiteSettings)
+def invalidate_site_settings(sender, **kwargs):
+    site_settings_snapshot.invalidate()
+
+
+@receiver([post_save, post_delete], sender=AdvertisingBanner)
+def invalidate_banners(sender, **kwargs):
+    banners_snapshot.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Currency)
+def invalidate_currencies(sender, **kwargs):
+    currency_snapshot.invalidate()
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    install_query_recorder(connection)
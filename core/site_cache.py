@@ -0,0 +1,119 @@
+# core/site_cache.py
+"""
+Process-local caches for rarely changing, read-on-every-request tables.
+
+Each :class:`LocalSnapshot` keeps its loaded value in worker memory and
+checks a version number in the shared Django cache before serving it.
+Writers call :meth:`LocalSnapshot.invalidate` (wired to ``post_save`` /
+``post_delete`` in ``core.signals``), which bumps the shared version after
+the transaction commits, so every worker process reloads on its next read.
+"""
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+
+class LocalSnapshot:
+    """A value loaded once per process and reloaded when its shared version changes.
+
+    ``loader`` returns ``(value, expires_at)``; ``expires_at`` is an optional
+    epoch timestamp after which the value is reloaded even without a version
+    bump (used for time-windowed content such as scheduled banners).
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self.loader = loader
+        self.version_key = f'core:snapshot:{name}:version'
+        self._lock = threading.Lock()
+        self._entry = None  # (version, value, expires_at)
+
+    def version(self) -> str:
+        """Return the shared version of this snapshot (cache only, never the database)."""
+        version = cache.get(self.version_key)
+        if version is None:
+            # Cold or evicted cache: publish a version so all workers agree on one
+            cache.add(self.version_key, uuid.uuid4().hex, None)
+            version = cache.get(self.version_key)
+        return version
+
+    async def aversion(self) -> str:
+        """Async :meth:`version`, using the cache's async API so the event loop is not blocked."""
+        version = await cache.aget(self.version_key)
+        if version is None:
+            await cache.aadd(self.version_key, uuid.uuid4().hex, None)
+            version = await cache.aget(self.version_key)
+        return version
+
+    def get(self) -> Any:
+        version = self.version()
+        entry = self._entry
+        if entry is not None and entry[0] == version and (entry[2] is None or entry[2] > time.time()):
+            return entry[1]
+        with self._lock:
+            entry = self._entry
+            if entry is not None and entry[0] == version and (entry[2] is None or entry[2] > time.time()):
+                return entry[1]
+            value, expires_at = self.loader()
+            self._entry = (version, value, expires_at)
+            return value
+
+    async def aget(self) -> Any:
+        """Async :meth:`get`; only a reload leaves the event loop for a thread."""
+        version = await cache.aget(self.version_key)
+        entry = self._entry
+        if (version is not None and entry is not None and entry[0] == version
+                and (entry[2] is None or entry[2] > time.time())):
+            return entry[1]
+        return await sync_to_async(self.get)()
+
+    def clear_local(self) -> None:
+        self._entry = None
+
+    def invalidate(self) -> None:
+        """Drop this worker's copy now and every other worker's after commit."""
+        self.clear_local()
+        transaction.on_commit(lambda: cache.set(self.version_key, uuid.uuid4().hex, None))
+
+
+def _load_site_settings():
+    from .models import SiteSettings
+    return SiteSettings.get_settings(), None
+
+
+def _load_banners():
+    """Return the banners live right now and when that set next changes."""
+    from .models import AdvertisingBanner
+
+    now = timezone.now()
+    active = AdvertisingBanner.objects.filter(is_active=True)
+    banners = tuple(
+        active.filter(Q(start_date__isnull=True) | Q(start_date__lte=now))
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=now))
+    )
+    # The set changes when a scheduled banner starts or a live one ends
+    next_start = active.filter(start_date__gt=now).aggregate(next=Min('start_date'))['next']
+    boundaries = [b.end_date for b in banners if b.end_date] + ([next_start] if next_start else [])
+    expires_at = min(boundaries).timestamp() if boundaries else None
+    return banners, expires_at
+
+
+site_settings_snapshot = LocalSnapshot('site_settings', _load_site_settings)
+banners_snapshot = LocalSnapshot('advertising_banners', _load_banners)
+
+
+def get_site_settings() -> Optional[Any]:
+    """Return the cached SiteSettings row (shared between requests: treat as read-only)."""
+    return site_settings_snapshot.get()
+
+
+def get_active_banners():
+    """Return the cached tuple of currently live advertising banners."""
+    return banners_snapshot.get()
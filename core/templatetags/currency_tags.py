@@ -1,6 +1,6 @@
 from django import template
-from django.conf import settings
-from decimal import Decimal
+
+from core.currency import BASE_CURRENCY, get_currency_table
 
 register = template.Library()
 
@@ -14,29 +14,13 @@ def currency(value, currency_code=None):
     if value is None:
         return ''
 
+    table = get_currency_table()
+    info = table.lookup(currency_code or BASE_CURRENCY) or table.default
     try:
-        value = Decimal(str(value))
-    except:
+        return info.format_from_rwf(value)
+    except ValueError:
         return value
 
-    if currency_code is None:
-        currency_code = 'RWF'
-
-    currency_info = settings.SUPPORTED_CURRENCIES.get(currency_code, {})
-    symbol = currency_info.get('symbol', currency_code)
-    rate = Decimal(str(currency_info.get('rate', 1.0)))
-
-    converted_value = value * rate
-
-    # Format based on currency
-    if currency_code in ['JPY', 'KES', 'UGX', 'TZS', 'RWF']:
-        # No decimal places for these currencies
-        formatted = f"{symbol} {converted_value:,.0f}"
-    else:
-        formatted = f"{symbol}{converted_value:,.2f}"
-
-    return formatted
-
 
 @register.simple_tag(takes_context=True)
 def price_in_currency(context, value):
@@ -47,24 +31,12 @@ def price_in_currency(context, value):
     if value is None:
         return ''
 
+    current_currency = context.get('current_currency') or get_currency_table().default
     try:
-        value = Decimal(str(value))
-    except:
+        return current_currency.format_from_rwf(value)
+    except ValueError:
         return value
 
-    # Get current currency from context
-    current_currency = context.get('current_currency')
-    if not current_currency:
-        return f"RWF {value:,.0f}"
-
-    converted = current_currency.convert_from_rwf(value)
-    symbol = current_currency.symbol
-
-    if current_currency.decimal_places == 0:
-        return f"{symbol} {converted:,.0f}"
-    else:
-        return f"{symbol}{converted:,.2f}"
-
 
 @register.filter
 def convert_currency(value, currency_obj):
@@ -76,12 +48,10 @@ def convert_currency(value, currency_obj):
         return value
 
     try:
-        value = Decimal(str(value))
-    except:
+        return currency_obj.convert_from_rwf(value)
+    except ValueError:
         return value
 
-    return currency_obj.convert_from_rwf(value)
-
 
 @register.inclusion_tag('core/currency_selector.html', takes_context=True)
 def currency_selector(context):
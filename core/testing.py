@@ -0,0 +1,108 @@
+# core/testing.py
+"""
+Test helpers for query-budget regression tests.
+
+``QueryBudgetMixin`` replaces ``assertNumQueries`` with a version whose
+failure message groups the executed queries by SQL fingerprint (literals
+replaced by ``?``), so an N+1 shows up as one line repeated N times instead
+of a wall of near-identical statements. ``assertQueryBudgets`` checks a set
+of pages against fixed budgets before and after the fixture grows, which is
+what makes a budget independent of the row count.
+"""
+import re
+from collections import Counter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql: str) -> str:
+    """Normalize ``sql`` so statements differing only in literals compare equal."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def format_queries_by_fingerprint(queries) -> str:
+    """Render captured queries grouped by fingerprint, most repeated first."""
+    counts = Counter(fingerprint(q['sql']) for q in queries)
+    examples = {}
+    for q in queries:
+        examples.setdefault(fingerprint(q['sql']), q['sql'])
+    lines = []
+    for sql, count in counts.most_common():
+        lines.append(f'{count:>4}x {sql}')
+        if count > 1:
+            lines.append(f'       e.g. {examples[sql]}')
+    return '\n'.join(lines)
+
+
+class _FingerprintNumQueriesContext(CaptureQueriesContext):
+    def __init__(self, test_case, num, connection):
+        self.test_case = test_case
+        self.num = num
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        if executed != self.num:
+            self.test_case.fail(
+                f'{executed} queries executed, {self.num} expected. Queries by fingerprint:\n'
+                + format_queries_by_fingerprint(self.captured_queries)
+            )
+
+
+class QueryBudgetMixin:
+    """``TestCase`` mixin for asserting fixed per-view query budgets.
+
+    The test case must define ``grow_fixture()``, adding more rows of
+    everything the pages under test list; :meth:`assertQueryBudgets` calls it
+    between its two passes.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if not callable(getattr(cls, 'grow_fixture', None)):
+            raise ImproperlyConfigured(
+                f'{cls.__name__} uses QueryBudgetMixin but defines no grow_fixture(); without it '
+                'the budgets are never checked against a larger fixture.'
+            )
+        super().setUpClass()
+
+    def assertNumQueries(self, num, func=None, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+        context = _FingerprintNumQueriesContext(self, num, connections[using])
+        if func is None:
+            return context
+        with context:
+            func(*args, **kwargs)
+
+    def assertQueryBudgets(self, budgets, status_code=200):
+        """Assert ``{url: budget}`` for GET requests, before and after :meth:`grow_fixture`.
+
+        Each page is requested once first so one-off per-process loads
+        (site settings, currency snapshots) do not count against it.
+        Streaming responses are read to the end inside the budget, since
+        their queries run while the body is generated.
+        """
+        for url in budgets:
+            self.client.get(url)
+        for rows in ('small', 'grown'):
+            if rows == 'grown':
+                self.grow_fixture()
+            for url, budget in budgets.items():
+                with self.subTest(url=url, rows=rows):
+                    with self.assertNumQueries(budget):
+                        response = self.client.get(url)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                    self.assertEqual(response.status_code, status_code)
@@ -0,0 +1,326 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import AdvertisingBanner, SiteSettings
+from .site_cache import banners_snapshot, get_active_banners, get_site_settings, site_settings_snapshot
+
+
+class SiteCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site_settings_snapshot.clear_local()
+        banners_snapshot.clear_local()
+
+    def test_settings_and_banners_are_served_from_memory(self):
+        get_site_settings()
+        get_active_banners()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_site_settings().pk, 1)
+            self.assertEqual(get_active_banners(), ())
+
+    def test_banner_date_window_is_applied_in_query(self):
+        now = timezone.now()
+        live = AdvertisingBanner.objects.create(title='Live', image='a.png', end_date=now + timedelta(days=1))
+        AdvertisingBanner.objects.create(title='Future', image='b.png', start_date=now + timedelta(days=1))
+        AdvertisingBanner.objects.create(title='Expired', image='c.png', end_date=now - timedelta(days=1))
+        AdvertisingBanner.objects.create(title='Off', image='d.png', is_active=False)
+        self.assertEqual(list(get_active_banners()), [live])
+
+    def test_saves_invalidate_snapshots(self):
+        get_active_banners()
+        banner = AdvertisingBanner.objects.create(title='New', image='a.png')
+        self.assertEqual(list(get_active_banners()), [banner])
+
+        site = SiteSettings.get_settings()
+        get_site_settings()
+        site.site_name = 'Renamed'
+        site.save()
+        self.assertEqual(get_site_settings().site_name, 'Renamed')
+
+    def test_other_workers_reload_on_version_bump(self):
+        get_site_settings()
+        # Another process saved the row and bumped the shared version
+        SiteSettings.objects.filter(pk=1).update(site_name='Updated elsewhere')
+        cache.set(site_settings_snapshot.version_key, 'bumped', None)
+        self.assertEqual(get_site_settings().site_name, 'Updated elsewhere')
+
+    def test_context_is_lazy(self):
+        from .context_processors import site_settings
+        with self.assertNumQueries(0):
+            context = site_settings(None)
+        self.assertEqual(context['site_settings'].pk, 1)
+
+
+class CurrencyContextTests(TestCase):
+    def setUp(self):
+        from .currency import currency_snapshot
+        from .models import Currency
+        cache.clear()
+        currency_snapshot.clear_local()
+        Currency.objects.create(code='RWF', name='Rwandan Franc', symbol='RWF', exchange_rate=1, decimal_places=0)
+        Currency.objects.create(code='USD', name='US Dollar', symbol='$', exchange_rate='0.00077')
+
+    def _request(self, cookie=None):
+        from django.conf import settings
+        from django.test import RequestFactory
+        request = RequestFactory().get('/')
+        if cookie:
+            from django.core.signing import get_cookie_signer
+            from .preferences import PREFERENCE_COOKIE_SALT
+            name = settings.CURRENCY_COOKIE_NAME
+            request.COOKIES[name] = get_cookie_signer(salt=name + PREFERENCE_COOKIE_SALT).sign(cookie)
+        return request
+
+    def test_steady_state_renders_issue_no_queries(self):
+        from .context_processors import currency_context
+        currency_context(self._request())
+        with self.assertNumQueries(0):
+            context = currency_context(self._request('USD'))
+        self.assertEqual(context['current_currency'].code, 'USD')
+        self.assertEqual([c.code for c in context['currencies']], ['RWF', 'USD'])
+
+    def test_unknown_or_inactive_cookie_falls_back_to_default(self):
+        from .context_processors import currency_context
+        from .models import Currency
+        Currency.objects.filter(code='USD').update(is_active=False)
+        self.assertEqual(currency_context(self._request('XYZ'))['current_currency'].code, 'RWF')
+        self.assertEqual(currency_context(self._request('USD'))['current_currency'].code, 'RWF')
+
+    def test_currency_save_rebuilds_snapshot(self):
+        from .currency import get_currency_table
+        from .models import Currency
+        get_currency_table()
+        usd = Currency.objects.get(code='USD')
+        usd.symbol = 'US$'
+        usd.save()
+        self.assertEqual(get_currency_table().get('USD').symbol, 'US$')
+
+
+class CurrencyEngineTests(TestCase):
+    def setUp(self):
+        from .currency import currency_snapshot
+        from .models import Currency
+        cache.clear()
+        currency_snapshot.clear_local()
+        Currency.objects.create(code='RWF', name='Rwandan Franc', symbol='RWF', exchange_rate=1, decimal_places=0)
+        Currency.objects.create(code='USD', name='US Dollar', symbol='$', exchange_rate='0.00077')
+        Currency.objects.create(code='EUR', name='Euro', symbol='€', exchange_rate='0.00071')
+
+    def test_decimal_conversion_and_formatting(self):
+        from decimal import Decimal
+        from .currency import get_currency_table
+        table = get_currency_table()
+        usd = table.get('USD')
+        self.assertEqual(usd.convert_from_rwf('1000000'), Decimal('770.00'))
+        self.assertEqual(usd.format_from_rwf(1000000), '$770.00')
+        self.assertEqual(table.get('RWF').format_from_rwf(Decimal('1234.5')), 'RWF 1,235')
+        self.assertEqual(table.convert('770', 'RWF', from_code='USD'), Decimal('1000000'))
+
+    def test_convert_many_matches_single_conversions(self):
+        from .currency import get_currency_table
+        table = get_currency_table()
+        amounts = ['1000', '2500.50', 99]
+        converted = table.convert_many(amounts, ['USD', 'EUR'])
+        for code in ('USD', 'EUR'):
+            self.assertEqual(converted[code], [table.convert(a, code) for a in amounts])
+
+    def test_filter_and_tag_use_the_engine(self):
+        from django.template import Context, Template
+        from .currency import get_currency_table
+        template = Template('{% load currency_tags %}{{ price|currency:"USD" }}|{% price_in_currency price %}')
+        context = Context({'price': 1000000, 'current_currency': get_currency_table().get('EUR')})
+        self.assertEqual(template.render(context), '$770.00|€710.00')
+
+    def test_batch_endpoint(self):
+        from django.urls import reverse
+        url = reverse('core:convert_prices')
+        self.client.get(url, {'amounts': '1', 'to': 'USD'})  # warm the snapshot
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, {'amounts': '1000000,2000000', 'to': 'USD,EUR'})
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data['conversions']['USD']['amounts'], [770.0, 1540.0])
+        self.assertEqual(data['conversions']['EUR']['formatted'], ['€710.00', '€1,420.00'])
+
+        resp = self.client.post(url, data='{"amounts": [1000000], "to": ["USD"]}', content_type='application/json')
+        self.assertEqual(resp.json()['conversions']['USD']['amounts'], [770.0])
+        self.assertEqual(self.client.get(url, {'amounts': 'x', 'to': 'USD'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'amounts': '1', 'to': 'XYZ'}).status_code, 400)
+
+    def test_bad_input_is_rejected(self):
+        from django.urls import reverse
+        self.assertEqual(self.client.get(reverse('core:convert_price'), {'amount': '1e30'}).status_code, 400)
+        url = reverse('core:convert_prices')
+        self.assertEqual(self.client.get(url, {'amounts': '1e30', 'to': 'USD'}).status_code, 400)
+        for body in ('{"amounts": [1], "to": [["USD"]]}', '{"amounts": [1], "to": ["USD"], "from": ["RWF"]}'):
+            resp = self.client.post(url, data=body, content_type='application/json')
+            self.assertEqual(resp.status_code, 400, body)
+        # The cap leaves room for the largest cross rate
+        self.assertEqual(self.client.get(url, {'amounts': '1e15', 'to': 'RWF', 'from': 'EUR'}).status_code, 200)
+
+
+class ExchangeRateCachingTests(TestCase):
+    def setUp(self):
+        from .currency import currency_snapshot
+        from .models import Currency
+        cache.clear()
+        currency_snapshot.clear_local()
+        Currency.objects.create(code='USD', name='US Dollar', symbol='$', exchange_rate='0.00077')
+
+    def test_etag_revalidation_skips_the_database(self):
+        from django.urls import reverse
+        url = reverse('core:exchange_rates')
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('public', resp['Cache-Control'])
+        self.assertIn('max-age', resp['Cache-Control'])
+        etag = resp['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        from .currency import currency_snapshot
+        currency_snapshot.clear_local()  # a 304 must not need the snapshot either
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_rate_change_changes_etag(self):
+        from django.urls import reverse
+        from .models import Currency
+        url = reverse('core:convert_price')
+        etag = self.client.get(url, {'amount': 1000, 'to': 'USD'})['ETag']
+        self.assertNotEqual(self.client.get(url, {'amount': 2000, 'to': 'USD'})['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usd = Currency.objects.get(code='USD')
+            usd.exchange_rate = '0.00080'
+            usd.save()
+        resp = self.client.get(url, {'amount': 1000, 'to': 'USD'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['converted_amount'], 0.8)
+
+
+class AnonymousSessionTests(TestCase):
+    def setUp(self):
+        from products.models import Product
+        from .currency import currency_snapshot
+        from .models import Currency
+        from django.contrib.auth import get_user_model
+        cache.clear()
+        currency_snapshot.clear_local()
+        Currency.objects.create(code='USD', name='US Dollar', symbol='$', exchange_rate='0.00077')
+        vendor = get_user_model().objects.create_user(username='vendor1', password='pass', user_type='vendor')
+        self.product = Product.objects.create(vendor=vendor, name='Mahogany Table', price=100000, stock=5)
+
+    def test_browse_and_search_never_write_sessions(self):
+        from django.conf import settings
+        from django.contrib.sessions.models import Session
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+
+        flow = [
+            reverse('home_page'),
+            reverse('core:set_currency') + '?currency=USD&next=/',
+            reverse('core:set_language') + '?language=fr&next=/',
+            reverse('products:product_list') + '?q=Mahogany',
+            reverse('products:product_detail', args=[self.product.pk]),
+            reverse('pages:about'),
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            for url in flow:
+                resp = self.client.get(url)
+                self.assertIn(resp.status_code, (200, 302), url)
+                self.assertNotIn(settings.SESSION_COOKIE_NAME, resp.cookies, url)
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'django_session' in q['sql']])
+        self.assertEqual(Session.objects.count(), 0)
+
+        # The signed preference cookies drive the next render
+        resp = self.client.get(reverse('products:product_list') + '?q=Mahogany')
+        self.assertEqual(resp.context['current_currency'].code, 'USD')
+        self.assertEqual(resp['Content-Language'], 'fr')
+
+    def test_tampered_preference_cookies_are_ignored(self):
+        from django.conf import settings
+        from django.urls import reverse
+        self.client.cookies[settings.CURRENCY_COOKIE_NAME] = 'USD'
+        self.client.cookies[settings.LANGUAGE_COOKIE_NAME] = 'fr'
+        resp = self.client.get(reverse('products:product_list'))
+        self.assertEqual(resp.context['current_currency'].code, 'RWF')
+        self.assertEqual(resp['Content-Language'], 'en')
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        cache.clear()
+        self.staff = get_user_model().objects.create_user(username='staff', password='pass', is_staff=True)
+
+    def test_server_timing_header_for_staff_only(self):
+        from django.urls import reverse
+        url = reverse('pages:about')
+        self.assertNotIn('Server-Timing', self.client.get(url))
+
+        self.client.force_login(self.staff)
+        header = self.client.get(url)['Server-Timing']
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(header, r'tpl;dur=[\d.]+')
+        self.assertRegex(header, r'cache;desc="\d+ hits, \d+ misses"')
+        self.assertRegex(header, r'total;dur=[\d.]+')
+
+    def test_server_timing_mode_setting(self):
+        from django.urls import reverse
+        url = reverse('pages:about')
+        with override_settings(PERF_SERVER_TIMING='all'):
+            self.assertIn('Server-Timing', self.client.get(url))
+        self.client.force_login(self.staff)
+        with override_settings(PERF_SERVER_TIMING='off'):
+            self.assertNotIn('Server-Timing', self.client.get(url))
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0, PERF_SLOW_TOP_QUERIES=2)
+    def test_slow_request_logs_top_queries(self):
+        import json
+        from django.urls import reverse
+        self.client.force_login(self.staff)
+        with self.assertLogs('core.perf', 'WARNING') as logs:
+            self.client.get(reverse('pages:about'))
+        entry = json.loads(logs.records[0].getMessage().split(' ', 2)[2])
+        self.assertEqual(entry['path'], reverse('pages:about'))
+        self.assertGreater(entry['queries'], 0)
+        self.assertLessEqual(len(entry['top_queries']), 2)
+        self.assertIn('sql', entry['top_queries'][0])
+
+    def test_cache_reads_are_counted(self):
+        from . import perf
+        metrics = perf.RequestMetrics()
+        token = perf.activate(metrics)
+        try:
+            self.assertIsNone(cache.get('perf-test'))
+            cache.set('perf-test', 1)
+            self.assertEqual(cache.get_many(['perf-test', 'perf-other']), {'perf-test': 1})
+        finally:
+            perf.deactivate(token)
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (1, 2))
+
+
+class QueryFingerprintTests(TestCase):
+    def test_literals_are_normalized(self):
+        from .testing import fingerprint
+        self.assertEqual(
+            fingerprint("SELECT * FROM \"t1\" WHERE id = 5 AND name = 'it''s'"),
+            fingerprint("SELECT * FROM \"t1\" WHERE id = 17 AND name = 'x'"),
+        )
+        self.assertEqual(fingerprint('SELECT * FROM "t1"\n WHERE id IN (1, 2, 3)'), 'SELECT * FROM "t1" WHERE id IN (...)')
+
+
+class SharedCacheCheckTests(TestCase):
+    def test_local_memory_cache_is_flagged_with_several_workers(self):
+        from .checks import check_shared_cache
+        self.assertEqual(check_shared_cache(None), [])
+        with override_settings(MULTI_PROCESS=True, WEB_CONCURRENCY=4):
+            self.assertEqual([m.id for m in check_shared_cache(None)], ['core.W002'])
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                                       'LOCATION': 'redis://127.0.0.1:6379'}}):
+                self.assertEqual(check_shared_cache(None), [])
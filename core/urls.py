@@ -8,4 +8,5 @@ urlpatterns = [
     path('set-currency/', views.set_currency, name='set_currency'),
     path('api/exchange-rates/', views.get_exchange_rates, name='exchange_rates'),
     path('api/convert-price/', views.convert_price, name='convert_price'),
+    path('api/convert-prices/', views.convert_prices, name='convert_prices'),
 ]
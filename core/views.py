@@ -1,8 +1,16 @@
 from django.shortcuts import redirect
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST, require_http_methods
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
 from django.utils import translation
 from django.conf import settings
+from .preferences import set_preference_cookie
+import hashlib
+import json
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
 
 
 def set_language(request):
@@ -22,15 +30,9 @@ def set_language(request):
 
     response = redirect(next_url)
 
-    # Set language cookie
-    response.set_cookie(
-        settings.LANGUAGE_COOKIE_NAME,
-        lang_code,
-        max_age=settings.LANGUAGE_COOKIE_AGE
-    )
-
-    # Also store in session
-    request.session['django_language'] = lang_code
+    # Set language cookie (signed; the session is never touched so anonymous
+    # visitors do not get a session row)
+    set_preference_cookie(response, settings.LANGUAGE_COOKIE_NAME, lang_code, max_age=settings.LANGUAGE_COOKIE_AGE)
 
     return response
 
@@ -48,30 +50,81 @@ def set_currency(request):
 
     response = redirect(next_url)
 
-    # Set currency cookie
-    response.set_cookie(
-        settings.CURRENCY_COOKIE_NAME,
-        currency_code,
-        max_age=365 * 24 * 60 * 60  # 1 year
-    )
-
-    # Also store in session
-    request.session['currency'] = currency_code
+    # Set currency cookie (signed; read back by core.currency.get_request_currency)
+    set_preference_cookie(response, settings.CURRENCY_COOKIE_NAME, currency_code,
+                          max_age=365 * 24 * 60 * 60)  # 1 year
 
     return response
 
 
-def get_exchange_rates(request):
+def _rates_etag(request, *args, **kwargs):
+    """
+    Strong ETag for responses derived only from the currency table.
+
+    Built from the shared rate-table version (a cache read, no query) and
+    the query string, so ``If-None-Match`` revalidations are answered with a
+    304 before the view runs. POST bodies are not fingerprinted.
+    """
+    from .currency import currency_snapshot
+
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    return _rates_etag_for(request, currency_snapshot.version())
+
+
+async def _arates_etag(request):
+    """Async :func:`_rates_etag`; reads the rate-table version without blocking the event loop."""
+    from .currency import currency_snapshot
+
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    return _rates_etag_for(request, await currency_snapshot.aversion())
+
+
+def _rates_etag_for(request, version):
+    digest = hashlib.sha1(f'{version}?{request.GET.urlencode()}'.encode()).hexdigest()
+    return f'"rates-{digest[:20]}"'
+
+
+def rates_cache(view):
+    """Serve ``view`` with the rate-table ETag and, for GET, shared-cache Cache-Control headers."""
+    def add_headers(request, response):
+        if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+            patch_cache_control(response, public=True, max_age=settings.EXCHANGE_RATES_MAX_AGE)
+        return response
+
+    if iscoroutinefunction(view):
+        # condition() computes the ETag synchronously, which would block the event loop on the cache
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            etag = await _arates_etag(request)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if etag:
+                response.headers.setdefault('ETag', etag)
+            return add_headers(request, response)
+        return async_wrapper
+
+    conditional_view = condition(etag_func=_rates_etag)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return add_headers(request, conditional_view(request, *args, **kwargs))
+    return wrapper
+
+
+@rates_cache
+async def get_exchange_rates(request):
     """API endpoint to get current exchange rates"""
-    from .models import Currency
+    from .currency import aget_currency_table
 
-    currencies = Currency.objects.filter(is_active=True)
     rates = {c.code: {
         'name': c.name,
         'symbol': c.symbol,
         'rate': float(c.exchange_rate),
         'decimal_places': c.decimal_places
-    } for c in currencies}
+    } for c in (await aget_currency_table()).currencies}
 
     return JsonResponse({
         'base_currency': 'RWF',
@@ -79,34 +132,98 @@ def get_exchange_rates(request):
     })
 
 
-def convert_price(request):
+@rates_cache
+async def convert_price(request):
     """API endpoint to convert a price to a different currency"""
-    from .models import Currency
-    from decimal import Decimal
+    from .currency import aget_currency_table
 
     amount = request.GET.get('amount', 0)
     from_currency = request.GET.get('from', 'RWF')
     to_currency = request.GET.get('to', 'USD')
 
+    table = await aget_currency_table()
     try:
-        amount = Decimal(str(amount))
-    except:
+        converted_amount = table.convert(amount, to_currency, from_currency)
+    except (ValueError, ArithmeticError):
         return JsonResponse({'error': 'Invalid amount'}, status=400)
-
-    try:
-        from_curr = Currency.objects.get(code=from_currency)
-        to_curr = Currency.objects.get(code=to_currency)
-    except Currency.DoesNotExist:
+    except KeyError:
         return JsonResponse({'error': 'Invalid currency'}, status=400)
 
-    # Convert to RWF first, then to target currency
-    rwf_amount = from_curr.convert_to_rwf(amount)
-    converted_amount = to_curr.convert_from_rwf(rwf_amount)
-
     return JsonResponse({
         'original_amount': float(amount),
         'original_currency': from_currency,
-        'converted_amount': converted_amount,
+        'converted_amount': float(converted_amount),
         'converted_currency': to_currency,
-        'symbol': to_curr.symbol
+        'symbol': table.lookup(to_currency).symbol
+    })
+
+
+# Upper bound on amounts accepted by one convert_prices call
+MAX_BATCH_AMOUNTS = 500
+
+
+def _split_param(request, name):
+    """Read a list parameter given as repeated keys and/or comma-separated values."""
+    values = []
+    for raw in request.GET.getlist(name):
+        values.extend(v.strip() for v in raw.split(',') if v.strip())
+    return values
+
+
+@csrf_exempt  # read-only; lets API clients POST large batches without a CSRF token
+@require_http_methods(['GET', 'POST'])
+@rates_cache
+async def convert_prices(request):
+    """
+    API endpoint converting many amounts into many currencies in one call.
+
+    GET ``?amounts=1000,2500&to=USD,EUR&from=RWF`` or POST a JSON body
+    ``{"amounts": [...], "to": [...], "from": "RWF"}``. Amounts come back in
+    request order for each target currency, with formatted strings.
+    """
+    from .currency import BASE_CURRENCY, aget_currency_table
+
+    if request.method == 'POST':
+        try:
+            payload = json.loads(request.body or b'{}')
+            amounts = payload.get('amounts', [])
+            to_currencies = payload.get('to', [])
+            if isinstance(to_currencies, str):
+                to_currencies = to_currencies.split(',')
+            amounts, to_currencies = list(amounts), list(to_currencies)
+            from_currency = payload.get('from', BASE_CURRENCY)
+        except (ValueError, TypeError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    else:
+        amounts = _split_param(request, 'amounts')
+        to_currencies = _split_param(request, 'to')
+        from_currency = request.GET.get('from', BASE_CURRENCY)
+
+    if not amounts or not to_currencies:
+        return JsonResponse({'error': 'amounts and to are required'}, status=400)
+    if len(amounts) > MAX_BATCH_AMOUNTS:
+        return JsonResponse({'error': f'At most {MAX_BATCH_AMOUNTS} amounts per request'}, status=400)
+
+    table = await aget_currency_table()
+    try:
+        converted = table.convert_many(amounts, to_currencies, from_currency)
+    except (ValueError, ArithmeticError):
+        return JsonResponse({'error': 'Invalid amount'}, status=400)
+    except KeyError as e:
+        return JsonResponse({'error': f'Invalid currency: {e.args[0]!s}'}, status=400)
+
+    conversions = {}
+    for code, values in converted.items():
+        info = table.lookup(code)
+        conversions[code] = {
+            'symbol': info.symbol,
+            'decimal_places': info.decimal_places,
+            'amounts': [float(v) for v in values],
+            'formatted': [info.format(v) for v in values],
+        }
+
+    return JsonResponse({
+        'original_currency': from_currency,
+        'original_amounts': [float(a) for a in amounts],
+        'conversions': conversions,
     })
@@ -0,0 +1,87 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings for SokoHub, tuned from the environment and CPU count.
+
+    gunicorn --config gunicorn.conf.py
+
+Environment variables:
+    GUNICORN_WORKER_CLASS  sync | gthread | uvicorn (default)
+    WEB_CONCURRENCY        worker processes (default depends on the class)
+    GUNICORN_THREADS       threads per gthread worker (default 4)
+    GUNICORN_TIMEOUT       seconds before a silent worker is killed (default 30)
+    GUNICORN_KEEPALIVE     seconds to hold idle keep-alive connections (default 5)
+    GUNICORN_MAX_REQUESTS  requests before a worker is recycled (default 1000, 0 disables)
+    GUNICORN_PRELOAD       load the app before forking (default true)
+    PORT                   listen port (default 8000)
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+cpu_count = multiprocessing.cpu_count()
+worker_kind = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn').lower()
+
+if worker_kind == 'uvicorn':
+    # ASGI: one event loop per core; the async Stripe, tracking and rate views do not
+    # hold a worker while waiting on I/O (sync views run in a thread per worker)
+    wsgi_app = 'SokoHub.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = _env_int('WEB_CONCURRENCY', cpu_count + 1)
+elif worker_kind == 'sync':
+    # CPU-bound request handling: the classic (2 x cores) + 1
+    wsgi_app = 'SokoHub.wsgi:application'
+    worker_class = 'sync'
+    workers = _env_int('WEB_CONCURRENCY', cpu_count * 2 + 1)
+elif worker_kind == 'gthread':
+    # Mixed I/O (database, Stripe, email): fewer processes, several threads each
+    wsgi_app = 'SokoHub.wsgi:application'
+    worker_class = 'gthread'
+    workers = _env_int('WEB_CONCURRENCY', cpu_count + 1)
+    threads = _env_int('GUNICORN_THREADS', 4)
+else:
+    raise RuntimeError(f'Unknown GUNICORN_WORKER_CLASS: {worker_kind!r} (use sync, gthread or uvicorn)')
+
+# Tell the Django settings how many processes share the app (see MULTI_PROCESS)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# Import Django once in the master so workers share its memory pages copy-on-write
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Recycle workers periodically to bound memory growth; jitter avoids all
+# workers restarting at the same moment
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', max(max_requests // 10, 0))
+
+# Heartbeat files on tmpfs so a slow disk cannot make healthy workers look hung
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Never share database sockets opened in the master across forked workers
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def when_ready(server):
+    server.log.info(
+        f'{worker_kind}: {workers} worker(s)'
+        + (f' x {threads} thread(s)' if worker_kind == 'gthread' else '')
+        + f', preload={preload_app}, max_requests={max_requests}+{max_requests_jitter}'
+    )
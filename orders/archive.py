@@ -0,0 +1,161 @@
+# orders/archive.py
+"""
+Moving finished orders out of the live tables.
+
+A completed or cancelled order older than the cut-off is copied, with its
+sub-orders, items, purchases, purchase logs and delivery tracking, into the
+``Archived*`` tables and then deleted from the live ones, one chunk of
+orders per transaction. Purchases with no order (mock checkout and legacy
+rows) are moved by age on their own, with their logs. Copies are ``INSERT ... SELECT`` by column name and
+deletes are plain ``DELETE`` statements: the rows never pass through Python,
+and the ``Purchase`` delete signals (which would take the sales out of the
+daily rollup) do not fire. Rollups keep counting archived sales.
+"""
+from datetime import timedelta
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedPurchase, ArchivedPurchaseLog,
+    Order, OrderItem, OrderVendor, Purchase, PurchaseLog, QueuedEmail, StripeWebhookEvent,
+)
+
+ARCHIVE_STATUSES = [Order.STATUS_COMPLETED, Order.STATUS_CANCELLED]
+
+
+def archive_cutoff(days: Optional[int] = None):
+    """Orders created before this moment may be archived (``ORDER_ARCHIVE_AFTER_DAYS`` by default)."""
+    if days is None:
+        days = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_orders(before):
+    """Top-level finished orders created before ``before``; sub-orders move with their parent."""
+    return Order.objects.filter(parent=None, status__in=ARCHIVE_STATUSES, created_at__lt=before)
+
+
+def archivable_purchases(before):
+    """Purchases with no order created before ``before``; the rest move with their order."""
+    return Purchase.objects.filter(order=None, created_at__lt=before)
+
+
+def _in(column: str, ids: List[int]) -> str:
+    return f"{connection.ops.quote_name(column)} IN ({', '.join(['%s'] * len(ids))})"
+
+
+def _table(model) -> str:
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _copy(cursor, source, target, where: str, params) -> None:
+    """Copy rows of ``source`` matching ``where`` into ``target``, column for column."""
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in target._meta.concrete_fields)
+    cursor.execute(
+        f'INSERT INTO {_table(target)} ({columns}) SELECT {columns} FROM {_table(source)} WHERE {where}',
+        params,
+    )
+
+
+def _delete(cursor, model, where: str, params) -> None:
+    cursor.execute(f'DELETE FROM {_table(model)} WHERE {where}', params)
+
+
+def archive_batch(parent_ids: List[int]) -> int:
+    """Move the given top-level orders and everything hanging off them; returns orders moved."""
+    from core.models import (
+        ArchivedDeliveryTracking, ArchivedDeliveryTrackingHistory, DeliveryTracking, DeliveryTrackingHistory,
+    )
+
+    order_ids = list(parent_ids) + list(Order.objects.filter(parent_id__in=parent_ids).values_list('id', flat=True))
+    by_order = _in('order_id', order_ids)
+    purchase_ids = f"{connection.ops.quote_name('purchase_id')} IN (SELECT id FROM {_table(Purchase)} WHERE {by_order})"
+    tracking_ids = f"{connection.ops.quote_name('tracking_id')} IN (SELECT id FROM {_table(DeliveryTracking)} WHERE {by_order})"
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        _copy(cursor, Order, ArchivedOrder, _in('id', order_ids), order_ids)
+        _copy(cursor, OrderItem, ArchivedOrderItem, by_order, order_ids)
+        _copy(cursor, Purchase, ArchivedPurchase, by_order, order_ids)
+        _copy(cursor, PurchaseLog, ArchivedPurchaseLog, purchase_ids, order_ids)
+        _copy(cursor, DeliveryTracking, ArchivedDeliveryTracking, by_order, order_ids)
+        _copy(cursor, DeliveryTrackingHistory, ArchivedDeliveryTrackingHistory, tracking_ids, order_ids)
+
+        # Dependent rows first; webhook events keep their payload and lose the link
+        _delete(cursor, DeliveryTrackingHistory, tracking_ids, order_ids)
+        _delete(cursor, DeliveryTracking, by_order, order_ids)
+        _delete(cursor, QueuedEmail, purchase_ids, order_ids)
+        _delete(cursor, PurchaseLog, purchase_ids, order_ids)
+        _delete(cursor, Purchase, by_order, order_ids)
+        _delete(cursor, OrderVendor, by_order, order_ids)
+        _delete(cursor, OrderItem, by_order, order_ids)
+        cursor.execute(f'UPDATE {_table(StripeWebhookEvent)} SET order_id = NULL WHERE {by_order}', order_ids)
+        _delete(cursor, Order, _in('id', order_ids), order_ids)
+    return len(order_ids)
+
+
+def archive_purchase_batch(purchase_ids: List[int]) -> int:
+    """Move the given order-less purchases and their logs; returns purchases moved."""
+    by_id = _in('id', purchase_ids)
+    by_purchase = _in('purchase_id', purchase_ids)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        _copy(cursor, Purchase, ArchivedPurchase, by_id, purchase_ids)
+        _copy(cursor, PurchaseLog, ArchivedPurchaseLog, by_purchase, purchase_ids)
+
+        _delete(cursor, QueuedEmail, by_purchase, purchase_ids)
+        _delete(cursor, PurchaseLog, by_purchase, purchase_ids)
+        _delete(cursor, Purchase, by_id, purchase_ids)
+    return len(purchase_ids)
+
+
+def _archive_in_batches(candidates, archive: Callable[[List[int]], int], batch_size: int,
+                        limit: Optional[int], progress: Optional[Callable[[int], None]]) -> int:
+    moved = taken = 0
+    candidates = candidates.order_by().values_list('id', flat=True)
+    while limit is None or taken < limit:
+        size = batch_size if limit is None else min(batch_size, limit - taken)
+        ids = list(candidates[:size])
+        if not ids:
+            break
+        moved += archive(ids)
+        taken += len(ids)
+        if progress:
+            progress(moved)
+    return moved
+
+
+def archive_orders(before, batch_size: int = 500, limit: Optional[int] = None,
+                   progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Archive every finished order created before ``before``.
+
+    Args:
+        before: Cut-off datetime, usually ``archive_cutoff()``
+        batch_size: Top-level orders moved per transaction
+        limit: Stop after this many top-level orders (None for all)
+        progress: Called with the running total of orders moved after each batch
+
+    Returns:
+        int: Orders moved, sub-orders included
+    """
+    return _archive_in_batches(archivable_orders(before), archive_batch, batch_size, limit, progress)
+
+
+def archive_purchases(before, batch_size: int = 500, limit: Optional[int] = None,
+                      progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Archive every purchase with no order created before ``before``.
+
+    Args:
+        before: Cut-off datetime, usually ``archive_cutoff()``
+        batch_size: Purchases moved per transaction
+        limit: Stop after this many purchases (None for all)
+        progress: Called with the running total of purchases moved after each batch
+
+    Returns:
+        int: Purchases moved
+    """
+    return _archive_in_batches(archivable_purchases(before), archive_purchase_batch, batch_size, limit, progress)
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Move completed and cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS, with their items, '
+            'purchases, logs and tracking, and older purchases with no order, into the archive tables '
+            '(run from cron). Archived orders leave the vendor order inbox; the company admin pages '
+            'and My Orders keep listing them')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive orders created more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders (or purchases) moved per transaction')
+        parser.add_argument('--limit', type=int,
+                            help='Stop after this many orders, and as many order-less purchases (default: all)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the orders and purchases that would move')
+
+    def handle(self, *args, **options):
+        from orders.archive import (
+            archivable_orders, archivable_purchases, archive_cutoff, archive_orders, archive_purchases,
+        )
+
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        before = archive_cutoff(options['days'])
+
+        if options['dry_run']:
+            count = archivable_orders(before).count()
+            purchases = archivable_purchases(before).count()
+            self.stdout.write(f'{count} order(s) and {purchases} order-less purchase(s) created before '
+                              f'{before:%Y-%m-%d %H:%M} would be archived')
+            return
+
+        verbosity = options['verbosity']
+
+        def progress(label):
+            def report(moved):
+                if verbosity > 1:
+                    self.stdout.write(f'  {moved} {label} archived')
+            return report
+
+        moved = archive_orders(before, batch_size=options['batch_size'], limit=options['limit'],
+                               progress=progress('order(s)'))
+        purchases = archive_purchases(before, batch_size=options['batch_size'], limit=options['limit'],
+                                      progress=progress('purchase(s)'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} order(s) and {purchases} order-less purchase(s) created before {before:%Y-%m-%d %H:%M}'
+        ))
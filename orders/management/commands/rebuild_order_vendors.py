@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+
+class Command(BaseCommand):
+    help = 'Recompute the OrderVendor rows from OrderItem rows'
+
+    def handle(self, *args, **options):
+        from orders.models import Order, OrderItem, OrderVendor
+        from products.models import Product
+
+        # One INSERT ... SELECT: the aggregate never leaves the database, which
+        # matters at millions of order lines
+        sql = (
+            f'INSERT INTO {OrderVendor._meta.db_table} '
+            '(order_id, vendor_id, status, created_at, subtotal, item_count, quantity) '
+            'SELECT i.order_id, p.vendor_id, o.status, o.created_at, '
+            'SUM(i.price * i.quantity), COUNT(*), SUM(i.quantity) '
+            f'FROM {OrderItem._meta.db_table} i '
+            f'JOIN {Product._meta.db_table} p ON p.id = i.product_id '
+            f'JOIN {Order._meta.db_table} o ON o.id = i.order_id '
+            'GROUP BY i.order_id, p.vendor_id, o.status, o.created_at'
+        )
+        with transaction.atomic():
+            deleted, _ = OrderVendor.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
+                created = cursor.rowcount
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt order vendors: removed {deleted} row(s), wrote {created} row(s)'))
@@ -0,0 +1,80 @@
+import heapq
+from datetime import date
+from itertools import groupby
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+class Command(BaseCommand):
+    help = 'Recompute the DailySalesSummary rollup from Purchase and ArchivedPurchase rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=str, help='Only rebuild buckets on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        from orders.models import ArchivedPurchase, DailySalesSummary, Purchase
+
+        since = None
+        if options.get('since'):
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        refunded = Q(refunded=True)
+        bucket = ['day', 'product__vendor', 'product', 'payment_method']
+        sums = ['units', 'gross', 'order_count', 'refunded_units', 'refunded_amount', 'refund_count']
+        sources = []
+        for model in (Purchase, ArchivedPurchase):
+            rows = model.objects.annotate(day=TruncDate('created_at'))
+            if since:
+                rows = rows.filter(day__gte=since)
+            sources.append(rows.values(*bucket).annotate(
+                units=Sum('quantity'),
+                gross=Sum('amount'),
+                order_count=Count('id'),
+                refunded_units=Sum('quantity', filter=refunded),
+                refunded_amount=Sum('amount', filter=refunded),
+                refund_count=Count('id', filter=refunded),
+            ).order_by(*bucket))
+
+        batch_size = options['batch_size']
+        created = 0
+        with transaction.atomic():
+            existing = DailySalesSummary.objects.all()
+            if since:
+                existing = existing.filter(date__gte=since)
+            deleted, _ = existing.delete()
+
+            # Both sources are sorted by bucket; a bucket may have live and archived sales
+            key = lambda row: tuple(row[field] for field in bucket)
+            merged = heapq.merge(*(source.iterator(chunk_size=batch_size) for source in sources), key=key)
+            batch = []
+            for _, group in groupby(merged, key=key):
+                group = list(group)
+                row = {**group[0], **{field: sum(r[field] or 0 for r in group) for field in sums}}
+                batch.append(DailySalesSummary(
+                    date=row['day'],
+                    vendor_id=row['product__vendor'],
+                    product_id=row['product'],
+                    payment_method=row['payment_method'],
+                    units=row['units'] or 0,
+                    gross=row['gross'] or 0,
+                    order_count=row['order_count'],
+                    refunded_units=row['refunded_units'] or 0,
+                    refunded_amount=row['refunded_amount'] or 0,
+                    refund_count=row['refund_count'],
+                ))
+                if len(batch) >= batch_size:
+                    DailySalesSummary.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                DailySalesSummary.objects.bulk_create(batch)
+                created += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollup: removed {deleted} row(s), wrote {created} row(s)'))
@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Recompute VendorStats for every vendor (run daily to re-age the 30-day sales window)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk upsert')
+
+    def handle(self, *args, **options):
+        from orders.models import DailySalesSummary, VendorStats
+        from orders.rollups import RECENT_SALES_DAYS
+        from products.models import Product
+
+        User = get_user_model()
+        vendor_ids = set(User.objects.filter(user_type='vendor').values_list('id', flat=True))
+        vendor_ids.update(Product.objects.order_by().values_list('vendor_id', flat=True).distinct())
+
+        products = {
+            row['vendor']: row
+            for row in Product.objects.order_by().values('vendor').annotate(
+                product_count=Count('id'),
+                active_product_count=Count('id', filter=Q(status=Product.STATUS_ACTIVE)),
+                out_of_stock_count=Count('id', filter=Q(stock=0)),
+            )
+        }
+        since = timezone.localdate() - timedelta(days=RECENT_SALES_DAYS - 1)
+        net = F('gross') - F('refunded_amount')
+        sales = {
+            row['vendor']: row
+            for row in DailySalesSummary.objects.values('vendor').annotate(
+                lifetime_sales=Sum(net),
+                sales_30d=Sum(net, filter=Q(date__gte=since)),
+                order_count=Sum('order_count'),
+            )
+        }
+
+        stats = []
+        for vendor_id in vendor_ids:
+            p = products.get(vendor_id, {})
+            s = sales.get(vendor_id, {})
+            stats.append(VendorStats(
+                vendor_id=vendor_id,
+                product_count=p.get('product_count', 0),
+                active_product_count=p.get('active_product_count', 0),
+                out_of_stock_count=p.get('out_of_stock_count', 0),
+                lifetime_sales=s.get('lifetime_sales') or 0,
+                sales_30d=s.get('sales_30d') or 0,
+                order_count=s.get('order_count') or 0,
+            ))
+
+        with transaction.atomic():
+            VendorStats.objects.exclude(vendor_id__in=vendor_ids).delete()
+            VendorStats.objects.bulk_create(
+                stats,
+                batch_size=options['batch_size'],
+                update_conflicts=True,
+                unique_fields=['vendor'],
+                update_fields=[
+                    'product_count', 'active_product_count', 'out_of_stock_count',
+                    'lifetime_sales', 'sales_30d', 'order_count', 'updated_at',
+                ],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Refreshed stats for {len(stats)} vendor(s)'))
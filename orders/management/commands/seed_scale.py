@@ -0,0 +1,377 @@
+import bisect
+import itertools
+import json
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+# Kigali city centre and the spread (in degrees, ~5.5 km) of delivery points around it
+KIGALI = (-1.9441, 30.0619)
+KIGALI_SPREAD = 0.05
+DISTRICTS = ['Gasabo', 'Kicukiro', 'Nyarugenge']
+ITEM_COUNT_WEIGHTS = [50, 25, 12, 7, 4, 2]  # orders with 1..6 lines
+NAME_WORDS = {
+    'furniture': ['Chair', 'Table', 'Bed', 'Wardrobe', 'Sofa frame', 'Stool'],
+    'home_office': ['Desk', 'Bookshelf', 'Filing cabinet', 'Monitor stand'],
+    'outdoor_garden': ['Bench', 'Planter', 'Pergola', 'Deck tiles'],
+    'doors_construction': ['Door', 'Window frame', 'Beam', 'Roof truss'],
+    'handcrafted': ['Carved bowl', 'Agaseke stand', 'Wall art', 'Mask'],
+    'custom_made': ['Kitchen cabinet', 'Built-in closet', 'Counter'],
+    'raw_materials': ['Plank', 'Plywood sheet', 'Timber', 'Board'],
+    'kids_school': ['School desk', 'Toy box', 'Bunk bed', 'Blackboard'],
+    'other': ['Frame', 'Crate', 'Pallet'],
+}
+WOODS = ['Eucalyptus', 'Pine', 'Cypress', 'Mahogany', 'Grevillea', 'Oak']
+
+
+def _coordinate(rng, centre, spread):
+    return Decimal(f'{rng.gauss(centre, spread):.6f}')
+
+
+def _zipf_cum_weights(n, exponent):
+    """Cumulative weights giving rank ``i`` (0-based) a probability ~ 1 / (i + 1) ** exponent."""
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let ``bulk_create`` store the given ``created_at``-style values instead of now()."""
+    fields = [f for model in models for f in model._meta.concrete_fields
+              if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+class _IdSequence:
+    """Hands out primary keys above the current maximum so rows can reference each other before insert."""
+
+    def __init__(self, model):
+        self.next = (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+    def take(self):
+        value = self.next
+        self.next += 1
+        return value
+
+
+class _RowInserter:
+    """Batched multi-row INSERT of plain tuples for one model.
+
+    ``bulk_create`` spends most of its time building model instances and
+    preparing every value through its field; at millions of rows that
+    dominates, so the high-volume tables are written from tuples of
+    database-ready values instead. Columns not listed get their field
+    default, prepared once.
+    """
+
+    def __init__(self, model, fields):
+        opts = model._meta
+        qn = connection.ops.quote_name
+        listed = [opts.get_field(name) for name in fields]
+        rest = [f for f in opts.concrete_fields if f not in listed]
+        for f in rest:
+            if not f.has_default() and not f.null and not f.blank:
+                raise CommandError(f'{opts.label}.{f.name} needs a value')
+        self.constants = tuple(f.get_db_prep_save(f.get_default(), connection) for f in rest)
+        columns = ', '.join(qn(f.column) for f in listed + rest)
+        placeholders = ', '.join(['%s'] * (len(listed) + len(rest)))
+        self.sql = f'INSERT INTO {qn(opts.db_table)} ({columns}) VALUES ({placeholders})'
+        self.ids = _IdSequence(model)
+        self.rows = []
+        self.written = 0
+
+    def add(self, *values):
+        self.rows.append(values + self.constants)
+
+    def flush(self, cursor):
+        if self.rows:
+            cursor.executemany(self.sql, self.rows)
+            self.written += len(self.rows)
+            self.rows = []
+
+
+class Command(BaseCommand):
+    help = ('Generate a production-sized synthetic marketplace: vendors, customers, products and orders '
+            'with items, purchases, logs, Stripe webhook events and delivery tracking histories')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=50)
+        parser.add_argument('--customers', type=int, default=5000)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=365, help='Spread order dates over this many days')
+        parser.add_argument('--until', type=str, help='Last order date (YYYY-MM-DD, default now)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (same seed, same data)')
+        parser.add_argument('--prefix', default='seed', help='Username prefix of the generated users')
+        parser.add_argument('--password', default='seedpass', help='Password of every generated user')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Orders generated per transaction')
+        parser.add_argument('--skip-rollups', action='store_true',
+                            help='Do not rebuild the sales rollup and vendor stats afterwards')
+
+    def handle(self, *args, **options):
+        from core.models import DeliveryTracking, DeliveryTrackingHistory
+        from orders.models import Order, OrderItem, Purchase, PurchaseLog, StripeWebhookEvent
+        from products.models import Product
+
+        User = get_user_model()
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Users named {prefix}_* already exist; pick another --prefix')
+        for name in ('vendors', 'customers', 'products'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be at least 1')
+        if options['until']:
+            try:
+                until = datetime.fromisoformat(options['until']).date()
+            except ValueError:
+                raise CommandError('--until must be a date in YYYY-MM-DD format')
+            self.end = timezone.make_aware(datetime.combine(until, time(20, 0)))
+        else:
+            self.end = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+        self.rng = random.Random(options['seed'])
+        self.days = max(1, options['days'])
+        self.ids = {User: _IdSequence(User), Product: _IdSequence(Product)}
+
+        with transaction.atomic():
+            vendors, customers = self.create_users(User, prefix, options)
+            with _explicit_timestamps(Product):
+                products = self.create_products(Product, vendors, options['products'])
+
+        # Popularity follows a Zipf law over a random ranking of the products;
+        # a few repeat customers place a large share of the orders
+        ranked = products[:]
+        self.rng.shuffle(ranked)
+        product_weights = _zipf_cum_weights(len(ranked), 1.1)
+        customer_weights = _zipf_cum_weights(len(customers), 0.6)
+
+        tables = {
+            'orders': _RowInserter(Order, [
+                'id', 'customer', 'total', 'status', 'delivery_address', 'phone',
+                'delivery_latitude', 'delivery_longitude', 'vendor_confirmed', 'vendor_confirmed_at',
+                'delivery_option', 'delivery_cost', 'payment_method', 'stripe_session_id',
+                'created_at', 'updated_at', 'tax_rate', 'tax_amount',
+            ]),
+            'items': _RowInserter(OrderItem, ['id', 'order', 'product', 'quantity', 'price']),
+            'purchases': _RowInserter(Purchase, [
+                'id', 'customer', 'product', 'order', 'quantity', 'amount', 'payment_method', 'transaction_id',
+                'refunded', 'refunded_at', 'refund_reason', 'created_at',
+            ]),
+            'logs': _RowInserter(PurchaseLog, ['id', 'purchase', 'action', 'actor', 'note', 'created_at']),
+            'webhooks': _RowInserter(StripeWebhookEvent, [
+                'id', 'stripe_event_id', 'event_type', 'payload', 'headers', 'order', 'processed', 'received_at',
+            ]),
+            'tracking': _RowInserter(DeliveryTracking, [
+                'id', 'order', 'status', 'driver_name', 'driver_phone', 'vehicle_number',
+                'current_latitude', 'current_longitude', 'destination_latitude', 'destination_longitude',
+                'estimated_delivery', 'picked_up_at', 'delivered_at', 'created_at', 'updated_at',
+            ]),
+            'history': _RowInserter(DeliveryTrackingHistory, [
+                'id', 'tracking', 'latitude', 'longitude', 'status', 'recorded_at',
+            ]),
+        }
+        remaining = options['orders']
+        while remaining > 0:
+            size = min(options['batch_size'], remaining)
+            remaining -= size
+            with transaction.atomic():
+                self.create_orders(size, customers, ranked, product_weights, customer_weights, tables)
+            self.stdout.write(f"  {tables['orders'].written} / {options['orders']} orders")
+
+        # Explicit primary keys leave PostgreSQL sequences behind
+        models = [User, Product, Order, OrderItem, Purchase, PurchaseLog, StripeWebhookEvent,
+                  DeliveryTracking, DeliveryTrackingHistory]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+        # Raw inserts bypass the signals that maintain OrderVendor; vendors need it for access
+        call_command('rebuild_order_vendors', stdout=self.stdout)
+        if not options['skip_rollups']:
+            call_command('rebuild_sales_rollup', stdout=self.stdout)
+            call_command('refresh_vendor_stats', stdout=self.stdout)
+
+        counts = {name: table.written for name, table in tables.items()}
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(vendors)} vendor(s), {len(customers)} customer(s), {len(products)} product(s), "
+            f"{counts['orders']} order(s) with {counts['items']} item(s), {counts['purchases']} purchase(s), "
+            f"{counts['logs']} log(s), {counts['webhooks']} webhook event(s) and "
+            f"{counts['tracking']} tracked deliveries ({counts['history']} location updates)"
+        ))
+
+    def random_moment(self):
+        return self.end - timedelta(seconds=self.rng.random() * self.days * 86400)
+
+    def create_users(self, User, prefix, options):
+        password = make_password(options['password'])
+        joined = self.end - timedelta(days=self.days + 30)
+        users = []
+        for user_type, count in ((User.VENDOR, options['vendors']), (User.CUSTOMER, options['customers'])):
+            for n in range(1, count + 1):
+                username = f'{prefix}_{user_type}_{n:06d}'
+                users.append(User(
+                    id=self.ids[User].take(), username=username, email=f'{username}@example.com',
+                    password=password, user_type=user_type, date_joined=joined,
+                    phone=f'07{self.rng.choice("238")}{self.rng.randrange(10 ** 7):07d}',
+                    location=self.rng.choice(DISTRICTS),
+                ))
+        User.objects.bulk_create(users, batch_size=2000)
+        vendors = [u for u in users if u.user_type == User.VENDOR]
+        customers = [u for u in users if u.user_type == User.CUSTOMER]
+        return vendors, customers
+
+    def create_products(self, Product, vendors, count):
+        rng = self.rng
+        vendor_weights = _zipf_cum_weights(len(vendors), 0.8)
+        categories = list(NAME_WORDS)
+        products = []
+        for n in range(1, count + 1):
+            category = rng.choice(categories)
+            # Log-normal prices around 40,000 RWF, rounded to 100
+            price = max(500, round(rng.lognormvariate(10.6, 0.9), -2))
+            products.append(Product(
+                id=self.ids[Product].take(),
+                vendor=rng.choices(vendors, cum_weights=vendor_weights)[0],
+                name=f'{rng.choice(WOODS)} {rng.choice(NAME_WORDS[category]).lower()} #{n}',
+                description='Generated by seed_scale',
+                price=Decimal(price),
+                stock=0 if rng.random() < 0.05 else rng.randint(1, 200),
+                unit=Product.UNIT_PCS,
+                category=category,
+                status=Product.STATUS_ACTIVE if rng.random() < 0.9 else Product.STATUS_INACTIVE,
+                created_at=self.end - timedelta(days=self.days + rng.random() * 30),
+            ))
+        Product.objects.bulk_create(products, batch_size=2000)
+        return products
+
+    def clamp(self, moment):
+        return min(moment, self.end)
+
+    def order_status(self, Order, age):
+        rng = self.rng
+        if rng.random() < 0.05:
+            return Order.STATUS_CANCELLED
+        if age > timedelta(days=14):
+            return rng.choices([Order.STATUS_COMPLETED, Order.STATUS_DELIVERED, Order.STATUS_PENDING], [80, 17, 3])[0]
+        if age < timedelta(days=2):
+            # Too recent to have been picked up (tracking starts within 26 hours)
+            return rng.choice([Order.STATUS_PENDING, Order.STATUS_AWAITING_CONFIRMATION, Order.STATUS_PROCESSING])
+        return rng.choice([Order.STATUS_PENDING, Order.STATUS_AWAITING_CONFIRMATION, Order.STATUS_PROCESSING,
+                           Order.STATUS_SHIPPED, Order.STATUS_DELIVERED, Order.STATUS_COMPLETED])
+
+    def create_orders(self, count, customers, ranked, product_weights, customer_weights, tables):
+        from core.models import DeliveryTracking
+        from orders.models import Order, Purchase, PurchaseLog
+
+        rng = self.rng
+        stamp = connection.ops.adapt_datetimefield_value
+        orders, items, purchases, logs, webhooks, tracking, history = (
+            tables['orders'], tables['items'], tables['purchases'], tables['logs'],
+            tables['webhooks'], tables['tracking'], tables['history'])
+        paid = {Order.STATUS_PROCESSING, Order.STATUS_SHIPPED, Order.STATUS_DELIVERED, Order.STATUS_COMPLETED}
+        shipped = {Order.STATUS_SHIPPED, Order.STATUS_DELIVERED, Order.STATUS_COMPLETED}
+        purchase_method = {Order.PAYMENT_MOMO: Purchase.PAYMENT_MOMO, Order.PAYMENT_AIRTEL: Purchase.PAYMENT_AIRTEL}
+        delivery_options = [Order.DELIVERY_STANDARD, Order.DELIVERY_EXPRESS, Order.DELIVERY_PICKUP]
+        delivery_costs = {Order.DELIVERY_STANDARD: Decimal(2000), Order.DELIVERY_EXPRESS: Decimal(5000),
+                          Order.DELIVERY_PICKUP: Decimal(0)}
+        payment_methods = [Order.PAYMENT_MOMO, Order.PAYMENT_AIRTEL, Order.PAYMENT_BANK,
+                           Order.PAYMENT_CARD, Order.PAYMENT_CASH]
+        line_counts = range(1, len(ITEM_COUNT_WEIGHTS) + 1)
+        tax_rate = Decimal('0.18')
+        cent = Decimal('0.01')
+
+        for customer in rng.choices(customers, cum_weights=customer_weights, k=count):
+            order_id = orders.ids.take()
+            created = self.random_moment()
+            status = self.order_status(Order, self.end - created)
+            delivery_option = rng.choices(delivery_options, [70, 20, 10])[0]
+            delivery_cost = delivery_costs[delivery_option]
+            payment_method = rng.choices(payment_methods, [45, 15, 15, 15, 10])[0]
+            lat = _coordinate(rng, KIGALI[0], KIGALI_SPREAD)
+            lng = _coordinate(rng, KIGALI[1], KIGALI_SPREAD)
+            confirmed = status in paid
+            session_id = f'cs_seed_{order_id}' if confirmed and payment_method == Order.PAYMENT_CARD else None
+
+            # Independent Zipf draws: popular products dominate and carts often span vendors
+            picked = {}
+            for _ in range(rng.choices(line_counts, ITEM_COUNT_WEIGHTS)[0]):
+                product = ranked[bisect.bisect(product_weights, rng.random() * product_weights[-1])]
+                picked[product.id] = (product, rng.choice([1, 1, 1, 2, 2, 3, 5]))
+            subtotal = Decimal(0)
+            for product, quantity in picked.values():
+                items.add(items.ids.take(), order_id, product.id, quantity, product.price)
+                subtotal += product.price * quantity
+            tax_amount = ((subtotal + delivery_cost) * tax_rate).quantize(cent)
+
+            orders.add(
+                order_id, customer.id, subtotal + delivery_cost + tax_amount, status,
+                f'KG {rng.randint(1, 700)} St, {customer.location}', customer.phone, lat, lng,
+                confirmed, stamp(self.clamp(created + timedelta(hours=rng.randint(1, 24)))) if confirmed else None,
+                delivery_option, delivery_cost, payment_method, session_id,
+                stamp(created), stamp(self.clamp(created + timedelta(hours=rng.randint(1, 96)))), tax_rate, tax_amount,
+            )
+
+            if confirmed:
+                paid_at = stamp(self.clamp(created + timedelta(minutes=rng.randint(1, 120))))
+                refunded_at = stamp(self.clamp(created + timedelta(days=rng.randint(1, 10)))) if rng.random() < 0.02 else None
+                for product, quantity in picked.values():
+                    purchase_id = purchases.ids.take()
+                    purchases.add(
+                        purchase_id, customer.id, product.id, order_id, quantity, product.price * quantity,
+                        purchase_method.get(payment_method, Purchase.PAYMENT_BANK), session_id,
+                        refunded_at is not None, refunded_at, 'Damaged in transit' if refunded_at else None, paid_at,
+                    )
+                    logs.add(logs.ids.take(), purchase_id, PurchaseLog.ACTION_PURCHASE, customer.id,
+                             f'Order #{order_id}', paid_at)
+                    if refunded_at:
+                        logs.add(logs.ids.take(), purchase_id, PurchaseLog.ACTION_REFUND, None, 'Refund', refunded_at)
+                if session_id:
+                    event_id = f'evt_seed_{order_id}'
+                    payload = json.dumps({'id': event_id, 'type': 'checkout.session.completed', 'data': {
+                        'object': {'id': session_id, 'metadata': {'order_id': str(order_id)}}}})
+                    webhooks.add(webhooks.ids.take(), event_id, 'checkout.session.completed', payload, '{}',
+                                 order_id, True, paid_at)
+
+            if status in shipped and delivery_option != Order.DELIVERY_PICKUP:
+                delivered = status != Order.STATUS_SHIPPED
+                tracking_id = tracking.ids.take()
+                picked_up_at = created + timedelta(hours=rng.randint(6, 24))
+                # The driver moves from the city-centre depot towards the customer
+                steps = rng.randint(3, 6)
+                end = (float(lat), float(lng))
+                for step in range(1, steps + 1):
+                    share = step / steps if delivered else step / (steps + 1)
+                    at = picked_up_at + timedelta(minutes=20 * step)
+                    point = (Decimal(f'{KIGALI[0] + (end[0] - KIGALI[0]) * share:.6f}'),
+                             Decimal(f'{KIGALI[1] + (end[1] - KIGALI[1]) * share:.6f}'))
+                    step_status = (DeliveryTracking.STATUS_DELIVERED if delivered and step == steps
+                                   else DeliveryTracking.STATUS_IN_TRANSIT)
+                    history.add(history.ids.take(), tracking_id, point[0], point[1], step_status, stamp(at))
+                tracking.add(
+                    tracking_id, order_id,
+                    DeliveryTracking.STATUS_DELIVERED if delivered else DeliveryTracking.STATUS_IN_TRANSIT,
+                    f'Driver {rng.randint(1, 60)}', f'078{rng.randrange(10 ** 7):07d}',
+                    f'RA{rng.randint(100, 999)}{rng.choice("ABCDEFGH")}', point[0], point[1], lat, lng,
+                    stamp(picked_up_at + timedelta(hours=6)), stamp(picked_up_at),
+                    stamp(at) if delivered else None, stamp(picked_up_at), stamp(at),
+                )
+
+        with connection.cursor() as cursor:
+            for table in tables.values():
+                table.flush(cursor)
@@ -0,0 +1,87 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Deliver unsent QueuedEmail rows (run from cron, or with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails fetched per batch')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Give up on an email after this many failures')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails')
+        parser.add_argument('--interval', type=float, default=10.0, help='Seconds between polls with --loop')
+        parser.add_argument('--claim-timeout', type=int, default=600,
+                            help='Seconds before a claimed but unsent email is released to other senders')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = self.send_pending(options['batch_size'], options['max_attempts'], options['claim_timeout'])
+            if sent:
+                self.stdout.write(self.style.SUCCESS(f'Sent {sent} email(s)'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def claim_batch(self, pending, last_id, batch_size, claim_timeout):
+        """Mark the next batch as ours so a concurrent run doesn't send it too.
+
+        Postgres skips rows another sender has locked; the conditional UPDATE
+        keeps the claim exclusive on backends without row locks (SQLite).
+        """
+        from orders.models import QueuedEmail
+
+        now = timezone.now()
+        claimable = pending.filter(Q(claim_token__isnull=True) | Q(claimed_at__lt=now - timedelta(seconds=claim_timeout)))
+        token = uuid.uuid4()
+        with transaction.atomic():
+            ids = list(
+                claimable.filter(id__gt=last_id).select_for_update(skip_locked=True)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return [], None
+            claimable.filter(id__in=ids).update(claim_token=token, claimed_at=now)
+        batch = list(
+            QueuedEmail.objects.filter(id__in=ids, claim_token=token)
+            .select_related('recipient', 'purchase', 'purchase__product', 'purchase__customer')
+            .order_by('id')
+        )
+        return batch, ids[-1]
+
+    def send_pending(self, batch_size, max_attempts, claim_timeout=600):
+        from orders.models import QueuedEmail
+
+        pending = QueuedEmail.objects.filter(sent_at__isnull=True, attempts__lt=max_attempts)
+        total = 0
+        last_id = 0
+        connection = get_connection(fail_silently=False)
+        while True:
+            batch, last_id = self.claim_batch(pending, last_id, batch_size, claim_timeout)
+            if last_id is None:
+                return total
+
+            sent_ids = []
+            for email in batch:
+                try:
+                    html = render_to_string(email.template, {'purchase': email.purchase, 'user': email.recipient})
+                    msg = EmailMessage(subject=email.subject, body=html, from_email=settings.DEFAULT_FROM_EMAIL,
+                                       to=[email.to_email], connection=connection)
+                    msg.content_subtype = 'html'
+                    msg.send()
+                    sent_ids.append(email.id)
+                except Exception as e:
+                    QueuedEmail.objects.filter(id=email.id).update(
+                        attempts=F('attempts') + 1, last_error=str(e), claim_token=None, claimed_at=None)
+                    self.stderr.write(f'Failed to send email #{email.id}: {e}')
+
+            QueuedEmail.objects.filter(id__in=sent_ids).update(sent_at=timezone.now(), attempts=F('attempts') + 1)
+            total += len(sent_ids)
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0014_alter_order_status'),
+        ('products', '0013_alter_product_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Sale date in the site time zone (Africa/Kigali)')),
+                ('payment_method', models.CharField(max_length=20)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('gross', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('refunded_units', models.PositiveIntegerField(default=0)),
+                ('refunded_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('refund_count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily sales summaries',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['vendor', 'date'], name='orders_dail_vendor__1e297d_idx'), models.Index(fields=['date', 'payment_method'], name='orders_dail_date_8b2915_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'vendor', 'product', 'payment_method'), name='unique_daily_sales_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_customuser_location_alter_customuser_phone_and_more'),
+        ('orders', '0015_dailysalessummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorStats',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vendor_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('active_product_count', models.PositiveIntegerField(default=0)),
+                ('out_of_stock_count', models.PositiveIntegerField(default=0)),
+                ('lifetime_sales', models.DecimalField(decimal_places=2, default=0, help_text='Net of refunds', max_digits=14)),
+                ('sales_30d', models.DecimalField(decimal_places=2, default=0, help_text='Net sales over the last 30 days', max_digits=14)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Vendor stats',
+                'indexes': [models.Index(fields=['-lifetime_sales'], name='orders_vend_lifetim_4f935a_idx')],
+            },
+        ),
+    ]
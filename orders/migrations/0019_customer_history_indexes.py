@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0018_queuedemail'),
+        ('products', '0013_alter_product_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'created_at'], name='order_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['customer', 'created_at'], name='purchase_customer_created_idx'),
+        ),
+    ]
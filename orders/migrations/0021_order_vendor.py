@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_order_vendors(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    OrderVendor = apps.get_model('orders', 'OrderVendor')
+    Product = apps.get_model('products', 'Product')
+    schema_editor.execute(
+        f'INSERT INTO {OrderVendor._meta.db_table} '
+        '(order_id, vendor_id, status, created_at, subtotal, item_count, quantity) '
+        'SELECT i.order_id, p.vendor_id, o.status, o.created_at, '
+        'SUM(i.price * i.quantity), COUNT(*), SUM(i.quantity) '
+        f'FROM {OrderItem._meta.db_table} i '
+        f'JOIN {Product._meta.db_table} p ON p.id = i.product_id '
+        f'JOIN {Order._meta.db_table} o ON o.id = i.order_id '
+        'GROUP BY i.order_id, p.vendor_id, o.status, o.created_at'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0020_vendor_inbox_index'),
+        ('products', '0013_alter_product_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderVendor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending Payment'), ('awaiting_confirmation', 'Awaiting Vendor Confirmation'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='pending', max_length=25)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('item_count', models.PositiveIntegerField(default=0, help_text='Order lines for this vendor')),
+                ('quantity', models.PositiveIntegerField(default=0, help_text='Units across those lines')),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='orderitem',
+            name='orderitem_product_order_idx',
+        ),
+        migrations.AddField(
+            model_name='ordervendor',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_links', to='orders.order'),
+        ),
+        migrations.AddField(
+            model_name='ordervendor',
+            name='vendor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_links', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='ordervendor',
+            index=models.Index(fields=['vendor', 'status', 'created_at'], name='ordervendor_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ordervendor',
+            index=models.Index(fields=['vendor', 'created_at'], name='ordervendor_vendor_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ordervendor',
+            constraint=models.UniqueConstraint(fields=('order', 'vendor'), name='ordervendor_order_vendor_uniq'),
+        ),
+        migrations.RunPython(backfill_order_vendors, migrations.RunPython.noop),
+    ]
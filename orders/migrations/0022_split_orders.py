@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0021_order_vendor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='is_split',
+            field=models.BooleanField(default=False, help_text='Items are on per-vendor sub-orders'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sub_orders', to='orders.order'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='vendor',
+            field=models.ForeignKey(blank=True, help_text='Vendor fulfilling this sub-order', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vendor_sub_orders', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import BigIntegerField, F, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Replace, StrIndex, Substr
+
+# Notes written with each purchase by checkout, payment confirmation and Stripe
+ORDER_NOTE = r'^(Vendor confirmed - )?Order #[0-9]+( \(Stripe\))?$'
+
+
+def link_purchases_to_orders(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    Purchase = apps.get_model('orders', 'Purchase')
+    PurchaseLog = apps.get_model('orders', 'PurchaseLog')
+    note = Replace(F('note'), Value(' (Stripe)'), Value(''))
+    order_ref = Cast(Substr(note, StrIndex(note, Value('#')) + 1), BigIntegerField())
+    logs = (
+        PurchaseLog.objects.filter(purchase=OuterRef(OuterRef('pk')), action='purchase', note__regex=ORDER_NOTE)
+        .annotate(order_ref=order_ref).values('order_ref')[:1]
+    )
+    # The inner lookup drops references to orders that no longer exist
+    Purchase.objects.update(order=Subquery(Order.objects.filter(pk=Subquery(logs)).values('pk')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0022_split_orders'),
+        ('products', '0013_alter_product_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchases', to='orders.order'),
+        ),
+        migrations.RunPython(link_purchases_to_orders, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('is_split', models.BooleanField(default=False)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(choices=[('pending', 'Pending Payment'), ('awaiting_confirmation', 'Awaiting Vendor Confirmation'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=25)),
+                ('delivery_address', models.TextField()),
+                ('phone', models.CharField(max_length=20)),
+                ('delivery_notes', models.TextField(blank=True, null=True)),
+                ('delivery_latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('delivery_longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('payment_proof', models.ImageField(blank=True, null=True, upload_to='payment_proofs/')),
+                ('payment_proof_uploaded_at', models.DateTimeField(blank=True, null=True)),
+                ('vendor_confirmed', models.BooleanField(default=False)),
+                ('vendor_confirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('vendor_rejection_reason', models.TextField(blank=True, null=True)),
+                ('delivery_option', models.CharField(choices=[('standard', 'Standard Delivery (3-5 days)'), ('express', 'Express Delivery (1-2 days)'), ('pickup', 'Store Pickup')], max_length=20)),
+                ('delivery_cost', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('payment_method', models.CharField(choices=[('bank', 'Bank Transfer'), ('momo', 'MTN Mobile Money'), ('airtel', 'Airtel Money'), ('tigo', 'Tigo Cash'), ('card', 'Credit/Debit Card'), ('cash', 'Cash on Delivery')], max_length=20)),
+                ('payment_reference', models.CharField(blank=True, max_length=100, null=True)),
+                ('stripe_session_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('tracking_number', models.CharField(blank=True, max_length=100, null=True)),
+                ('tax_rate', models.DecimalField(decimal_places=4, max_digits=6)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sub_orders', to='orders.archivedorder')),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('vendor_confirmed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.archivedorder')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPurchase',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('payment_method', models.CharField(choices=[('bank', 'Bank Transfer'), ('momo', 'Momo Pay'), ('airtel', 'Airtel Money')], max_length=20)),
+                ('transaction_id', models.CharField(blank=True, max_length=128, null=True)),
+                ('refunded', models.BooleanField(default=False)),
+                ('refunded_at', models.DateTimeField(blank=True, null=True)),
+                ('refund_reason', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_purchases', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchases', to='orders.archivedorder')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('refunded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPurchaseLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action', models.CharField(choices=[('purchase', 'Purchase'), ('refund', 'Refund')], max_length=20)),
+                ('note', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('purchase', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='orders.archivedpurchase')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['customer', 'created_at'], name='archorder_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['created_at'], name='archorder_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedpurchase',
+            index=models.Index(fields=['customer', 'created_at'], name='archpurchase_cust_created_idx'),
+        ),
+    ]
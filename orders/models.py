@@ -13,6 +13,12 @@ class Order(models.Model):
     STATUS_COMPLETED = 'completed'
     STATUS_CANCELLED = 'cancelled'
 
+    # Forward progress of an order; a split order reports its least advanced live sub-order
+    STATUS_FLOW = [
+        STATUS_PENDING, STATUS_AWAITING_CONFIRMATION, STATUS_PROCESSING,
+        STATUS_SHIPPED, STATUS_DELIVERED, STATUS_COMPLETED,
+    ]
+
     STATUS_CHOICES = [
         (STATUS_PENDING, _('Pending Payment')),
         (STATUS_AWAITING_CONFIRMATION, _('Awaiting Vendor Confirmation')),
@@ -25,6 +31,17 @@ class Order(models.Model):
 
     # Basic order information
     customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
+
+    # Multi-vendor carts: the checkout order is split into one sub-order per vendor.
+    # The parent keeps the customer-facing total; items, confirmation, shipping and
+    # tracking live on the sub-orders.
+    is_split = models.BooleanField(default=False, help_text='Items are on per-vendor sub-orders')
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='sub_orders')
+    vendor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='vendor_sub_orders',
+        help_text='Vendor fulfilling this sub-order'
+    )
     total = models.DecimalField(decimal_places=2, max_digits=12, validators=[MinValueValidator(0)])
     status = models.CharField(max_length=25, choices=STATUS_CHOICES, default=STATUS_PENDING)
 
@@ -120,14 +137,32 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            models.Index(fields=['created_at'], name='order_created_idx'),
+            models.Index(fields=['customer', 'created_at'], name='order_customer_created_idx'),
+        ]
+
+    # Live orders can still change; ArchivedOrder rows are read-only history
+    is_archived = False
+
+    # Stored tax_amount and total are recalculated from the items when these change
+    PRICING_FIELDS = ('delivery_cost', 'tax_rate')
 
     def __str__(self):
         return f"Order #{self.id} - {self.customer.username} - {self.total} RWF ({self.get_status_display()})"
     
+    @property
+    def line_items(self):
+        """Items of the order, gathered from the sub-orders when it is split"""
+        if self.is_split:
+            return [item for sub_order in self.sub_orders.all() for item in sub_order.items.all()]
+        return self.items.all()
+
     @property
     def subtotal(self):
         """Calculate subtotal without delivery cost and tax"""
-        items_total = sum(item.price * item.quantity for item in self.items.all())
+        items_total = sum(item.price * item.quantity for item in self.line_items)
         return items_total
     
     @property
@@ -155,13 +190,45 @@ class Order(models.Model):
         """Generate formatted tracking number"""
         return self.tracking_number or f"TRK{self.id:08d}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_pricing = instance._pricing_inputs()
+        return instance
+
+    def _pricing_inputs(self):
+        # Deferred fields read as None rather than triggering a query
+        return tuple(self.__dict__.get(field) for field in self.PRICING_FIELDS)
+
+    @property
+    def pricing_changed(self):
+        """Whether delivery cost or tax rate differ from what was loaded (always true if unknown)"""
+        return getattr(self, '_loaded_pricing', None) != self._pricing_inputs()
+
+    def recalculate_totals(self):
+        """Recompute tax and total from the current items and store them (after item edits)."""
+        self.tax_amount = self.calculated_tax
+        self.total = self.total_with_tax
+        super().save(update_fields=['tax_amount', 'total', 'updated_at'])
+
     def save(self, *args, **kwargs):
-        """Override save to calculate tax automatically"""
-        if self.pk:  # Only calculate for existing orders with items
+        """
+        Recalculate tax and total when the pricing inputs of an existing order change.
+
+        Status transitions and other edits keep the stored amounts, which are
+        what the customer was charged; save them with ``update_fields`` so only
+        the changed columns are written.
+        """
+        update_fields = kwargs.get('update_fields')
+        if (self.pk and self.pricing_changed
+                and (update_fields is None or set(self.PRICING_FIELDS) & set(update_fields))):
             self.tax_amount = self.calculated_tax
             # Update total to include tax
             self.total = self.total_with_tax
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'tax_amount', 'total'}
         super().save(*args, **kwargs)
+        self._loaded_pricing = self._pricing_inputs()
 
 
 class OrderItem(models.Model):
@@ -174,10 +241,43 @@ class OrderItem(models.Model):
         return f"{self.product.name} x {self.quantity}"
 
 
+class OrderVendor(models.Model):
+    """One row per (order, vendor selling into it), with that vendor's share.
+
+    Denormalized from ``OrderItem -> Product.vendor`` so vendor access checks,
+    vendor order lists and per-vendor revenue never join through products.
+    ``status`` and ``created_at`` mirror the order's. Rows are kept current by
+    the signal handlers in ``orders.signals`` (see ``orders.rollups``);
+    ``manage.py rebuild_order_vendors`` recomputes them from scratch.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='vendor_links')
+    vendor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='order_links')
+    status = models.CharField(max_length=25, choices=Order.STATUS_CHOICES, default=Order.STATUS_PENDING)
+    subtotal = models.DecimalField(decimal_places=2, max_digits=12, default=0)
+    item_count = models.PositiveIntegerField(default=0, help_text='Order lines for this vendor')
+    quantity = models.PositiveIntegerField(default=0, help_text='Units across those lines')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'vendor'], name='ordervendor_order_vendor_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['vendor', 'status', 'created_at'], name='ordervendor_inbox_idx'),
+            models.Index(fields=['vendor', 'created_at'], name='ordervendor_vendor_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id} - vendor #{self.vendor_id}: {self.subtotal} RWF"
+
+
 class Purchase(models.Model):
     """Record of a mock purchase (used by the Mock Checkout Process)."""
     customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='purchases')
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='purchases')
+    # Set for purchases paid through an order (cart checkout, payment proof, Stripe);
+    # single-product mock purchases have none. Archiving moves them with their order.
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='purchases')
     quantity = models.PositiveIntegerField(default=1)
     amount = models.DecimalField(decimal_places=2, max_digits=12, validators=[MinValueValidator(0)])
     PAYMENT_BANK = 'bank'
@@ -202,6 +302,11 @@ class Purchase(models.Model):
     refund_reason = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', 'created_at'], name='purchase_customer_created_idx'),
+        ]
+
 
 class PurchaseLog(models.Model):
     ACTION_PURCHASE = 'purchase'
@@ -245,3 +350,215 @@ class StripeWebhookEvent(models.Model):
 
     def __str__(self):
         return f"{self.event_type or 'stripe.event'} @ {self.received_at}"
+
+
+class DailySalesSummary(models.Model):
+    """Per-day sales rollup maintained incrementally from Purchase writes.
+
+    One row per (local date, vendor, product, payment method). Refunds are
+    booked against the day of the original sale so that
+    ``gross - refunded_amount`` always equals the non-refunded purchase total.
+    Rebuild with ``manage.py rebuild_sales_rollup``.
+    """
+    date = models.DateField(help_text='Sale date in the site time zone (Africa/Kigali)')
+    vendor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_sales')
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='daily_sales')
+    payment_method = models.CharField(max_length=20)
+    units = models.PositiveIntegerField(default=0)
+    gross = models.DecimalField(decimal_places=2, max_digits=14, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    refunded_units = models.PositiveIntegerField(default=0)
+    refunded_amount = models.DecimalField(decimal_places=2, max_digits=14, default=0)
+    refund_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'Daily sales summaries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'vendor', 'product', 'payment_method'],
+                name='unique_daily_sales_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['vendor', 'date']),
+            models.Index(fields=['date', 'payment_method']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - product #{self.product_id} ({self.payment_method}): {self.gross}"
+
+    @property
+    def net(self):
+        return self.gross - self.refunded_amount
+
+
+class VendorStats(models.Model):
+    """Denormalized per-vendor performance figures.
+
+    Product counts are refreshed on product saves/deletes and sales columns
+    on purchase/refund writes (see ``orders.rollups``). The 30-day window is
+    re-aged daily by ``manage.py refresh_vendor_stats``.
+    """
+    vendor = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        primary_key=True, related_name='vendor_stats'
+    )
+    product_count = models.PositiveIntegerField(default=0)
+    active_product_count = models.PositiveIntegerField(default=0)
+    out_of_stock_count = models.PositiveIntegerField(default=0)
+    lifetime_sales = models.DecimalField(decimal_places=2, max_digits=14, default=0,
+                                         help_text='Net of refunds')
+    sales_30d = models.DecimalField(decimal_places=2, max_digits=14, default=0,
+                                    help_text='Net sales over the last 30 days')
+    order_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Vendor stats'
+        indexes = [
+            models.Index(fields=['-lifetime_sales']),
+        ]
+
+    def __str__(self):
+        return f"Stats for vendor #{self.vendor_id}"
+
+
+class QueuedEmail(models.Model):
+    """Outbox row for a notification email, written in the same transaction as
+    the change it announces and delivered by ``manage.py send_queued_emails``."""
+    template = models.CharField(max_length=100, help_text='Template rendered as the HTML body')
+    subject = models.CharField(max_length=255)
+    to_email = models.EmailField()
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                  null=True, blank=True, related_name='+')
+    purchase = models.ForeignKey(Purchase, on_delete=models.CASCADE,
+                                 null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Set by the sender that is delivering the row, so overlapping runs skip it
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['sent_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email}"
+
+
+# Archive tables. ``manage.py archive_orders`` (see ``orders.archive``) moves
+# finished orders out of the live tables, together with their items, purchases
+# and logs, so the hot tables only hold recent and open orders. Rows keep their
+# ids and the live column names; history views read both sides.
+
+class ArchivedOrder(models.Model):
+    """A completed or cancelled order moved out of ``Order``."""
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_orders')
+    is_split = models.BooleanField(default=False)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='sub_orders')
+    vendor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    total = models.DecimalField(decimal_places=2, max_digits=12)
+    status = models.CharField(max_length=25, choices=Order.STATUS_CHOICES)
+    delivery_address = models.TextField()
+    phone = models.CharField(max_length=20)
+    delivery_notes = models.TextField(blank=True, null=True)
+    delivery_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    delivery_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    payment_proof = models.ImageField(upload_to='payment_proofs/', blank=True, null=True)
+    payment_proof_uploaded_at = models.DateTimeField(null=True, blank=True)
+    vendor_confirmed = models.BooleanField(default=False)
+    vendor_confirmed_at = models.DateTimeField(null=True, blank=True)
+    vendor_confirmed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                            null=True, blank=True, related_name='+')
+    vendor_rejection_reason = models.TextField(blank=True, null=True)
+    delivery_option = models.CharField(max_length=20, choices=Order.DELIVERY_CHOICES)
+    delivery_cost = models.DecimalField(decimal_places=2, max_digits=10, default=0)
+    payment_method = models.CharField(max_length=20, choices=Order.PAYMENT_CHOICES)
+    payment_reference = models.CharField(max_length=100, blank=True, null=True)
+    stripe_session_id = models.CharField(max_length=255, blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    tracking_number = models.CharField(max_length=100, blank=True, null=True)
+    tax_rate = models.DecimalField(decimal_places=4, max_digits=6)
+    tax_amount = models.DecimalField(decimal_places=2, max_digits=10, default=0)
+
+    is_archived = True
+
+    line_items = Order.line_items
+    subtotal = Order.subtotal
+    subtotal_with_delivery = Order.subtotal_with_delivery
+    calculated_tax = Order.calculated_tax
+    total_with_tax = Order.total_with_tax
+    invoice_number = Order.invoice_number
+    formatted_tracking_number = Order.formatted_tracking_number
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', 'created_at'], name='archorder_customer_created_idx'),
+            models.Index(fields=['created_at'], name='archorder_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.total} RWF ({self.get_status_display()})"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(decimal_places=2, max_digits=10)
+
+    def __str__(self):
+        return f"{self.product.name} x {self.quantity}"
+
+
+class ArchivedPurchase(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_purchases')
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='+')
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.SET_NULL, null=True, blank=True, related_name='purchases')
+    quantity = models.PositiveIntegerField()
+    amount = models.DecimalField(decimal_places=2, max_digits=12)
+    payment_method = models.CharField(max_length=20, choices=Purchase.PAYMENT_METHOD_CHOICES)
+    transaction_id = models.CharField(max_length=128, blank=True, null=True)
+    refunded = models.BooleanField(default=False)
+    refunded_at = models.DateTimeField(blank=True, null=True)
+    refunded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                    null=True, blank=True, related_name='+')
+    refund_reason = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+
+    is_archived = True
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', 'created_at'], name='archpurchase_cust_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived purchase #{self.id} - {self.product.name} x{self.quantity}"
+
+
+class ArchivedPurchaseLog(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    purchase = models.ForeignKey(ArchivedPurchase, on_delete=models.CASCADE, related_name='logs')
+    action = models.CharField(max_length=20, choices=PurchaseLog.ACTION_CHOICES)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    note = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_action_display()} for archived purchase #{self.purchase_id} at {self.created_at}"
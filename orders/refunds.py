@@ -0,0 +1,126 @@
+# orders/refunds.py
+"""
+Bulk refund service shared by the Django admin and the company admin.
+
+A batch of any size is refunded in one transaction with a fixed number of
+statements: one ``bulk_update`` for the purchases, one ``CASE``-based
+``F()`` update restocking every affected product, one ``bulk_create`` for
+the audit logs and one for the queued notification emails. The rollup
+refresh that follows is batched the same way (see ``orders.rollups``).
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import List
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from products.models import Product
+
+from . import rollups
+from .models import Purchase, PurchaseLog, QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+@dataclass
+class RefundResult:
+    """Outcome of a refund batch."""
+    refunded: List[Purchase] = field(default_factory=list)
+    skipped: int = 0
+    restocked_units: int = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.refunded)
+
+
+def _restock(quantities) -> None:
+    """Add quantities back to stock with one aggregated update per batch of products."""
+    product_ids = list(quantities)
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        chunk = product_ids[start:start + BATCH_SIZE]
+        Product.objects.filter(id__in=chunk).update(stock=F('stock') + Case(
+            *[When(id=pid, then=Value(quantities[pid])) for pid in chunk],
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+
+
+def _queue_refund_emails(purchases) -> None:
+    emails = []
+    for p in purchases:
+        subject = f'Purchase #{p.id} refunded'
+        if p.customer.email:
+            emails.append(QueuedEmail(template='emails/refund.html', subject=subject,
+                                      to_email=p.customer.email, recipient=p.customer, purchase=p))
+        vendor = p.product.vendor
+        if vendor.email:
+            emails.append(QueuedEmail(template='emails/refund.html', subject=subject,
+                                      to_email=vendor.email, recipient=vendor, purchase=p))
+    QueuedEmail.objects.bulk_create(emails, batch_size=BATCH_SIZE)
+
+
+def refund_purchases(purchases, actor, reason: str, notify: bool = True) -> RefundResult:
+    """
+    Refund every not-yet-refunded purchase in ``purchases`` and restock their products.
+
+    Args:
+        purchases: Queryset (or iterable of ids-bearing Purchase objects) to refund
+        actor: User performing the refund, recorded on purchases and logs
+        reason: Refund reason stored on each purchase and log entry
+        notify: Queue customer and vendor emails for delivery after commit
+
+    Returns:
+        RefundResult: Refunded purchases, count of already-refunded skips and units restocked
+    """
+    if not hasattr(purchases, 'filter'):
+        purchases = Purchase.objects.filter(id__in=[p.id for p in purchases])
+
+    result = RefundResult()
+    with transaction.atomic():
+        batch = list(
+            purchases.select_for_update(of=('self',))
+            .select_related('customer', 'product', 'product__vendor')
+            .order_by('id')
+        )
+        to_refund = [p for p in batch if not p.refunded]
+        result.skipped = len(batch) - len(to_refund)
+        if not to_refund:
+            return result
+
+        now = timezone.now()
+        quantities = defaultdict(int)
+        for p in to_refund:
+            p.refunded = True
+            p.refunded_at = now
+            p.refunded_by = actor
+            p.refund_reason = reason
+            p._rollup_refunded = True  # signals are bypassed; keep the instance state consistent
+            quantities[p.product_id] += p.quantity
+
+        Purchase.objects.bulk_update(
+            to_refund, ['refunded', 'refunded_at', 'refunded_by', 'refund_reason'], batch_size=BATCH_SIZE
+        )
+        _restock(quantities)
+        PurchaseLog.objects.bulk_create(
+            [PurchaseLog(purchase=p, action=PurchaseLog.ACTION_REFUND, actor=actor, note=reason) for p in to_refund],
+            batch_size=BATCH_SIZE,
+        )
+
+        # bulk_update and QuerySet.update skip the rollup signals
+        rollups.record_refunds(to_refund)
+        rollups.refresh_vendor_product_counts({p.product.vendor_id for p in to_refund})
+
+        if notify:
+            _queue_refund_emails(to_refund)
+
+        result.refunded = to_refund
+        result.restocked_units = sum(quantities.values())
+
+    logger.info(f'{actor} refunded {result.count} purchase(s), restocked {result.restocked_units} unit(s)')
+    return result
@@ -0,0 +1,278 @@
+# orders/rollups.py
+"""
+Incremental maintenance of the DailySalesSummary, VendorStats and OrderVendor rollups.
+
+Single ``Purchase``, ``Product``, ``Order`` and ``OrderItem`` saves are picked up
+by the signal handlers in ``orders.signals``. Code paths that bypass signals
+(``QuerySet.update``, ``bulk_create``, ``bulk_update``) must call
+:func:`record_sales` / :func:`record_refunds` / :func:`refresh_vendor_product_counts` /
+:func:`refresh_order_vendors` / :func:`sync_order_vendor_status` /
+:func:`refresh_split_order_status` themselves.
+
+Each helper writes a whole batch with a fixed number of statements (per
+``BATCH_SIZE`` rows): an ``INSERT ... ON CONFLICT DO NOTHING`` for missing
+rows and one ``CASE``-based ``UPDATE`` per table, never one per row.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Tuple
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import DailySalesSummary, Order, OrderItem, OrderVendor, VendorStats
+
+logger = logging.getLogger(__name__)
+
+BucketKey = Tuple  # (date, vendor_id, product_id, payment_method)
+
+# Width of the VendorStats.sales_30d window, in days
+RECENT_SALES_DAYS = 30
+
+# Rows written per statement; keeps the bucket lookup's OR chain well inside SQLite's expression depth limit
+BATCH_SIZE = 250
+
+
+def _chunks(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _update_columns(queryset, key_field: str, rows: Dict[object, Dict[str, object]], increment: bool = False) -> None:
+    """Write per-row column values with one ``CASE``-based UPDATE per chunk.
+
+    ``rows`` maps a ``key_field`` value to ``{column: value}``. With
+    ``increment`` the values are added to the stored columns instead of
+    replacing them.
+    """
+    model = queryset.model
+    for chunk in _chunks(rows):
+        updates = {}
+        for column in {column for key in chunk for column in rows[key]}:
+            case = Case(
+                *[When(**{key_field: key}, then=Value(rows[key][column])) for key in chunk if column in rows[key]],
+                default=Value(0) if increment else F(column),
+                output_field=model._meta.get_field(column),
+            )
+            updates[column] = F(column) + case if increment else case
+        queryset.filter(**{f'{key_field}__in': chunk}).update(**updates)
+
+
+def _vendor_ids(purchases) -> Dict[int, int]:
+    """Map product id -> vendor id, using already-loaded products when possible."""
+    from products.models import Product
+
+    vendor_ids = {}
+    missing = set()
+    for p in purchases:
+        if p.product_id in vendor_ids:
+            continue
+        if 'product' in p._state.fields_cache and p.product is not None:
+            vendor_ids[p.product_id] = p.product.vendor_id
+        else:
+            missing.add(p.product_id)
+    if missing:
+        vendor_ids.update(Product.objects.filter(id__in=missing).values_list('id', 'vendor_id'))
+    return vendor_ids
+
+
+def _bucket_key(purchase, vendor_ids) -> BucketKey:
+    if purchase.product_id not in vendor_ids:
+        return None  # product already gone; its buckets are cascade-deleted
+    created_at = purchase.created_at or timezone.now()
+    return (
+        timezone.localdate(created_at),
+        vendor_ids[purchase.product_id],
+        purchase.product_id,
+        purchase.payment_method,
+    )
+
+
+def _apply(deltas: Dict[BucketKey, Dict[str, object]], create: bool = True) -> None:
+    """Add each delta to its bucket row, creating the row if needed.
+
+    Reversals (``create=False``) only touch existing rows, so a cascade
+    delete never re-creates a bucket for a product that is being removed.
+    """
+    if not deltas:
+        return
+    if create:
+        # Empty buckets first, so concurrent writers only ever increment
+        DailySalesSummary.objects.bulk_create([
+            DailySalesSummary(date=date, vendor_id=vendor_id, product_id=product_id, payment_method=payment_method)
+            for date, vendor_id, product_id, payment_method in deltas
+        ], ignore_conflicts=True, batch_size=BATCH_SIZE)
+    bucket_ids = {}
+    for chunk in _chunks(deltas):
+        match = Q()
+        for date, vendor_id, product_id, payment_method in chunk:
+            match |= Q(date=date, vendor_id=vendor_id, product_id=product_id, payment_method=payment_method)
+        for pk, *key in DailySalesSummary.objects.filter(match).values_list(
+                'pk', 'date', 'vendor_id', 'product_id', 'payment_method'):
+            bucket_ids[tuple(key)] = pk
+    _update_columns(
+        DailySalesSummary.objects.all(), 'pk',
+        {pk: deltas[key] for key, pk in bucket_ids.items()}, increment=True,
+    )
+
+
+def record_sales(purchases: Iterable, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) purchases from the sales columns."""
+    purchases = list(purchases)
+    if not purchases:
+        return
+    vendor_ids = _vendor_ids(purchases)
+    deltas = defaultdict(lambda: {'units': 0, 'gross': Decimal('0'), 'order_count': 0})
+    for p in purchases:
+        key = _bucket_key(p, vendor_ids)
+        if key is None:
+            continue
+        d = deltas[key]
+        d['units'] += sign * p.quantity
+        d['gross'] += sign * Decimal(str(p.amount))
+        d['order_count'] += sign
+    _apply(deltas, create=sign > 0)
+    _apply_vendor_deltas(deltas, {'lifetime_sales': 'gross', 'order_count': 'order_count'}, create=sign > 0)
+
+
+def record_refunds(purchases: Iterable, sign: int = 1) -> None:
+    """Add (sign=1) or reverse (sign=-1) refunds of purchases in the rollup."""
+    purchases = list(purchases)
+    if not purchases:
+        return
+    vendor_ids = _vendor_ids(purchases)
+    deltas = defaultdict(lambda: {'refunded_units': 0, 'refunded_amount': Decimal('0'), 'refund_count': 0})
+    for p in purchases:
+        key = _bucket_key(p, vendor_ids)
+        if key is None:
+            continue
+        d = deltas[key]
+        d['refunded_units'] += sign * p.quantity
+        d['refunded_amount'] += sign * Decimal(str(p.amount))
+        d['refund_count'] += sign
+    _apply(deltas, create=sign > 0)
+    _apply_vendor_deltas(deltas, {'lifetime_sales': 'refunded_amount'}, create=False, negate=True)
+
+
+def _ensure_vendor_stats(vendor_ids) -> None:
+    existing = set(VendorStats.objects.filter(vendor_id__in=vendor_ids).values_list('vendor_id', flat=True))
+    missing = [VendorStats(vendor_id=vid) for vid in vendor_ids if vid not in existing]
+    if missing:
+        VendorStats.objects.bulk_create(missing, ignore_conflicts=True)
+
+
+def _apply_vendor_deltas(deltas, fields: Dict[str, str], create: bool, negate: bool = False) -> None:
+    """Fold bucket deltas into VendorStats columns, then re-age the 30-day window.
+
+    ``fields`` maps a VendorStats column to the bucket delta feeding it.
+    """
+    per_vendor = defaultdict(lambda: defaultdict(int))
+    for (_, vendor_id, _, _), delta in deltas.items():
+        for column, source in fields.items():
+            per_vendor[vendor_id][column] += -delta[source] if negate else delta[source]
+    if not per_vendor:
+        return
+    if create:
+        _ensure_vendor_stats(per_vendor.keys())
+    _update_columns(VendorStats.objects.all(), 'vendor_id', per_vendor, increment=True)
+    refresh_vendor_recent_sales(per_vendor.keys())
+
+
+def refresh_vendor_recent_sales(vendor_ids) -> None:
+    """Recompute VendorStats.sales_30d from the daily rollup."""
+    vendor_ids = set(vendor_ids)
+    if not vendor_ids:
+        return
+    since = timezone.localdate() - timedelta(days=RECENT_SALES_DAYS - 1)
+    totals = dict(
+        DailySalesSummary.objects.filter(vendor_id__in=vendor_ids, date__gte=since)
+        .values('vendor').annotate(total=Sum(F('gross') - F('refunded_amount')))
+        .values_list('vendor', 'total')
+    )
+    _update_columns(VendorStats.objects.all(), 'vendor_id',
+                    {vendor_id: {'sales_30d': totals.get(vendor_id) or 0} for vendor_id in vendor_ids})
+
+
+def refresh_vendor_product_counts(vendor_ids, create: bool = True) -> None:
+    """Recompute the product, active and out-of-stock counts of the given vendors."""
+    from products.models import Product
+
+    vendor_ids = {vid for vid in vendor_ids if vid is not None}
+    if not vendor_ids:
+        return
+    if create:
+        _ensure_vendor_stats(vendor_ids)
+    counts = {
+        row['vendor']: row
+        for row in Product.objects.filter(vendor_id__in=vendor_ids).order_by().values('vendor').annotate(
+            product_count=Count('id'),
+            active_product_count=Count('id', filter=Q(status=Product.STATUS_ACTIVE)),
+            out_of_stock_count=Count('id', filter=Q(stock=0)),
+        )
+    }
+    columns = ('product_count', 'active_product_count', 'out_of_stock_count')
+    _update_columns(VendorStats.objects.all(), 'vendor_id', {
+        vendor_id: {column: counts.get(vendor_id, {}).get(column, 0) for column in columns}
+        for vendor_id in vendor_ids
+    })
+
+
+def refresh_order_vendors(order_ids) -> None:
+    """Recompute the OrderVendor rows of the given orders from their items."""
+    order_ids = {oid for oid in order_ids if oid is not None}
+    if not order_ids:
+        return
+    line_total = ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    rows = (
+        OrderItem.objects.filter(order_id__in=order_ids).order_by()
+        .values('order', 'product__vendor', 'order__status', 'order__created_at')
+        .annotate(subtotal=Sum(line_total), item_count=Count('id'), quantity=Sum('quantity'))
+    )
+    links = [
+        OrderVendor(
+            order_id=row['order'], vendor_id=row['product__vendor'], status=row['order__status'],
+            created_at=row['order__created_at'], subtotal=row['subtotal'] or 0,
+            item_count=row['item_count'], quantity=row['quantity'] or 0,
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        stale = OrderVendor.objects.filter(order_id__in=order_ids)
+        for link in links:
+            stale = stale.exclude(order_id=link.order_id, vendor_id=link.vendor_id)
+        stale.delete()
+        if links:
+            OrderVendor.objects.bulk_create(
+                links, update_conflicts=True, unique_fields=['order', 'vendor'],
+                update_fields=['status', 'created_at', 'subtotal', 'item_count', 'quantity'],
+            )
+
+
+def sync_order_vendor_status(orders, status: str) -> int:
+    """Copy a status just written to ``orders`` (ids or a queryset) onto their OrderVendor rows."""
+    return OrderVendor.objects.filter(order__in=orders).exclude(status=status).update(status=status)
+
+
+def refresh_split_order_status(parent_ids) -> None:
+    """Set each split order's status to that of its least advanced live sub-order.
+
+    A split order whose sub-orders were all cancelled is cancelled.
+    """
+    parent_ids = {pid for pid in parent_ids if pid is not None}
+    if not parent_ids:
+        return
+    statuses = defaultdict(set)
+    for parent_id, status in Order.objects.filter(parent_id__in=parent_ids).values_list('parent_id', 'status'):
+        statuses[parent_id].add(status)
+    by_status = defaultdict(list)
+    for parent_id in parent_ids:
+        live = [status for status in Order.STATUS_FLOW if status in statuses[parent_id]]
+        by_status[live[0] if live else Order.STATUS_CANCELLED].append(parent_id)
+    # One UPDATE per resulting status rather than one per order
+    now = timezone.now()
+    for status, ids in by_status.items():
+        Order.objects.filter(pk__in=ids).exclude(status=status).update(status=status, updated_at=now)
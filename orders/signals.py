@@ -0,0 +1,120 @@
+# orders/signals.py
+"""
+Signal handlers keeping the sales, vendor and order-vendor rollups in step
+with Purchase, Product, Order and OrderItem writes.
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from products.models import Product
+
+from . import rollups
+from .models import Order, OrderItem, Purchase
+
+
+# Purchase columns that decide which bucket a sale lands in and how much it adds
+_SALE_FIELDS = ('product_id', 'quantity', 'amount', 'payment_method', 'created_at')
+
+
+def _sale_state(purchase):
+    fields = purchase.__dict__
+    if any(name not in fields for name in _SALE_FIELDS):
+        return None
+    return tuple(fields[name] for name in _SALE_FIELDS)
+
+
+@receiver(post_init, sender=Purchase)
+def remember_refunded_state(sender, instance, **kwargs):
+    # Deferred-field loads (e.g. .only()) leave the attribute unset
+    instance._rollup_refunded = instance.__dict__.get('refunded')
+    instance._rollup_sale = _sale_state(instance)
+
+
+@receiver(post_save, sender=Purchase)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        rollups.record_sales([instance])
+        if instance.refunded:
+            rollups.record_refunds([instance])
+    elif (instance._rollup_sale is not None and instance._rollup_refunded is not None
+            and _sale_state(instance) != instance._rollup_sale):
+        # Amount, quantity, product, method or date edited (e.g. in the admin): move the sale
+        previous = Purchase(**dict(zip(_SALE_FIELDS, instance._rollup_sale)), refunded=instance._rollup_refunded)
+        rollups.record_sales([previous], sign=-1)
+        if previous.refunded:
+            rollups.record_refunds([previous], sign=-1)
+        rollups.record_sales([instance])
+        if instance.refunded:
+            rollups.record_refunds([instance])
+    elif instance._rollup_refunded is not None and instance.refunded != instance._rollup_refunded:
+        rollups.record_refunds([instance], sign=1 if instance.refunded else -1)
+    instance._rollup_refunded = instance.refunded
+    instance._rollup_sale = _sale_state(instance)
+
+
+@receiver(post_delete, sender=Purchase)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    rollups.record_sales([instance], sign=-1)
+    if instance.refunded:
+        rollups.record_refunds([instance], sign=-1)
+
+
+def _product_count_state(product):
+    fields = product.__dict__
+    if 'status' not in fields or 'stock' not in fields:
+        return None
+    return (fields.get('vendor_id'), fields['status'], fields['stock'] == 0)
+
+
+@receiver(post_init, sender=Product)
+def remember_product_state(sender, instance, **kwargs):
+    instance._stats_state = _product_count_state(instance)
+
+
+@receiver(post_save, sender=Product)
+def update_vendor_stats_on_product_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_state = instance._stats_state
+    new_state = _product_count_state(instance)
+    if created or old_state != new_state:
+        vendor_ids = {instance.vendor_id}
+        if old_state:
+            vendor_ids.add(old_state[0])
+        rollups.refresh_vendor_product_counts(vendor_ids)
+    instance._stats_state = new_state
+
+
+@receiver(post_delete, sender=Product)
+def update_vendor_stats_on_product_delete(sender, instance, **kwargs):
+    rollups.refresh_vendor_product_counts([instance.vendor_id], create=False)
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    instance._links_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Order)
+def update_order_vendors_on_order_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # New orders have no items yet; their rows appear with the first OrderItem
+    if not created and instance._links_status is not None and instance.status != instance._links_status:
+        rollups.sync_order_vendor_status([instance.pk], instance.status)
+        rollups.refresh_split_order_status([instance.parent_id])
+    instance._links_status = instance.status
+
+
+@receiver(post_save, sender=OrderItem)
+def update_order_vendors_on_item_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    rollups.refresh_order_vendors([instance.order_id])
+
+
+@receiver(post_delete, sender=OrderItem)
+def update_order_vendors_on_item_delete(sender, instance, **kwargs):
+    rollups.refresh_order_vendors([instance.order_id])
@@ -45,6 +45,7 @@ def process_stripe_event(event, saved_event=None):
             purchase = Purchase.objects.create(
                 customer=order.customer,
                 product=item.product,
+                order=order,
                 quantity=item.quantity,
                 amount=item.price * item.quantity,
                 payment_method='stripe',
@@ -72,7 +73,7 @@ def process_stripe_event(event, saved_event=None):
 
         # mark order completed
         order.status = Order.STATUS_COMPLETED
-        order.save()
+        order.save(update_fields=['status', 'updated_at'])
         if saved_event:
             saved_event.processed = True
             saved_event.save()
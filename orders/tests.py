@@ -2,11 +2,13 @@ from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from products.models import Product
-from orders.models import Purchase
+from orders.models import Order, Purchase
 from django.core import mail
 import json
+from decimal import Decimal
 from unittest.mock import patch
 from django.conf import settings
+from core.testing import QueryBudgetMixin
 
 User = get_user_model()
 
@@ -99,6 +101,27 @@ class MockPaymentTests(TestCase):
         self.assertIsNotNone(p)
         self.assertEqual(p.quantity, 2)
 
+    @override_settings(STRIPE_WEBHOOK_SECRET='whsec_test')
+    def test_stripe_webhook_accepts_signed_event(self):
+        import hashlib
+        import hmac
+        import time
+        from orders.models import Order, OrderItem
+        order = Order.objects.create(customer=self.customer, total=100.0, status='pending', delivery_address='', phone='')
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price=self.product.price)
+        payload = json.dumps({
+            'id': 'evt_signed_1', 'object': 'event', 'type': 'checkout.session.completed',
+            'data': {'object': {'id': 'cs_signed_1', 'object': 'checkout.session', 'metadata': {'order_id': str(order.id)}}},
+        })
+        timestamp = int(time.time())
+        signature = hmac.new(b'whsec_test', f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+        resp = self.client.post(reverse('orders:stripe_webhook'), data=payload, content_type='application/json',
+                                HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}')
+        self.assertEqual(resp.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'completed')
+        self.assertTrue(Purchase.objects.filter(transaction_id='cs_signed_1').exists())
+
     def test_admin_reprocess_events(self):
         # create staff superuser
         staff = User.objects.create_user(username='admin', password='pass', email='a@example.com', is_staff=True, is_superuser=True)
@@ -142,3 +165,892 @@ class MockPaymentTests(TestCase):
         p = Purchase.objects.filter(transaction_id='cs_test_admin_123').first()
         self.assertIsNotNone(p)
         self.assertEqual(p.quantity, 2)
+
+
+class EnhancedAdminDashboardTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from orders.models import StripeWebhookEvent
+        cache.clear()
+        customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        for total, status in ((100, 'pending'), (300, 'completed')):
+            Order.objects.create(customer=customer, total=total, status=status, delivery_address='Kigali', phone='0788000000')
+        StripeWebhookEvent.objects.create(stripe_event_id='evt_1', event_type='checkout.session.completed', processed=True)
+        StripeWebhookEvent.objects.create(stripe_event_id='evt_2', event_type='checkout.session.completed')
+        admin_user = User.objects.create_user(username='admin', password='pass', email='a@example.com', is_staff=True)
+        self.client.force_login(admin_user)
+
+    def test_dashboard_renders_with_order_and_webhook_stats(self):
+        response = self.client.get(reverse('orders:enhanced_admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        stats = response.context['stats']
+        self.assertEqual((stats['orders']['total'], stats['orders']['pending'], stats['orders']['completed']), (2, 1, 1))
+        self.assertEqual(stats['orders']['avg_value'], Decimal('200'))
+        self.assertEqual((stats['webhooks']['total'], stats['webhooks']['processed'], stats['webhooks']['success_rate']), (2, 1, 50.0))
+
+    def test_average_order_value_is_zero_without_orders(self):
+        from orders.admin import AdminDashboardView
+        Order.objects.all().delete()
+        stats = AdminDashboardView.compute_dashboard_stats()
+        self.assertEqual((stats['orders']['total'], stats['orders']['avg_value']), (0, 0))
+
+
+class DailySalesRollupTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        self.product = Product.objects.create(vendor=self.vendor, name='Test Wood', price=100.00, stock=10)
+
+    def _rollup(self):
+        from orders.models import DailySalesSummary
+        return list(DailySalesSummary.objects.values(
+            'vendor', 'product', 'payment_method', 'units', 'gross', 'order_count',
+            'refunded_units', 'refunded_amount', 'refund_count',
+        ))
+
+    def test_purchases_and_refunds_update_rollup(self):
+        Purchase.objects.create(customer=self.customer, product=self.product, quantity=2, amount=200, payment_method='momo')
+        p = Purchase.objects.create(customer=self.customer, product=self.product, quantity=1, amount=100, payment_method='momo')
+        p.refunded = True
+        p.save()
+        row = self._rollup()[0]
+        self.assertEqual((row['units'], row['gross'], row['order_count']), (3, 300, 2))
+        self.assertEqual((row['refunded_units'], row['refunded_amount'], row['refund_count']), (1, 100, 1))
+        p.delete()
+        row = self._rollup()[0]
+        self.assertEqual((row['units'], row['gross'], row['order_count'], row['refund_count']), (2, 200, 1, 0))
+
+    def test_edited_purchases_move_their_sales(self):
+        from orders.models import VendorStats
+        other_vendor = User.objects.create_user(username='vendor2', password='pass', user_type='vendor', email='w@example.com')
+        chair = Product.objects.create(vendor=other_vendor, name='Chair', price=40, stock=10)
+        Purchase.objects.create(customer=self.customer, product=self.product, quantity=2, amount=200, payment_method='momo', refunded=True)
+        p = Purchase.objects.get()
+        p.quantity, p.amount = 3, Decimal('300')
+        p.save()
+        row = self._rollup()[0]
+        self.assertEqual((row['units'], row['gross'], row['refunded_units'], row['refunded_amount']), (3, 300, 3, 300))
+
+        p.product, p.amount = chair, Decimal('120')
+        p.save()
+        rows = {row['product']: row for row in self._rollup()}
+        self.assertEqual((rows[self.product.id]['units'], rows[self.product.id]['gross'], rows[self.product.id]['order_count']), (0, 0, 0))
+        self.assertEqual((rows[chair.id]['units'], rows[chair.id]['gross'], rows[chair.id]['refund_count']), (3, 120, 1))
+        stats = dict(VendorStats.objects.values_list('vendor', 'order_count'))
+        self.assertEqual((stats[self.vendor.id], stats[other_vendor.id]), (0, 1))
+
+    def test_rebuild_command_matches_incremental_rollup(self):
+        from django.core.management import call_command
+        from io import StringIO
+        Purchase.objects.create(customer=self.customer, product=self.product, quantity=2, amount=200, payment_method='bank')
+        Purchase.objects.create(customer=self.customer, product=self.product, quantity=1, amount=100, payment_method='momo', refunded=True)
+        incremental = sorted(self._rollup(), key=lambda r: r['payment_method'])
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+        self.assertEqual(sorted(self._rollup(), key=lambda r: r['payment_method']), incremental)
+
+
+class VendorStatsTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        self.product = Product.objects.create(vendor=self.vendor, name='Test Wood', price=100.00, stock=10)
+        Product.objects.create(vendor=self.vendor, name='Old Stock', price=50.00, stock=0, status='inactive')
+
+    def test_stats_follow_product_and_purchase_events(self):
+        from orders.models import VendorStats
+        p = Purchase.objects.create(customer=self.customer, product=self.product, quantity=2, amount=200)
+        Purchase.objects.create(customer=self.customer, product=self.product, quantity=1, amount=100)
+        p.refunded = True
+        p.save()
+        self.product.stock = 0
+        self.product.save()
+
+        stats = VendorStats.objects.get(vendor=self.vendor)
+        self.assertEqual((stats.product_count, stats.active_product_count, stats.out_of_stock_count), (2, 1, 2))
+        self.assertEqual(stats.lifetime_sales, 100)
+        self.assertEqual(stats.sales_30d, 100)
+        self.assertEqual(stats.order_count, 2)
+
+    def test_refresh_command_matches_incremental_stats(self):
+        from django.core.management import call_command
+        from io import StringIO
+        from orders.models import VendorStats
+        Purchase.objects.create(customer=self.customer, product=self.product, quantity=2, amount=200, refunded=True)
+        Purchase.objects.create(customer=self.customer, product=self.product, quantity=1, amount=100)
+        fields = ('product_count', 'active_product_count', 'out_of_stock_count', 'lifetime_sales', 'sales_30d', 'order_count')
+        incremental = VendorStats.objects.values(*fields).get(vendor=self.vendor)
+        call_command('refresh_vendor_stats', stdout=StringIO())
+        self.assertEqual(VendorStats.objects.values(*fields).get(vendor=self.vendor), incremental)
+
+
+class SeedScaleCommandTests(TestCase):
+    def seed(self, prefix, **options):
+        from django.core.management import call_command
+        from io import StringIO
+        options = {'vendors': 3, 'customers': 10, 'products': 20, 'orders': 60, 'batch_size': 25,
+                   'until': '2026-06-30', 'days': 30, **options}
+        call_command('seed_scale', prefix=prefix, stdout=StringIO(), **options)
+
+    def orders_of(self, prefix):
+        from orders.models import Order
+        return Order.objects.filter(customer__username__startswith=f'{prefix}_').order_by('id')
+
+    def test_generates_consistent_orders(self):
+        from django.db.models import Count
+        from core.models import DeliveryTracking
+        from orders.models import DailySalesSummary, OrderItem, VendorStats
+        self.seed('a')
+        orders = self.orders_of('a')
+        self.assertEqual(orders.count(), 60)
+        self.assertEqual(User.objects.filter(username__startswith='a_vendor_').count(), 3)
+        self.assertTrue(self.client.login(username='a_customer_000001', password='seedpass'))
+        for order in orders.prefetch_related('items'):
+            self.assertTrue(order.items.all())
+            self.assertEqual(order.total, order.total_with_tax.quantize(Decimal('0.01')))
+            self.assertLess(abs(order.delivery_latitude - Decimal('-1.9441')), 1)
+        self.assertTrue(orders.annotate(vendors=Count('items__product__vendor', distinct=True)).filter(vendors__gt=1))
+        self.assertTrue(DeliveryTracking.objects.filter(order__in=orders, history__isnull=False).exists())
+        self.assertEqual(Purchase.objects.filter(customer__username__startswith='a_').count(),
+                         OrderItem.objects.filter(order__in=orders, order__vendor_confirmed=True).count())
+        self.assertTrue(DailySalesSummary.objects.exists())
+        self.assertTrue(VendorStats.objects.exists())
+        # Primary keys keep counting after the explicitly numbered rows
+        self.assertGreater(Product.objects.create(vendor=orders[0].customer, name='x', price=1).id,
+                           Product.objects.filter(name__contains='#').order_by('-id')[0].id)
+
+    def test_same_seed_same_data(self):
+        from django.core.management.base import CommandError
+        self.seed('a', seed=7)
+        self.seed('b', seed=7)
+        fields = ('total', 'status', 'created_at', 'payment_method')
+        self.assertEqual(list(self.orders_of('a').values_list(*fields)), list(self.orders_of('b').values_list(*fields)))
+        with self.assertRaises(CommandError):
+            self.seed('a')
+
+
+class BulkRefundTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='staff', password='pass', email='s@example.com', is_staff=True)
+        self.vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        self.products = [
+            Product.objects.create(vendor=self.vendor, name=f'Wood {i}', price=100.00, stock=10) for i in range(2)
+        ]
+
+    def _purchases(self, n):
+        return [
+            Purchase.objects.create(customer=self.customer, product=self.products[i % 2], quantity=2, amount=200)
+            for i in range(n)
+        ]
+
+    def _refund(self, purchases):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from orders.refunds import refund_purchases
+        with CaptureQueriesContext(connection) as ctx:
+            result = refund_purchases(Purchase.objects.filter(id__in=[p.id for p in purchases]), self.staff, 'damaged')
+        return result, len(ctx)
+
+    def test_batch_refund_restocks_logs_and_queues_emails(self):
+        from orders.models import PurchaseLog, QueuedEmail, VendorStats
+        purchases = self._purchases(4)
+        result, _ = self._refund(purchases)
+        self.assertEqual((result.count, result.restocked_units), (4, 8))
+        for product in self.products:
+            product.refresh_from_db()
+            self.assertEqual(product.stock, 14)
+        self.assertEqual(Purchase.objects.filter(refunded=True, refund_reason='damaged', refunded_by=self.staff).count(), 4)
+        self.assertEqual(PurchaseLog.objects.filter(action=PurchaseLog.ACTION_REFUND).count(), 4)
+        self.assertEqual(QueuedEmail.objects.filter(sent_at__isnull=True).count(), 8)
+        self.assertEqual(VendorStats.objects.get(vendor=self.vendor).lifetime_sales, 0)
+
+        # Refunding again is a no-op
+        result, _ = self._refund(purchases)
+        self.assertEqual((result.count, result.skipped), (0, 4))
+
+    def _spread_purchases(self, n):
+        """One purchase per product, spread over n // 5 vendors and n different days."""
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        from io import StringIO
+        start = Product.objects.count()
+        vendors = [
+            User.objects.create_user(username=f'spread{start + i}', password='pass', user_type='vendor',
+                                     email=f'spread{start + i}@example.com')
+            for i in range(max(n // 5, 1))
+        ]
+        purchases = []
+        for i in range(n):
+            product = Product.objects.create(vendor=vendors[i % len(vendors)], name=f'Wood {start + i}', price=100, stock=10)
+            purchases.append(Purchase.objects.create(customer=self.customer, product=product, quantity=2, amount=200))
+            Purchase.objects.filter(pk=purchases[-1].pk).update(created_at=timezone.now() - timedelta(days=i))
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+        return purchases
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        from orders.models import DailySalesSummary, VendorStats
+        _, small = self._refund(self._spread_purchases(2))
+        # 40 purchases queue 80 emails, inside one SQLite bulk INSERT
+        _, large = self._refund(self._spread_purchases(40))
+        self.assertEqual(large, small)
+        self.assertEqual(DailySalesSummary.objects.filter(refund_count=1).count(), 42)
+        self.assertFalse(VendorStats.objects.exclude(lifetime_sales=0).exists())
+
+    def test_send_queued_emails_delivers_once(self):
+        from django.core.management import call_command
+        from io import StringIO
+        self._refund(self._purchases(1))
+        call_command('send_queued_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].subject, f'Purchase #{Purchase.objects.get().id} refunded')
+        call_command('send_queued_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_send_queued_emails_skips_rows_claimed_by_another_run(self):
+        import uuid
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        from io import StringIO
+        from orders.models import QueuedEmail
+        self._refund(self._purchases(1))
+        first, second = QueuedEmail.objects.all()
+        QueuedEmail.objects.filter(id=first.id).update(claim_token=uuid.uuid4(), claimed_at=timezone.now())
+        call_command('send_queued_emails', stdout=StringIO())
+        self.assertEqual([m.to for m in mail.outbox], [[second.to_email]])
+
+        # A sender that died mid-batch releases its claim after the timeout
+        QueuedEmail.objects.filter(id=first.id).update(claimed_at=timezone.now() - timedelta(minutes=11))
+        call_command('send_queued_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(QueuedEmail.objects.filter(sent_at__isnull=True).exists())
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        from orders.models import Order
+        self.vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        self.product = Product.objects.create(vendor=self.vendor, name='Test Wood', price=100.00, stock=10)
+        self.order = Order.objects.create(customer=self.customer, total=100.0, status='pending', delivery_address='', phone='')
+
+    def test_tracking_location_requires_login(self):
+        url = reverse('orders:get_tracking_location', args=[self.order.id])
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_tracking_location(self):
+        from core.models import DeliveryTracking
+        self.client.force_login(self.customer)
+        url = reverse('orders:get_tracking_location', args=[self.order.id])
+        self.assertEqual(self.client.get(url).json()['error'], 'No tracking information')
+        self.assertEqual(self.client.get(reverse('orders:get_tracking_location', args=[999999])).json()['error'],
+                         'Order not found')
+
+        DeliveryTracking.objects.create(order=self.order, current_latitude='-1.944', current_longitude='30.061')
+        data = self.client.get(url).json()
+        self.assertEqual(data['status'], 'pending')
+        self.assertEqual(data['current_latitude'], -1.944)
+
+    def test_tracking_location_access_and_history(self):
+        from core.models import DeliveryTracking, DeliveryTrackingHistory
+        from orders.models import OrderItem
+        tracking = DeliveryTracking.objects.create(order=self.order, status='in_transit')
+        for i in range(3):
+            DeliveryTrackingHistory.objects.create(tracking=tracking, latitude=f'-1.94{i}', longitude='30.061',
+                                                   status='in_transit', note=f'stop {i}')
+        url = reverse('orders:get_tracking_location', args=[self.order.id])
+
+        stranger = User.objects.create_user(username='cust2', password='pass', user_type='customer', email='d@example.com')
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.vendor)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1, price=100)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.force_login(self.customer)
+        self.assertNotIn('history', self.client.get(url).json())
+        data = self.client.get(url, {'history': 2}).json()
+        self.assertEqual([p['note'] for p in data['history']], ['stop 1', 'stop 2'])
+        self.assertEqual(data['tracking_number'], self.order.formatted_tracking_number)
+
+    async def test_async_client_runs_views_natively(self):
+        from orders.models import Order
+        await self.async_client.aforce_login(self.customer)
+        resp = await self.async_client.get(reverse('orders:stripe_checkout', args=[self.product.id]))
+        self.assertEqual(resp.status_code, 200)
+        # Showing the checkout form must not leave a pending order behind
+        self.assertEqual(await Order.objects.acount(), 1)
+        resp = await self.async_client.get(reverse('core:exchange_rates'))
+        self.assertEqual(resp.status_code, 200)
+
+
+class MyOrdersPageTests(TestCase):
+    def setUp(self):
+        from orders.models import Order, OrderItem
+        vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        other = User.objects.create_user(username='cust2', password='pass', user_type='customer', email='d@example.com')
+        product = Product.objects.create(vendor=vendor, name='Test Wood', price=100, stock=10)
+        for customer in [self.customer] * 12 + [other]:
+            order = Order.objects.create(customer=customer, total=236, delivery_address='Kigali', phone='0788000000')
+            OrderItem.objects.create(order=order, product=product, quantity=2, price=100)
+            Purchase.objects.create(customer=customer, product=product, quantity=1, amount=100)
+            Purchase.objects.create(customer=customer, product=product, quantity=1, amount=100)
+        self.client.force_login(self.customer)
+
+    def test_orders_are_paged_newest_first(self):
+        from orders.views import MY_ORDERS_PER_PAGE
+        url = reverse('orders:my_orders')
+        first = self.client.get(url).context['page']
+        self.assertEqual(len(first), MY_ORDERS_PER_PAGE)
+        self.assertTrue(first.has_next)
+        second = self.client.get(url, {'cursor': first.next_cursor}).context['page']
+        self.assertEqual(len(second), 12 - MY_ORDERS_PER_PAGE)
+        self.assertFalse(second.has_next)
+        seen = [o.id for o in first] + [o.id for o in second]
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertTrue(all(o.customer_id == self.customer.id for o in first.object_list + second.object_list))
+
+    def test_purchases_tab(self):
+        from orders.views import MY_PURCHASES_PER_PAGE
+        response = self.client.get(reverse('orders:my_orders'), {'tab': 'purchases'})
+        self.assertEqual(response.context['tab'], 'purchases')
+        self.assertNotIn('orders', response.context)
+        self.assertEqual(len(response.context['page']), min(24, MY_PURCHASES_PER_PAGE))
+
+
+    def test_tracking_panels_load_on_demand(self):
+        from core.models import DeliveryTracking
+        from orders.models import Order
+        url = reverse('orders:my_orders')
+        baseline = len(self.client.get(url).content)
+        for order in Order.objects.filter(customer=self.customer):
+            order.status = 'shipped'
+            order.save()
+            DeliveryTracking.objects.create(order=order, status='in_transit')
+        response = self.client.get(url)
+        # Each order only adds an empty placeholder; the panel itself comes from the tracking API
+        self.assertContains(response, 'data-tracking-url=', count=len(response.context['page']))
+        self.assertContains(response, 'js/tracking_panels.js', count=1)
+        self.assertLess(len(response.content) - baseline, 1000 * len(response.context['page']))
+
+
+class VendorOrdersInboxTests(TestCase):
+    def setUp(self):
+        from orders.models import Order, OrderItem
+        self.vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        other_vendor = User.objects.create_user(username='vendor2', password='pass', user_type='vendor', email='w@example.com')
+        customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        plank = Product.objects.create(vendor=self.vendor, name='Plank', price=100, stock=100)
+        beam = Product.objects.create(vendor=self.vendor, name='Beam', price=50, stock=100)
+        chair = Product.objects.create(vendor=other_vendor, name='Chair', price=999, stock=100)
+        for i in range(30):
+            order = Order.objects.create(customer=customer, total=0, status='shipped' if i % 3 == 0 else 'pending',
+                                         delivery_address='Kigali', phone='0788000000')
+            OrderItem.objects.create(order=order, product=plank, quantity=2, price=100)
+            OrderItem.objects.create(order=order, product=beam, quantity=1, price=50)
+            OrderItem.objects.create(order=order, product=chair, quantity=1, price=999)
+        Order.objects.create(customer=customer, total=0, delivery_address='Kigali', phone='0788000000')
+        self.client.force_login(self.vendor)
+
+    def test_orders_are_grouped_with_vendor_totals(self):
+        from orders.views import VENDOR_ORDERS_PER_PAGE
+        url = reverse('orders:vendor_orders')
+        first = self.client.get(url).context['page']
+        self.assertEqual(len(first), VENDOR_ORDERS_PER_PAGE)
+        link = first.object_list[0]
+        self.assertEqual(link.subtotal, Decimal('250.00'))
+        self.assertEqual(link.item_count, 2)
+        self.assertEqual(link.quantity, 3)
+
+        second = self.client.get(url, {'cursor': first.next_cursor}).context['page']
+        self.assertEqual(len(second), 30 - VENDOR_ORDERS_PER_PAGE)
+        self.assertFalse(second.has_next)
+
+    def test_status_filter(self):
+        response = self.client.get(reverse('orders:vendor_orders'), {'status': 'shipped'})
+        self.assertEqual(response.context['status'], 'shipped')
+        self.assertEqual(len(response.context['page']), 10)
+        self.assertTrue(all(link.order.status == 'shipped' for link in response.context['page']))
+        response = self.client.get(reverse('orders:vendor_orders'), {'status': 'bogus'})
+        self.assertEqual(response.context['status'], '')
+
+
+class OrderVendorTests(TestCase):
+    def setUp(self):
+        from orders.models import Order, OrderItem
+        self.vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.other_vendor = User.objects.create_user(username='vendor2', password='pass', user_type='vendor', email='w@example.com')
+        customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        self.plank = Product.objects.create(vendor=self.vendor, name='Plank', price=100, stock=100)
+        self.chair = Product.objects.create(vendor=self.other_vendor, name='Chair', price=40, stock=100)
+        self.order = Order.objects.create(customer=customer, total=0, delivery_address='Kigali', phone='0788000000')
+        OrderItem.objects.create(order=self.order, product=self.plank, quantity=2, price=100)
+        OrderItem.objects.create(order=self.order, product=self.plank, quantity=1, price=90)
+        self.chair_item = OrderItem.objects.create(order=self.order, product=self.chair, quantity=1, price=40)
+
+    def links(self):
+        return {link.vendor_id: link for link in self.order.vendor_links.all()}
+
+    def test_rows_follow_items_and_status(self):
+        from orders.models import Order
+        links = self.links()
+        self.assertEqual(set(links), {self.vendor.id, self.other_vendor.id})
+        self.assertEqual((links[self.vendor.id].subtotal, links[self.vendor.id].item_count, links[self.vendor.id].quantity),
+                         (Decimal('290.00'), 2, 3))
+
+        order = Order.objects.get(pk=self.order.pk)
+        order.status = Order.STATUS_SHIPPED
+        order.save()
+        self.assertEqual({link.status for link in self.links().values()}, {Order.STATUS_SHIPPED})
+
+        self.chair_item.delete()
+        self.assertEqual(set(self.links()), {self.vendor.id})
+
+    def test_admin_bulk_completion_updates_rows(self):
+        from orders.models import Order
+        admin_user = User.objects.create_user(username='admin', password='pass', email='a@example.com', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        self.client.post(reverse('admin:orders_order_changelist'),
+                         {'action': 'mark_completed', '_selected_action': [self.order.id]})
+        self.assertEqual({link.status for link in self.links().values()}, {Order.STATUS_COMPLETED})
+
+    def test_vendors_each_confirm_an_unsplit_order(self):
+        from orders.models import Order
+        self.order.status = Order.STATUS_AWAITING_CONFIRMATION
+        self.order.payment_method = 'bank'
+        self.order.save(update_fields=['status', 'payment_method', 'updated_at'])
+        url = reverse('orders:vendor_confirm_order', args=[self.order.id])
+
+        self.client.force_login(self.vendor)
+        self.client.post(url, {'action': 'confirm'})
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.STATUS_AWAITING_CONFIRMATION)
+        self.assertEqual({v: link.status for v, link in self.links().items()},
+                         {self.vendor.id: Order.STATUS_PROCESSING, self.other_vendor.id: Order.STATUS_AWAITING_CONFIRMATION})
+        # Confirming twice doesn't book the lines again
+        self.client.post(url, {'action': 'confirm'})
+        self.assertEqual(Purchase.objects.filter(order=self.order).count(), 2)
+
+        self.client.force_login(self.other_vendor)
+        self.client.post(url, {'action': 'confirm'})
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.status, order.vendor_confirmed_by), (Order.STATUS_PROCESSING, self.other_vendor))
+        self.assertEqual(sorted(Purchase.objects.filter(order=self.order).values_list('product_id', 'quantity')),
+                         sorted([(self.plank.id, 2), (self.plank.id, 1), (self.chair.id, 1)]))
+        self.plank.refresh_from_db()
+        self.chair.refresh_from_db()
+        self.assertEqual((self.plank.stock, self.chair.stock), (97, 99))
+        self.assertEqual({link.status for link in self.links().values()}, {Order.STATUS_PROCESSING})
+
+    def test_vendor_access_follows_rows(self):
+        outsider = User.objects.create_user(username='vendor3', password='pass', user_type='vendor', email='x@example.com')
+        self.client.force_login(outsider)
+        response = self.client.get(reverse('orders:vendor_order_details', args=[self.order.id]))
+        self.assertRedirects(response, reverse('orders:vendor_orders'))
+        self.client.force_login(self.other_vendor)
+        response = self.client.get(reverse('orders:vendor_order_details', args=[self.order.id]))
+        self.assertEqual([item.product_id for item in response.context['items']], [self.chair.id])
+
+    def test_rebuild_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from orders.models import OrderVendor
+        expected = {(link.vendor_id, link.subtotal, link.item_count) for link in self.links().values()}
+        OrderVendor.objects.all().delete()
+        call_command('rebuild_order_vendors', stdout=StringIO())
+        self.assertEqual({(link.vendor_id, link.subtotal, link.item_count) for link in self.links().values()}, expected)
+
+
+class SplitOrderTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.other_vendor = User.objects.create_user(username='vendor2', password='pass', user_type='vendor', email='w@example.com')
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com',
+                                                 location='Kigali', phone='0788000000')
+        self.plank = Product.objects.create(vendor=self.vendor, name='Plank', price=100, stock=10)
+        self.chair = Product.objects.create(vendor=self.other_vendor, name='Chair', price=40, stock=10)
+        self.client.force_login(self.customer)
+        session = self.client.session
+        session['cart'] = {str(self.plank.id): 2, str(self.chair.id): 1}
+        session.save()
+        self.client.post(reverse('orders:checkout_cart'), {'payment_method': 'bank', 'mobile_number': ''})
+        self.order = Order.objects.get(customer=self.customer, parent=None)
+        self.subs = {sub.vendor_id: sub for sub in self.order.sub_orders.all()}
+
+    def test_checkout_creates_one_sub_order_per_vendor(self):
+        from orders.models import OrderVendor
+        self.assertTrue(self.order.is_split)
+        self.assertFalse(self.order.items.exists())
+        self.assertEqual(set(self.subs), {self.vendor.id, self.other_vendor.id})
+        self.assertEqual([item.product_id for item in self.subs[self.vendor.id].items.all()], [self.plank.id])
+        self.assertEqual(self.subs[self.vendor.id].total, Decimal('200.00'))
+        self.assertEqual(self.order.subtotal, Decimal('240.00'))
+        self.assertEqual(set(OrderVendor.objects.values_list('vendor_id', 'order_id')),
+                         {(vendor_id, sub.id) for vendor_id, sub in self.subs.items()})
+
+        response = self.client.get(reverse('orders:my_orders'))
+        self.assertEqual([order.id for order in response.context['orders']], [self.order.id])
+
+    def test_vendors_confirm_their_own_sub_orders(self):
+        from orders.models import OrderVendor
+        for sub in Order.objects.filter(parent=self.order):
+            sub.status = Order.STATUS_AWAITING_CONFIRMATION
+            sub.payment_method = 'bank'
+            sub.save()
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.STATUS_AWAITING_CONFIRMATION)
+
+        own, other = self.subs[self.vendor.id], self.subs[self.other_vendor.id]
+        self.client.force_login(self.vendor)
+        response = self.client.post(reverse('orders:vendor_confirm_order', args=[other.id]), {'action': 'confirm'})
+        self.assertRedirects(response, reverse('orders:vendor_orders'))
+        self.client.post(reverse('orders:vendor_confirm_order', args=[own.id]), {'action': 'confirm'})
+
+        self.assertEqual(Order.objects.get(pk=own.pk).status, Order.STATUS_PROCESSING)
+        self.assertEqual(Order.objects.get(pk=other.pk).status, Order.STATUS_AWAITING_CONFIRMATION)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.STATUS_AWAITING_CONFIRMATION)
+        self.assertEqual(OrderVendor.objects.get(vendor=self.vendor).status, Order.STATUS_PROCESSING)
+        self.assertEqual(list(Purchase.objects.filter(transaction_id__startswith='BANK-').values_list('product_id', flat=True)),
+                         [self.plank.id])
+
+    def test_admin_completion_covers_sub_orders(self):
+        from orders.models import OrderVendor
+        admin_user = User.objects.create_user(username='admin', password='pass', email='a@example.com', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        self.client.post(reverse('admin:orders_order_changelist'),
+                         {'action': 'mark_completed', '_selected_action': [self.subs[self.vendor.id].id]})
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.STATUS_PENDING)
+        self.client.post(reverse('admin:orders_order_changelist'),
+                         {'action': 'mark_completed', '_selected_action': [self.order.id]})
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {Order.STATUS_COMPLETED})
+        self.assertEqual(set(OrderVendor.objects.values_list('status', flat=True)), {Order.STATUS_COMPLETED})
+
+    def test_admin_completion_under_a_status_filter(self):
+        from orders.models import OrderVendor
+        admin_user = User.objects.create_user(username='admin', password='pass', email='a@example.com', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        # The selection no longer matches the filter once the update has run
+        self.client.post(reverse('admin:orders_order_changelist') + '?status__exact=pending',
+                         {'action': 'mark_completed', '_selected_action': [self.order.id]})
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {Order.STATUS_COMPLETED})
+        self.assertEqual(set(OrderVendor.objects.values_list('status', flat=True)), {Order.STATUS_COMPLETED})
+
+
+class OrderSaveTests(TestCase):
+    def setUp(self):
+        from orders.models import OrderItem
+        vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        product = Product.objects.create(vendor=vendor, name='Plank', price=100, stock=10)
+        order = Order.objects.create(customer=customer, total=200, delivery_address='Kigali', phone='0788000000')
+        OrderItem.objects.create(order=order, product=product, quantity=2, price=100)
+        self.order = Order.objects.get(pk=order.pk)
+        self.admin = User.objects.create_user(username='admin', password='pass', email='a@example.com', is_staff=True, is_superuser=True)
+
+    def test_status_changes_keep_the_stored_total(self):
+        from orders.models import OrderVendor
+        self.client.force_login(self.admin)
+        self.client.post(reverse('company_admin:update_order_status', args=[self.order.id]), {'status': Order.STATUS_SHIPPED})
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.status, order.total, order.tax_amount), (Order.STATUS_SHIPPED, Decimal('200.00'), Decimal('0.00')))
+        self.assertEqual(OrderVendor.objects.get(order=order).status, Order.STATUS_SHIPPED)
+
+        order.status = Order.STATUS_DELIVERED
+        with self.assertNumQueries(2):  # the UPDATE and the OrderVendor sync; no item reads
+            order.save(update_fields=['status', 'updated_at'])
+
+    def test_admin_item_edits_recalculate_totals(self):
+        from django import forms
+        from orders.models import OrderVendor
+        self.client.force_login(self.admin)
+        url = reverse('admin:orders_order_change', args=[self.order.id])
+        context = self.client.get(url).context
+        data = {}
+        # Re-post the change form as rendered, with one item edited
+        for form in [context['adminform'].form, *context['inline_admin_formsets'][0].formset]:
+            for field in form:
+                value, widget = field.value(), field.field.widget
+                if isinstance(widget, forms.FileInput):
+                    continue
+                if isinstance(widget, forms.MultiWidget):
+                    data.update({f'{field.html_name}_{i}': part or '' for i, part in enumerate(widget.decompress(value))})
+                elif isinstance(widget, forms.CheckboxInput):
+                    if value:
+                        data[field.html_name] = 'on'
+                else:
+                    data[field.html_name] = '' if value is None else value
+        formset = context['inline_admin_formsets'][0].formset
+        data.update({f'{formset.prefix}-{key}': value for key, value in formset.management_form.initial.items()})
+        data[f'{formset.prefix}-0-quantity'] = 3
+
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.tax_amount, order.total), (Decimal('54.00'), Decimal('354.00')))
+        self.assertEqual(OrderVendor.objects.get(order=order).subtotal, Decimal('300.00'))
+
+    def test_pricing_changes_recalculate_totals(self):
+        order = self.order
+        order.delivery_cost = Decimal('50.00')
+        order.save(update_fields=['delivery_cost'])
+        order = Order.objects.get(pk=order.pk)
+        self.assertEqual((order.tax_amount, order.total), (Decimal('45.00'), Decimal('295.00')))
+
+
+class OrderArchiveTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from core.models import DeliveryTracking, DeliveryTrackingHistory
+        from orders.models import OrderItem, PurchaseLog, StripeWebhookEvent
+        vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        product = Product.objects.create(vendor=vendor, name='Plank', price=100, stock=100)
+
+        def order(status, days_ago, **fields):
+            created = Order.objects.create(customer=self.customer, total=200, status=status,
+                                           delivery_address='Kigali', phone='0788000000', **fields)
+            OrderItem.objects.create(order=created, product=product, quantity=2, price=100)
+            purchase = Purchase.objects.create(customer=self.customer, product=product, order=created, quantity=2, amount=200)
+            PurchaseLog.objects.create(purchase=purchase, action=PurchaseLog.ACTION_PURCHASE, actor=self.customer,
+                                       note=f'Order #{created.id}')
+            Order.objects.filter(pk=created.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+            Purchase.objects.filter(pk=purchase.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+            return created
+
+        self.old = order(Order.STATUS_COMPLETED, 400)
+        self.old_open = order(Order.STATUS_PENDING, 450)
+        self.recent = order(Order.STATUS_COMPLETED, 10)
+        self.parent = Order.objects.create(customer=self.customer, total=200, status=Order.STATUS_CANCELLED, is_split=True,
+                                           delivery_address='Kigali', phone='0788000000')
+        self.sub_order = order(Order.STATUS_CANCELLED, 300, parent=self.parent, vendor=vendor)
+        Order.objects.filter(pk=self.parent.pk).update(created_at=timezone.now() - timedelta(days=300))
+        tracking = DeliveryTracking.objects.create(order=self.old, status=DeliveryTracking.STATUS_DELIVERED)
+        DeliveryTrackingHistory.objects.create(tracking=tracking, latitude=-1.94, longitude=30.06, status='delivered')
+        self.webhook = StripeWebhookEvent.objects.create(event_type='checkout.session.completed', order=self.old)
+
+    def archive(self):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('archive_orders', '--days', '200', '--batch-size', '1', stdout=StringIO())
+
+    def test_moves_finished_orders_with_their_rows(self):
+        from core.models import ArchivedDeliveryTracking, DeliveryTracking
+        from orders.models import ArchivedOrder, ArchivedPurchase, DailySalesSummary, OrderVendor, StripeWebhookEvent
+        sales = list(DailySalesSummary.objects.values_list('units', 'gross'))
+        self.archive()
+
+        moved = {self.old.id, self.parent.id, self.sub_order.id}
+        self.assertEqual(set(ArchivedOrder.objects.values_list('id', flat=True)), moved)
+        self.assertEqual(set(Order.objects.values_list('id', flat=True)), {self.old_open.id, self.recent.id})
+        archived = ArchivedOrder.objects.get(pk=self.old.pk)
+        self.assertEqual((archived.status, archived.total, archived.subtotal), (Order.STATUS_COMPLETED, Decimal('200.00'), Decimal('200.00')))
+        self.assertEqual(archived.purchases.get().logs.get().note, f'Order #{self.old.id}')
+        self.assertEqual(archived.tracking.history.count(), 1)
+        self.assertEqual(ArchivedOrder.objects.get(pk=self.sub_order.pk).parent_id, self.parent.id)
+        self.assertEqual(ArchivedPurchase.objects.count(), 2)
+        self.assertEqual(Purchase.objects.count(), 2)
+        self.assertFalse(DeliveryTracking.objects.exists())
+        self.assertTrue(ArchivedDeliveryTracking.objects.exists())
+        self.assertFalse(OrderVendor.objects.filter(order_id__in=moved).exists())
+        self.assertIsNone(StripeWebhookEvent.objects.get(pk=self.webhook.pk).order_id)
+        # Archiving is not a refund: the sales rollup keeps the archived sales
+        self.assertEqual(list(DailySalesSummary.objects.values_list('units', 'gross')), sales)
+
+    def test_history_views_read_both_tables(self):
+        self.archive()
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse('orders:my_orders'))
+        self.assertEqual([order.id for order in response.context['orders']],
+                         [self.recent.id, self.parent.id, self.old.id, self.old_open.id])
+        self.assertEqual([item.product.name for item in response.context['orders'].object_list[2].items.all()], ['Plank'])
+        response = self.client.get(reverse('orders:my_orders'), {'tab': 'purchases'})
+        self.assertEqual(len(response.context['purchases']), 4)
+
+        from orders import views
+        with patch.object(views, 'MY_ORDERS_PER_PAGE', 2):
+            first = self.client.get(reverse('orders:my_orders')).context['page']
+            second = self.client.get(reverse('orders:my_orders'), {'cursor': first.next_cursor}).context['page']
+        self.assertEqual([order.id for order in second], [self.old.id, self.old_open.id])
+
+        response = self.client.get(reverse('orders:confirmation', args=[self.parent.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['order'].is_archived)
+        self.assertEqual([item.product.name for item in response.context['items']], ['Plank'])
+
+    def test_moves_old_purchases_without_an_order(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from orders.models import ArchivedPurchase, PurchaseLog, QueuedEmail
+        product = Product.objects.get()
+        old, recent = (Purchase.objects.create(customer=self.customer, product=product, quantity=1, amount=100) for _ in range(2))
+        Purchase.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=400))
+        PurchaseLog.objects.create(purchase=old, action=PurchaseLog.ACTION_PURCHASE, actor=self.customer, note='Mock checkout')
+        QueuedEmail.objects.create(template='emails/refund.html', subject='Refund', to_email='c@example.com', purchase=old)
+        self.archive()
+
+        self.assertTrue(Purchase.objects.filter(pk=recent.pk).exists())
+        self.assertFalse(Purchase.objects.filter(pk=old.pk).exists())
+        archived = ArchivedPurchase.objects.get(pk=old.pk)
+        self.assertEqual((archived.order_id, archived.logs.get().note), (None, 'Mock checkout'))
+        self.assertFalse(QueuedEmail.objects.filter(purchase_id=old.pk).exists())
+
+    def test_vendor_detail_includes_archived_orders(self):
+        from orders.models import OrderVendor
+        # setUp backdates the orders with update(); their vendor rows follow suit
+        for order_id, created_at in Order.objects.values_list('id', 'created_at'):
+            OrderVendor.objects.filter(order_id=order_id).update(created_at=created_at)
+        self.archive()
+        staff = User.objects.create_user(username='staff', password='pass', email='s@example.com', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('company_admin:vendor_detail', args=[Product.objects.get().vendor_id]))
+        self.assertEqual([row['order_id'] for row in response.context['recent_orders']],
+                         [self.recent.id, self.sub_order.id, self.old.id, self.old_open.id])
+        self.assertEqual([(row['status'], row['orders'], row['revenue']) for row in response.context['orders_by_status']], [
+            (Order.STATUS_CANCELLED, 1, Decimal('200.00')),
+            (Order.STATUS_COMPLETED, 2, Decimal('400.00')),
+            (Order.STATUS_PENDING, 1, Decimal('200.00')),
+        ])
+        self.assertContains(response, 'cust1')
+
+    def test_rebuild_sales_rollup_counts_archived_purchases(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from orders.models import DailySalesSummary
+        self.archive()
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+        self.assertEqual(sum(DailySalesSummary.objects.values_list('units', flat=True)), 8)
+
+    def test_archive_tables_cover_every_live_column(self):
+        from core.models import (
+            ArchivedDeliveryTracking, ArchivedDeliveryTrackingHistory, DeliveryTracking, DeliveryTrackingHistory,
+        )
+        from orders.models import (
+            ArchivedOrder, ArchivedOrderItem, ArchivedPurchase, ArchivedPurchaseLog, OrderItem, PurchaseLog,
+        )
+        pairs = [
+            (Order, ArchivedOrder), (OrderItem, ArchivedOrderItem), (Purchase, ArchivedPurchase),
+            (PurchaseLog, ArchivedPurchaseLog), (DeliveryTracking, ArchivedDeliveryTracking),
+            (DeliveryTrackingHistory, ArchivedDeliveryTrackingHistory),
+        ]
+        for live, archive in pairs:
+            with self.subTest(model=live.__name__):
+                self.assertEqual({f.column for f in live._meta.concrete_fields},
+                                 {f.column for f in archive._meta.concrete_fields})
+
+
+class MarketplaceFixtureMixin:
+    """Vendors, customers, orders, purchases and tracking that grow on demand."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='pass', email='a@example.com', is_staff=True, is_superuser=True)
+        self.vendor = User.objects.create_user(username='vendor1', password='pass', user_type='vendor', email='v@example.com')
+        self.customer = User.objects.create_user(username='cust1', password='pass', user_type='customer', email='c@example.com')
+        self.products = []
+        self.order = None
+        self.grow_fixture()
+
+    def grow_fixture(self):
+        from core.models import DeliveryTracking
+        from orders.models import Order, OrderItem, PurchaseLog, StripeWebhookEvent
+        n = User.objects.count()
+        other_vendor = User.objects.create_user(username=f'vendor{n}', password='pass', user_type='vendor', email='v@example.com')
+        other_customer = User.objects.create_user(username=f'cust{n}', password='pass', user_type='customer', email='c@example.com')
+        for vendor in (self.vendor, other_vendor):
+            for i in range(2):
+                self.products.append(Product.objects.create(vendor=vendor, name=f'Plank {len(self.products)}', price=100, stock=100))
+
+        for customer in (self.customer, self.customer, self.customer, other_customer):
+            order = Order.objects.create(customer=customer, total=0, status='shipped', delivery_address='Kigali', phone='0788000000')
+            for product in self.products[-4:]:
+                OrderItem.objects.create(order=order, product=product, quantity=2, price=product.price)
+                purchase = Purchase.objects.create(customer=customer, product=product, quantity=2, amount=200, payment_method='momo')
+                PurchaseLog.objects.create(purchase=purchase, action=PurchaseLog.ACTION_PURCHASE, actor=customer)
+            DeliveryTracking.objects.create(order=order, current_latitude='-1.944', current_longitude='30.061')
+            StripeWebhookEvent.objects.create(stripe_event_id=f'evt_{order.id}', event_type='checkout.session.completed', order=order)
+        if self.order is None:
+            self.order = Order.objects.filter(customer=self.customer).first()
+            self.purchase = Purchase.objects.filter(customer=self.customer).first()
+        else:
+            # The pages showing one order must not grow with its items either
+            for product in self.products[-4:]:
+                OrderItem.objects.create(order=self.order, product=product, quantity=1, price=product.price)
+
+        session = self.client.session
+        session['cart'] = {str(p.id): 1 for p in self.products}
+        session.save()
+
+
+class CustomerViewQueryBudgetTests(MarketplaceFixtureMixin, QueryBudgetMixin, TestCase):
+    def test_customer_pages(self):
+        self.client.force_login(self.customer)
+        self.grow_fixture()  # refresh the cart in the logged-in session
+        self.assertQueryBudgets({
+            reverse('products:home_page'): 2,
+            reverse('products:product_list'): 3,
+            reverse('products:product_detail', args=[self.products[0].id]): 3,
+            reverse('orders:my_orders'): 5,
+            reverse('orders:my_orders') + '?tab=purchases': 3,
+            reverse('orders:cart_view'): 2,
+            reverse('orders:confirmation', args=[self.order.id]): 3,
+            reverse('orders:payment_processing', args=[self.order.id]): 4,
+            reverse('orders:track_delivery', args=[self.order.id]): 4,
+            reverse('orders:get_tracking_location', args=[self.order.id]) + '?history=10': 5,
+            reverse('orders:purchase_detail', args=[self.purchase.pk]): 2,
+            reverse('orders:stripe_success', args=[self.order.id]): 2,
+            reverse('orders:stripe_order_status', args=[self.order.id]): 2,
+            reverse('orders:checkout', args=[self.products[0].id]): 2,
+        })
+
+
+class VendorViewQueryBudgetTests(MarketplaceFixtureMixin, QueryBudgetMixin, TestCase):
+    def test_vendor_pages(self):
+        self.client.force_login(self.vendor)
+        self.assertQueryBudgets({
+            reverse('orders:vendor_orders'): 2,
+            reverse('orders:vendor_order_details', args=[self.order.id]): 3,
+            reverse('orders:update_tracking', args=[self.order.id]): 5,
+            reverse('products:vendor_dashboard'): 6,
+            reverse('products:vendor_products'): 3,
+            reverse('products:edit_product', args=[self.products[0].id]): 2,
+        })
+
+
+class StaffViewQueryBudgetTests(MarketplaceFixtureMixin, QueryBudgetMixin, TestCase):
+    def test_company_admin_pages(self):
+        self.client.force_login(self.admin)
+        self.assertQueryBudgets({
+            reverse('company_admin:dashboard'): 5,
+            reverse('company_admin:vendor_management'): 2,
+            reverse('company_admin:vendor_detail', args=[self.vendor.id]): 11,  # live and archived orders
+            reverse('company_admin:order_management'): 3,
+            reverse('company_admin:order_detail', args=[self.order.id]): 6,
+            reverse('company_admin:delivery_management'): 2,
+            reverse('company_admin:user_management'): 2,
+            reverse('company_admin:site_settings'): 2,
+            reverse('company_admin:currency_management'): 2,
+            reverse('company_admin:order_export'): 3,  # user, live orders, archived orders
+            reverse('orders:site_admin'): 3,
+            reverse('orders:enhanced_admin_dashboard'): 4,
+        })
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        self.assertQueryBudgets({
+            reverse('admin:index'): 4,
+            reverse('admin:orders_order_changelist'): 4,
+            reverse('admin:orders_purchase_changelist'): 4,
+            reverse('admin:orders_purchaselog_changelist'): 4,
+            reverse('admin:orders_stripewebhookevent_changelist'): 5,
+            reverse('admin:orders_dailysalessummary_changelist'): 8,
+            reverse('admin:orders_vendorstats_changelist'): 5,
+            reverse('admin:orders_queuedemail_changelist'): 5,
+            reverse('admin:products_product_changelist'): 6,
+            reverse('admin:accounts_customuser_changelist'): 6,
+            reverse('admin:core_deliverytracking_changelist'): 5,
+            reverse('admin:core_currency_changelist'): 5,
+            reverse('admin:core_advertisingbanner_changelist'): 5,
+        })
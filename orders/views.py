@@ -3,12 +3,19 @@ from django.shortcuts import render, get_object_or_404, redirect, reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .forms import CheckoutForm
-from .models import Order, OrderItem, Purchase, PurchaseLog
+from .models import ArchivedOrder, ArchivedOrderItem, ArchivedPurchase, Order, OrderItem, OrderVendor, Purchase, PurchaseLog
 from products.models import Product
 from django.http import JsonResponse
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
+from django.db.models import Prefetch, prefetch_related_objects
+from asgiref.sync import sync_to_async
+from core.pagination import keyset_paginate, keyset_paginate_merged
+
+MY_ORDERS_PER_PAGE = 10
+MY_PURCHASES_PER_PAGE = 25
+VENDOR_ORDERS_PER_PAGE = 25
 
 @login_required
 def checkout(request, product_id):
@@ -101,7 +108,10 @@ def checkout(request, product_id):
 @login_required
 def payment_processing(request, order_id):
     """Display payment processing page with realistic payment gateway simulation"""
-    order = get_object_or_404(Order, id=order_id, customer=request.user)
+    order = get_object_or_404(
+        Order.objects.prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product'))),
+        id=order_id, customer=request.user,
+    )
     
     # Simulate payment gateway selection based on payment method
     payment_gateways = {
@@ -183,7 +193,7 @@ def payment_confirm(request, order_id):
             # Update order with payment details
             order.payment_reference = payment_reference or txid
             order.status = Order.STATUS_PROCESSING
-            order.save()
+            order.save(update_fields=['payment_reference', 'status', 'updated_at'])
             
             # Create purchase records and track the first one for email
             first_purchase = None
@@ -191,6 +201,7 @@ def payment_confirm(request, order_id):
                 purchase = Purchase.objects.create(
                     customer=request.user,
                     product=item.product,
+                    order=order,
                     quantity=item.quantity,
                     amount=item.price * item.quantity,
                     payment_method=order.payment_method,
@@ -269,10 +280,36 @@ def payment_confirm(request, order_id):
     return redirect('orders:payment_processing', order_id=order.id)
 
 
+def _sub_orders_prefetch(archived=False):
+    """Prefetch of a split order's sub-orders with their vendor, tracking and items."""
+    order_model, item_model = (ArchivedOrder, ArchivedOrderItem) if archived else (Order, OrderItem)
+    return Prefetch('sub_orders', order_model.objects.order_by('id').select_related('vendor', 'tracking').prefetch_related(
+        Prefetch('items', item_model.objects.select_related('product'))))
+
+
+def _customer_orders(customer, archived=False):
+    """A customer's top-level orders, live or archived, prefetched for the order history."""
+    order_model, item_model = (ArchivedOrder, ArchivedOrderItem) if archived else (Order, OrderItem)
+    return (
+        order_model.objects.filter(customer=customer, parent=None)
+        .select_related('tracking')
+        .prefetch_related(Prefetch('items', item_model.objects.select_related('product')), _sub_orders_prefetch(archived))
+    )
+
+
 @login_required
 def confirmation(request, order_id):
  
-    order = Order.objects.filter(id=order_id).first()
+    # Finished orders may have been moved to the archive; those are shown read-only
+    for order_model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        order = (
+            order_model.objects.filter(id=order_id)
+            .select_related('customer')
+            .prefetch_related(Prefetch('items', queryset=item_model.objects.select_related('product')))
+            .first()
+        )
+        if order:
+            break
     if not order:
         messages.error(request, "Order not found.")
         return redirect('products:product_list')
@@ -282,8 +319,10 @@ def confirmation(request, order_id):
     user_is_vendor = getattr(request.user, 'user_type', None) == 'vendor'
 
     vendor_has_item = False
-    if user_is_vendor:
-        vendor_has_item = OrderItem.objects.filter(order=order, product__vendor=request.user).exists()
+    if user_is_vendor and order.is_archived:
+        vendor_has_item = order.items.filter(product__vendor=request.user).exists()
+    elif user_is_vendor:
+        vendor_has_item = OrderVendor.objects.filter(order=order, vendor=request.user).exists()
 
     if not (user_is_customer or user_is_staff or vendor_has_item):
         messages.error(request, "Order not found or you don't have permission to view it.")
@@ -292,7 +331,9 @@ def confirmation(request, order_id):
             return redirect('orders:vendor_orders')
         return redirect('orders:my_orders')
 
-    items = OrderItem.objects.filter(order=order)
+    if order.is_split:
+        prefetch_related_objects([order], _sub_orders_prefetch(order.is_archived))
+    items = order.line_items
     if user_is_customer:
         viewer_role = 'customer'
     elif user_is_vendor and vendor_has_item:
@@ -309,17 +350,48 @@ def my_orders(request):
         messages.error(request, "Only customers can view this page.")
         return redirect('products:product_list')
 
-    orders = Order.objects.filter(customer=request.user).order_by('-created_at')
-    purchases = Purchase.objects.filter(customer=request.user).order_by('-created_at')
+    # Only the open tab is queried; each page is a keyset page on (customer, created_at),
+    # merged from the live and archive tables
+    tab = 'purchases' if request.GET.get('tab') == 'purchases' else 'orders'
+    cursor = request.GET.get('cursor')
+    context = {'tab': tab}
+    if tab == 'orders':
+        orders = [_customer_orders(request.user), _customer_orders(request.user, archived=True)]
+        context['orders'] = context['page'] = keyset_paginate_merged(orders, cursor, MY_ORDERS_PER_PAGE)
+    else:
+        purchases = [
+            model.objects.filter(customer=request.user).select_related('product')
+            for model in (Purchase, ArchivedPurchase)
+        ]
+        context['purchases'] = context['page'] = keyset_paginate_merged(purchases, cursor, MY_PURCHASES_PER_PAGE)
 
-    return render(request, 'my_orders.html', {"orders": orders, 'purchases': purchases})
+    return render(request, 'my_orders.html', context)
 
 
 from accounts.decorators import vendor_required
 @vendor_required
 def vendor_orders(request):
-    vendor_items = OrderItem.objects.filter(product__vendor=request.user).select_related('order', 'product', 'order__customer').order_by('-order__created_at')
-    return render(request, 'vendor_orders.html', {"items": vendor_items})
+    """Vendor inbox: one row per order with the vendor's subtotal and item count.
+
+    Rows come straight from ``OrderVendor`` through its ``(vendor, status,
+    created_at)`` index, keyset paginated newest first; ``?status=`` narrows
+    the inbox to one status.
+    """
+    status = request.GET.get('status', '')
+    if status not in dict(Order.STATUS_CHOICES):
+        status = ''
+
+    links = OrderVendor.objects.filter(vendor=request.user)
+    if status:
+        links = links.filter(status=status)
+    links = links.select_related('order', 'order__customer')
+    page = keyset_paginate(links, request.GET.get('cursor'), VENDOR_ORDERS_PER_PAGE)
+    return render(request, 'vendor_orders.html', {
+        'links': page,
+        'page': page,
+        'status': status,
+        'status_choices': Order.STATUS_CHOICES,
+    })
 
 @login_required
 def vendor_order_details(request, order_id):
@@ -327,9 +399,13 @@ def vendor_order_details(request, order_id):
         messages.error(request, "Only vendors can view this page.")
         return redirect('products:product_list')
 
-    order = get_object_or_404(Order, id=order_id)
+    link = OrderVendor.objects.filter(order_id=order_id, vendor=request.user).select_related('order', 'order__customer').first()
+    if link is None:
+        messages.error(request, "Order not found or you don't have items in it.")
+        return redirect('orders:vendor_orders')
+    order = link.order
 
-    items = OrderItem.objects.filter(order=order, product__vendor=request.user)
+    items = OrderItem.objects.filter(order=order, product__vendor=request.user).select_related('product')
 
     return render(request, 'vendor_order_details.html', {
         "order": order,
@@ -369,18 +445,22 @@ def cart_view(request):
     cart = request.session.get('cart', {})
     items = []
     total = 0
+    products = Product.objects.filter(status='active').in_bulk([int(pid) for pid in cart])
+    removed = False
     for pid, qty in list(cart.items()):
-        try:
-            product = Product.objects.get(id=pid, status='active')
-        except Product.DoesNotExist:
+        product = products.get(int(pid))
+        if product is None:
             cart.pop(pid, None)
+            removed = True
             continue
         qty = int(qty)
         subtotal = product.price * qty
         total += subtotal
         items.append({'product': product, 'quantity': qty, 'subtotal': subtotal})
 
-    request.session['cart'] = cart
+    if removed:
+        # Only write the session back when unavailable products were dropped
+        request.session['cart'] = cart
     return render(request, 'cart.html', {'items': items, 'total': total})
 
 
@@ -439,15 +519,6 @@ def checkout_cart(request):
         total += subtotal
         items_data.append({'product': product, 'quantity': qty, 'price': product.price})
 
-    
-    order = Order.objects.create(
-        customer=request.user,
-        total=total,
-        status='pending',
-        delivery_address=request.user.location or '',
-        phone=request.user.phone or ''
-    )
-
     # payment method for the whole order (single txid)
     payment_method = request.POST.get('payment_method', 'bank')
     mobile_number = request.POST.get('mobile_number', '')
@@ -460,9 +531,32 @@ def checkout_cart(request):
     import uuid
     txid = f"MOCK-{payment_method.upper()}-{uuid.uuid4().hex[:8]}"
 
+    # A cart spanning several vendors becomes a parent order with one sub-order
+    # per vendor, so each vendor confirms, ships and tracks only its own part
+    by_vendor = {}
+    for it in items_data:
+        by_vendor.setdefault(it['product'].vendor_id, []).append(it)
+    order_fields = {
+        'customer': request.user,
+        'status': 'pending',
+        'delivery_address': request.user.location or '',
+        'phone': request.user.phone or '',
+    }
+    order = Order.objects.create(total=total, is_split=len(by_vendor) > 1, **order_fields)
+    if order.is_split:
+        sub_orders = {
+            vendor_id: Order.objects.create(
+                parent=order, vendor_id=vendor_id,
+                total=sum(it['price'] * it['quantity'] for it in vendor_items), **order_fields
+            )
+            for vendor_id, vendor_items in by_vendor.items()
+        }
+    else:
+        sub_orders = {vendor_id: order for vendor_id in by_vendor}
+
     for it in items_data:
         OrderItem.objects.create(
-            order=order,
+            order=sub_orders[it['product'].vendor_id],
             product=it['product'],
             quantity=it['quantity'],
             price=it['price']
@@ -471,6 +565,7 @@ def checkout_cart(request):
         purchase = Purchase.objects.create(
             customer=request.user,
             product=it['product'],
+            order=sub_orders[it['product'].vendor_id],
             quantity=it['quantity'],
             amount=it['price'] * it['quantity'],
             payment_method=payment_method,
@@ -620,24 +715,33 @@ def admin_dashboard(request):
 
 
 @login_required
-def stripe_checkout(request, product_id):
-    """Create a Stripe Checkout Session for a single product and redirect the user."""
+async def stripe_checkout(request, product_id):
+    """Create a Stripe Checkout Session for a single product and redirect the user.
+
+    Async so that the round trip to Stripe does not hold a worker thread
+    when served under ASGI (uvicorn workers).
+    """
     if stripe is None:
         messages.error(request, 'Stripe library not installed. Install stripe package to use payments.')
         return redirect('products:product_detail', pk=product_id)
 
-    product = Product.objects.filter(id=product_id, status='active').first()
+    product = await Product.objects.filter(id=product_id, status='active').afirst()
     if not product:
         messages.error(request, 'Product not found.')
         return redirect('products:product_list')
 
-    if getattr(request.user, 'user_type', None) != 'customer':
+    user = await request.auser()
+    if getattr(user, 'user_type', None) != 'customer':
         messages.error(request, 'Only customers can make purchases.')
         return redirect('products:product_detail', pk=product.id)
 
+    # If GET, show a simple checkout form (template rendering may query, so run it in a thread)
+    if request.method == 'GET':
+        return await sync_to_async(render)(request, 'orders/stripe_checkout.html', {'product': product})
+
     # parse desired quantity
     try:
-        qty = int(request.POST.get('quantity', 1)) if request.method == 'POST' else int(request.GET.get('quantity', 1))
+        qty = int(request.POST.get('quantity', 1))
     except (TypeError, ValueError):
         qty = 1
 
@@ -646,28 +750,27 @@ def stripe_checkout(request, product_id):
         return redirect('products:product_detail', pk=product.id)
 
     # Create a server-side Order and OrderItem so we can reconcile in webhook
-    order = Order.objects.create(
-        customer=request.user,
+    order = await Order.objects.acreate(
+        customer=user,
         total=product.price * qty,
         status='pending',
-        delivery_address=getattr(request.user, 'location', '') or '',
-        phone=getattr(request.user, 'phone', '') or ''
+        delivery_address=getattr(user, 'location', '') or '',
+        phone=getattr(user, 'phone', '') or ''
     )
-    OrderItem.objects.create(order=order, product=product, quantity=qty, price=product.price)
-
-    # If GET, show a simple checkout form
-    if request.method == 'GET':
-        return render(request, 'orders/stripe_checkout.html', {'product': product})
+    await OrderItem.objects.acreate(order=order, product=product, quantity=qty, price=product.price)
 
     # configure stripe
     stripe.api_key = settings.STRIPE_API_KEY
+    if settings.STRIPE_API_BASE:
+        stripe.api_base = settings.STRIPE_API_BASE
     unit_amount = int(decimal.Decimal(product.price) * 100)
 
     success_url = settings.STRIPE_SUCCESS_URL.format(order_id=order.id)
     cancel_url = settings.STRIPE_CANCEL_URL.format(order_id=order.id)
 
     try:
-        session = stripe.checkout.Session.create(
+        # Uses stripe's async HTTP client (httpx)
+        session = await stripe.checkout.Session.create_async(
             payment_method_types=['card'],
             line_items=[{
                 'price_data': {
@@ -686,13 +789,12 @@ def stripe_checkout(request, product_id):
         logger.exception('Stripe session creation failed')
         messages.error(request, 'Failed to start payment session.')
         # on failure delete the created order and items to avoid orphaned pending orders
-        order.delete()
+        await order.adelete()
         return redirect('products:product_detail', pk=product.id)
 
     # store stripe session id on order for idempotency (optional)
     try:
-        order.stripe_session_id = session.id
-        order.save()
+        await Order.objects.filter(id=order.id).aupdate(stripe_session_id=session.id)
     except Exception:
         pass
 
@@ -704,9 +806,51 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 
 
+def _record_legacy_stripe_purchase(session):
+    """Older flow expecting product_id/quantity/user_id in the session metadata."""
+    meta = session.get('metadata', {}) or {}
+    try:
+        prod_id = int(meta.get('product_id'))
+        qty = int(meta.get('quantity', 1))
+        user_id = int(meta.get('user_id'))
+    except Exception:
+        return
+
+    product = Product.objects.filter(id=prod_id).first()
+    if not product:
+        return
+
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    customer = User.objects.filter(id=user_id).first()
+    # idempotency: don't create duplicate purchase for same session id
+    if Purchase.objects.filter(transaction_id=session.get('id')).exists():
+        return
+
+    # create the purchase
+    amount = (decimal.Decimal(product.price) * qty)
+    purchase = Purchase.objects.create(
+        customer=customer,
+        product=product,
+        quantity=qty,
+        amount=amount,
+        payment_method='stripe',
+        transaction_id=session.get('id')
+    )
+    PurchaseLog.objects.create(purchase=purchase, action=PurchaseLog.ACTION_PURCHASE, actor=customer, note='Stripe checkout')
+    # decrement stock
+    product.stock = product.stock - qty
+    product.save()
+
+
 @csrf_exempt
-def stripe_webhook(request):
-    """Handle Stripe webhooks; create Purchase on checkout.session.completed."""
+async def stripe_webhook(request):
+    """Handle Stripe webhooks; create Purchase on checkout.session.completed.
+
+    The raw event is persisted with the async ORM; order finalization
+    (purchases, stock, emails) runs in a worker thread via
+    ``process_stripe_event``.
+    """
     if stripe is None:
         return HttpResponse(status=501)
 
@@ -730,117 +874,44 @@ def stripe_webhook(request):
         logger.exception('Unexpected error while parsing webhook')
         return HttpResponse(status=400)
 
+    # Newer stripe releases return StripeObjects without dict methods;
+    # process_stripe_event (also used by the admin reprocess action) takes dicts
+    if hasattr(event, 'to_dict'):
+        event = event.to_dict()
+
     # Handle the checkout.session.completed event
     if event['type'] == 'checkout.session.completed':
         session = event['data']['object']
+        from .stripe_utils import process_stripe_event
+
         # persist raw webhook for debugging
+        saved = None
         try:
             from .models import StripeWebhookEvent
             from .security_utils import redact_request_headers, safe_json_dump
-            
+
             # Use hardened header redaction utility
             masked_headers = redact_request_headers(request)
-            
-            saved = StripeWebhookEvent.objects.create(
+
+            saved = await StripeWebhookEvent.objects.acreate(
                 stripe_event_id=event.get('id'),
                 event_type=event.get('type'),
                 payload=payload.decode('utf-8', errors='ignore') if isinstance(payload, (bytes, bytearray)) else str(payload),
                 headers=safe_json_dump(masked_headers),
             )
-            # process via shared util
-            from .stripe_utils import process_stripe_event
-            try:
-                process_stripe_event(event, saved_event=saved)
-            except Exception:
-                logger.exception('Processing saved webhook failed')
         except Exception:
             logger.exception('Failed to persist webhook event')
+
         meta = session.get('metadata', {}) or {}
         # Prefer an order-based flow: if order_id is provided, finalize that Order
-        order_id = meta.get('order_id')
-        if order_id:
-            try:
-                from .models import OrderItem, Order
-                oid = int(order_id)
-                order = Order.objects.filter(id=oid).first()
-                if not order:
-                    return HttpResponse(status=200)
-                # idempotency: if we already have a Purchase with this session id, skip
-                existing = Purchase.objects.filter(transaction_id=session.get('id')).first()
-                if existing:
-                    return HttpResponse(status=200)
-
-                # create purchases for each order item
-                for item in order.items.all():
-                    purchase = Purchase.objects.create(
-                        customer=order.customer,
-                        product=item.product,
-                        quantity=item.quantity,
-                        amount=item.price * item.quantity,
-                        payment_method='stripe',
-                        transaction_id=session.get('id')
-                    )
-                    PurchaseLog.objects.create(purchase=purchase, action=PurchaseLog.ACTION_PURCHASE, actor=order.customer, note=f'Order #{order.id} (Stripe)')
-                    try:
-                        from django.template.loader import render_to_string
-                        from django.core.mail import EmailMessage
-                        html = render_to_string('emails/purchase.html', {'purchase': purchase, 'user': order.customer})
-                        msg = EmailMessage(subject=f'Purchase #{purchase.id} recorded', body=html, from_email=settings.DEFAULT_FROM_EMAIL, to=[order.customer.email])
-                        msg.content_subtype = 'html'
-                        msg.send(fail_silently=True)
-                        vendor_email = getattr(item.product.vendor, 'email', None)
-                        if vendor_email:
-                            vhtml = render_to_string('emails/purchase.html', {'purchase': purchase, 'user': item.product.vendor})
-                            vmsg = EmailMessage(subject=f'Your product purchased: {purchase.product.name}', body=vhtml, from_email=settings.DEFAULT_FROM_EMAIL, to=[vendor_email])
-                            vmsg.content_subtype = 'html'
-                            vmsg.send(fail_silently=True)
-                    except Exception:
-                        pass
-                    # decrement stock
-                    item.product.stock = item.product.stock - item.quantity
-                    item.product.save()
-
-                # mark order completed
-                order.status = Order.STATUS_COMPLETED
-                order.save()
-            except Exception:
-                logger.exception('Error finalizing order from webhook')
+        if meta.get('order_id'):
+            # process via shared util (idempotent on the session id)
+            if not await sync_to_async(process_stripe_event)(event, saved_event=saved):
+                logger.error(f"Processing webhook {event.get('id')} for order {meta.get('order_id')} failed")
             return HttpResponse(status=200)
 
         # Fallback: older flow expecting product_id/quantity/user_id in metadata
-        try:
-            prod_id = int(meta.get('product_id'))
-            qty = int(meta.get('quantity', 1))
-            user_id = int(meta.get('user_id'))
-        except Exception:
-            return HttpResponse(status=200)
-
-        product = Product.objects.filter(id=prod_id).first()
-        if not product:
-            return HttpResponse(status=200)
-
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        customer = User.objects.filter(id=user_id).first()
-        # idempotency: don't create duplicate purchase for same session id
-        existing = Purchase.objects.filter(transaction_id=session.get('id')).first()
-        if existing:
-            return HttpResponse(status=200)
-
-        # create the purchase
-        amount = (decimal.Decimal(product.price) * qty)
-        purchase = Purchase.objects.create(
-            customer=customer,
-            product=product,
-            quantity=qty,
-            amount=amount,
-            payment_method='stripe',
-            transaction_id=session.get('id')
-        )
-        PurchaseLog.objects.create(purchase=purchase, action=PurchaseLog.ACTION_PURCHASE, actor=customer, note='Stripe checkout')
-        # decrement stock
-        product.stock = product.stock - qty
-        product.save()
+        await sync_to_async(_record_legacy_stripe_purchase)(session)
 
     return HttpResponse(status=200)
 
@@ -877,7 +948,10 @@ def stripe_order_status(request, order_id):
 @login_required
 def purchase_detail(request, pk):
     from .models import Purchase
-    purchase = Purchase.objects.select_related('product', 'customer').filter(id=pk).first()
+    purchase = (
+        Purchase.objects.select_related('product', 'customer').filter(id=pk).first()
+        or ArchivedPurchase.objects.select_related('product', 'customer').filter(id=pk).first()
+    )
     if not purchase:
         messages.error(request, 'Purchase not found.')
         return redirect('orders:my_orders')
@@ -917,7 +991,22 @@ def upload_payment_proof(request, order_id):
                 order.payment_reference = form.cleaned_data['payment_reference']
             order.payment_proof_uploaded_at = timezone.now()
             order.status = Order.STATUS_AWAITING_CONFIRMATION
-            order.save()
+            order.save(update_fields=[
+                'payment_proof', 'payment_reference', 'payment_proof_uploaded_at', 'status', 'updated_at',
+            ])
+            if order.is_split:
+                # Every vendor confirms its own sub-order against the same proof
+                from .rollups import sync_order_vendor_status
+                sub_orders = order.sub_orders.filter(status=Order.STATUS_PENDING)
+                sub_order_ids = list(sub_orders.values_list('pk', flat=True))
+                sub_orders.update(
+                    payment_proof=order.payment_proof.name,
+                    payment_reference=order.payment_reference,
+                    payment_proof_uploaded_at=order.payment_proof_uploaded_at,
+                    status=Order.STATUS_AWAITING_CONFIRMATION,
+                    updated_at=order.updated_at,
+                )
+                sync_order_vendor_status(sub_order_ids, Order.STATUS_AWAITING_CONFIRMATION)
 
             messages.success(request, 'Payment proof uploaded successfully. Waiting for vendor confirmation.')
             return redirect('orders:confirmation', order_id=order.id)
@@ -927,7 +1016,7 @@ def upload_payment_proof(request, order_id):
     return render(request, 'orders/upload_payment_proof.html', {
         'order': order,
         'form': form,
-        'items': order.items.all()
+        'items': order.line_items
     })
 
 
@@ -943,12 +1032,13 @@ def vendor_confirm_order(request, order_id):
     order = get_object_or_404(Order, id=order_id)
 
     # Check if vendor has items in this order
-    vendor_items = OrderItem.objects.filter(order=order, product__vendor=request.user)
-    if not vendor_items.exists():
+    link = OrderVendor.objects.filter(order=order, vendor=request.user).first()
+    if link is None:
         messages.error(request, 'You do not have any items in this order.')
         return redirect('orders:vendor_orders')
 
-    if order.status != Order.STATUS_AWAITING_CONFIRMATION:
+    # On orders placed before carts were split, each vendor confirms its own share
+    if order.status != Order.STATUS_AWAITING_CONFIRMATION or link.status != Order.STATUS_AWAITING_CONFIRMATION:
         messages.info(request, 'This order is not awaiting confirmation.')
         return redirect('orders:vendor_order_details', order_id=order.id)
 
@@ -958,19 +1048,20 @@ def vendor_confirm_order(request, order_id):
             action = form.cleaned_data['action']
 
             if action == 'confirm':
-                order.vendor_confirmed = True
-                order.vendor_confirmed_at = timezone.now()
-                order.vendor_confirmed_by = request.user
-                order.status = Order.STATUS_PROCESSING
-
                 # Create purchase records and update stock
                 import uuid
                 txid = f"{order.payment_method.upper()}-{uuid.uuid4().hex[:12].upper()}"
 
-                for item in order.items.all():
+                # Only this vendor's lines: sub-orders hold nothing else, and orders
+                # placed before carts were split are shared with other vendors
+                products = {}
+                for item in order.items.filter(product__vendor=request.user).select_related('product'):
+                    # Lines for the same product share one instance so every line's units come off stock
+                    product = products.setdefault(item.product_id, item.product)
                     purchase = Purchase.objects.create(
                         customer=order.customer,
-                        product=item.product,
+                        product=product,
+                        order=order,
                         quantity=item.quantity,
                         amount=item.price * item.quantity,
                         payment_method=order.payment_method,
@@ -985,10 +1076,27 @@ def vendor_confirm_order(request, order_id):
                     )
 
                     # Update stock
-                    item.product.stock -= item.quantity
-                    item.product.save()
+                    product.stock -= item.quantity
+                    product.save()
+
+                from django.db import transaction
+                with transaction.atomic():
+                    # Lock the order so two vendors confirming at once both see each other's share
+                    list(Order.objects.select_for_update().filter(pk=order.pk).values_list('pk', flat=True))
+                    OrderVendor.objects.filter(pk=link.pk).update(status=Order.STATUS_PROCESSING)
+                    waiting = OrderVendor.objects.filter(order=order, status=Order.STATUS_AWAITING_CONFIRMATION).exists()
+                if waiting:
+                    # A shared order moves on once every vendor in it has confirmed
+                    messages.success(request, f'Your items in order #{order.id} have been confirmed.')
+                    return redirect('orders:vendor_orders')
 
-                order.save()
+                order.vendor_confirmed = True
+                order.vendor_confirmed_at = timezone.now()
+                order.vendor_confirmed_by = request.user
+                order.status = Order.STATUS_PROCESSING
+                order.save(update_fields=[
+                    'vendor_confirmed', 'vendor_confirmed_at', 'vendor_confirmed_by', 'status', 'updated_at',
+                ])
 
                 # Send confirmation email to customer
                 try:
@@ -1015,7 +1123,7 @@ def vendor_confirm_order(request, order_id):
             else:  # reject
                 order.vendor_rejection_reason = form.cleaned_data['rejection_reason']
                 order.status = Order.STATUS_CANCELLED
-                order.save()
+                order.save(update_fields=['vendor_rejection_reason', 'status', 'updated_at'])
 
                 # Send rejection email to customer
                 try:
@@ -1047,7 +1155,7 @@ def vendor_confirm_order(request, order_id):
     return render(request, 'orders/vendor_confirm_order.html', {
         'order': order,
         'form': form,
-        'vendor_items': vendor_items,
+        'vendor_items': OrderItem.objects.filter(order=order, product__vendor=request.user).select_related('product'),
     })
 
 
@@ -1062,7 +1170,7 @@ def track_delivery(request, order_id):
     user_is_vendor = getattr(request.user, 'user_type', None) == 'vendor'
     vendor_has_item = False
     if user_is_vendor:
-        vendor_has_item = OrderItem.objects.filter(order=order, product__vendor=request.user).exists()
+        vendor_has_item = OrderVendor.objects.filter(order=order, vendor=request.user).exists()
 
     if not (user_is_customer or user_is_staff or vendor_has_item):
         messages.error(request, 'You do not have permission to track this delivery.')
@@ -1102,7 +1210,7 @@ def update_delivery_tracking(request, order_id):
 
     # If vendor, check they have items in this order
     if request.user.user_type == 'vendor':
-        if not OrderItem.objects.filter(order=order, product__vendor=request.user).exists():
+        if not OrderVendor.objects.filter(order=order, vendor=request.user).exists():
             messages.error(request, 'You do not have items in this order.')
             return redirect('orders:vendor_orders')
 
@@ -1141,7 +1249,7 @@ def update_delivery_tracking(request, order_id):
                 tracking.delivered_at = timezone.now()
                 # Also update order status
                 order.status = Order.STATUS_DELIVERED
-                order.save()
+                order.save(update_fields=['status', 'updated_at'])
 
             tracking.save()
             messages.success(request, 'Delivery tracking updated successfully.')
@@ -1164,27 +1272,35 @@ def update_delivery_tracking(request, order_id):
     })
 
 
-def get_tracking_location(request, order_id):
-    """API endpoint to get current tracking location (for AJAX polling)"""
-    from core.models import DeliveryTracking
+async def get_tracking_location(request, order_id):
+    """Tracking JSON for the tracking page poll and the lazy panels on my_orders.
 
-    try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
-        return JsonResponse({'error': 'Order not found'}, status=404)
+    ``?history=N`` adds the N latest location updates (at most 50), oldest
+    first. Visible to the same users as ``track_delivery``.
+    """
+    from core.models import DeliveryTracking
 
-    # Check permission (simplified for API)
-    if not request.user.is_authenticated:
+    user = await request.auser()
+    if not user.is_authenticated:
         return JsonResponse({'error': 'Unauthorized'}, status=401)
 
-    try:
-        tracking = DeliveryTracking.objects.get(order=order)
-    except DeliveryTracking.DoesNotExist:
+    order = await Order.objects.filter(id=order_id).only('id', 'customer_id', 'tracking_number').afirst()
+    if order is None:
+        return JsonResponse({'error': 'Order not found'}, status=404)
+    if order.customer_id != user.id and not (user.is_staff or user.is_superuser):
+        vendor_has_item = user.user_type == 'vendor' and await OrderVendor.objects.filter(
+            order_id=order_id, vendor=user).aexists()
+        if not vendor_has_item:
+            return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    tracking = await DeliveryTracking.objects.filter(order_id=order_id).afirst()
+    if tracking is None:
         return JsonResponse({'error': 'No tracking information'}, status=404)
 
-    return JsonResponse({
+    data = {
         'status': tracking.status,
         'status_display': tracking.get_status_display(),
+        'tracking_number': order.formatted_tracking_number,
         'driver_name': tracking.driver_name,
         'driver_phone': tracking.driver_phone,
         'vehicle_number': tracking.vehicle_number,
@@ -1193,8 +1309,21 @@ def get_tracking_location(request, order_id):
         'destination_latitude': float(tracking.destination_latitude) if tracking.destination_latitude else None,
         'destination_longitude': float(tracking.destination_longitude) if tracking.destination_longitude else None,
         'estimated_delivery': tracking.estimated_delivery.isoformat() if tracking.estimated_delivery else None,
+        'picked_up_at': tracking.picked_up_at.isoformat() if tracking.picked_up_at else None,
+        'delivered_at': tracking.delivered_at.isoformat() if tracking.delivered_at else None,
         'updated_at': tracking.updated_at.isoformat(),
-    })
+    }
+    try:
+        history_size = min(max(int(request.GET.get('history', 0)), 0), 50)
+    except ValueError:
+        history_size = 0
+    if history_size:
+        points = tracking.history.values_list('latitude', 'longitude', 'status', 'note', 'recorded_at')
+        data['history'] = [
+            {'lat': float(lat), 'lng': float(lng), 'status': status, 'note': note, 'at': at.isoformat()}
+            async for lat, lng, status, note, at in points[:history_size]
+        ][::-1]
+    return JsonResponse(data)
 
 
 
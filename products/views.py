@@ -5,20 +5,20 @@ from .forms import ProductForm
 from accounts.decorators import vendor_required
 from django.core.paginator import Paginator 
 from django.shortcuts import render, get_object_or_404
-from orders.models import OrderItem
+from orders.models import Order, OrderVendor
 from django.db.models import Sum, Q, Count
 
 
 
 def home(request):
-    products=Product.objects.filter(status='active').order_by('-created_at')[:8]
+    products=Product.objects.filter(status='active').select_related('vendor').order_by('-created_at')[:8]
     return render(request, 'InkingiWoods/home.html', {'products':products})
 
 def product_list(request):
     """
     Task 4.2: Handles product listing, sorting, pagination, and category filtering.
     """
-    products = Product.objects.filter(status='active')
+    products = Product.objects.filter(status='active').select_related('vendor')
 
     # Search query
     q = request.GET.get('q', '').strip()
@@ -109,8 +109,8 @@ def vendor_dashboard(request):
     active_products = Product.objects.filter(vendor=vendor, status='active').count()
     out_of_stock = Product.objects.filter(vendor=vendor, stock=0).count()
 
-    # Count order items related to this vendor's products
-    pending_order_items = OrderItem.objects.filter(product__vendor=vendor, order__status='pending').count()
+    # Orders awaiting payment that include this vendor's products
+    pending_orders = OrderVendor.objects.filter(vendor=vendor, status=Order.STATUS_PENDING).count()
 
     recent_products = Product.objects.filter(vendor=vendor).order_by('-created_at')[:5]
 
@@ -118,7 +118,7 @@ def vendor_dashboard(request):
         'total_products': total_products,
         'active_products': active_products,
         'out_of_stock': out_of_stock,
-        'pending_order_items': pending_order_items,
+        'pending_orders': pending_orders,
         'recent_products': recent_products,
     }
     return render(request, 'products/vendor_dashboard.html', context)
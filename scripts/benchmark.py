@@ -0,0 +1,502 @@
+"""
+Scripted end-to-end benchmark of the main user journeys.
+
+Each scenario is driven by ``--concurrency`` virtual users, each with its own
+keep-alive connection and cookie jar, for ``--duration`` seconds after a
+``--warmup``. For every scenario the report gives throughput, p50/p95/p99
+latency, error count and the mean database queries and DB time per request
+(read from the ``Server-Timing`` header, which the server started here sends
+for every response).
+
+    python scripts/benchmark.py                                   # all scenarios, default uvicorn server
+    python scripts/benchmark.py --scenario browse --scenario search --concurrency 32
+    python scripts/benchmark.py --config uvicorn:workers=2 --json bench/uvicorn.json
+    python scripts/benchmark.py --url http://127.0.0.1:8000       # an already running server
+    python scripts/benchmark.py --compare bench/before.json bench/after.json
+    python scripts/benchmark.py --scenario stripe_checkout --config gthread:workers=1 --stripe-latency 250
+
+Scenarios: browse, search, product_detail, add_to_cart, cart_checkout,
+stripe_checkout, vendor_dashboard, admin_dashboard, webhook_burst. The
+stripe_checkout scenario talks to a local stub of the Stripe API that answers
+after ``--stripe-latency`` milliseconds, so the upstream wait is reproducible
+offline. Load data first (e.g.
+``python manage.py seed_scale --orders 1000000``); the script then adds its own
+``bench_*`` customer, vendor and staff users, a well-stocked bench product
+and pending orders for the webhook burst. With ``--url`` the server must
+share this database, run with ``PERF_SERVER_TIMING=all`` for query counts,
+and with ``STRIPE_WEBHOOK_SECRET`` set to ``--webhook-secret`` (and
+``STRIPE_API_BASE`` pointing at a Stripe stub for stripe_checkout).
+"""
+import argparse
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlparse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SokoHub.settings')
+
+from loadtest import gunicorn_server, percentile  # noqa: E402
+
+BENCH_PASSWORD = 'bench-password-123'
+BENCH_PRODUCT_NAME = 'Benchmark stool'
+DEFAULT_WEBHOOK_SECRET = 'whsec_benchmark'
+SEARCH_TERMS = ['wood', 'table', 'chair', 'oak', 'bed', 'door', 'shelf', 'desk']
+
+_QUERIES = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def prepare_fixtures(pending_orders):
+    """Create (or reuse) the bench users and rows and return what the scenarios need."""
+    import django
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from orders.models import Order, OrderItem
+    from products.models import Product
+
+    User = get_user_model()
+
+    def bench_user(username, **fields):
+        user, _ = User.objects.get_or_create(username=username, defaults={'email': f'{username}@example.com', **fields})
+        user.set_password(BENCH_PASSWORD)
+        user.save()
+        return user
+
+    customer = bench_user('bench_customer', user_type=User.CUSTOMER)
+    vendor = bench_user('bench_vendor', user_type=User.VENDOR)
+    bench_user('bench_staff', is_staff=True, is_superuser=True)
+
+    product, _ = Product.objects.get_or_create(
+        vendor=vendor, name=BENCH_PRODUCT_NAME,
+        defaults={'price': Decimal('15.00'), 'stock': 10 ** 9, 'category': Product.CATEGORY_FURNITURE},
+    )
+    Product.objects.filter(pk=product.pk).update(stock=10 ** 9, status=Product.STATUS_ACTIVE)
+
+    pending = list(Order.objects.filter(customer=customer, status=Order.STATUS_PENDING,
+                                        delivery_notes='benchmark').values_list('id', flat=True))
+    for _ in range(max(0, pending_orders - len(pending))):
+        order = Order.objects.create(customer=customer, total=product.price, delivery_address='Kigali',
+                                     phone='0780000000', delivery_notes='benchmark')
+        OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        pending.append(order.id)
+
+    product_ids = list(Product.objects.filter(status=Product.STATUS_ACTIVE).order_by('-id')
+                       .values_list('id', flat=True)[:500])
+    return {
+        'product_ids': product_ids,
+        'bench_product_id': product.id,
+        'pending_order_ids': pending,
+        'dataset': {
+            'products': Product.objects.count(),
+            'orders': Order.objects.count(),
+            'users': User.objects.count(),
+        },
+    }
+
+
+# ---------------------------------------------------------------------------
+# Stripe stub
+# ---------------------------------------------------------------------------
+
+class _StripeStubHandler(BaseHTTPRequestHandler):
+    """Answers Checkout Session creation like the Stripe API, after a fixed delay."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(self.server.latency)
+        session_id = f'cs_bench_{random.getrandbits(64):x}'
+        body = json.dumps({
+            'id': session_id,
+            'object': 'checkout.session',
+            'url': f'https://checkout.stripe.test/pay/{session_id}',
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stripe_stub(latency_ms):
+    """Serve the Stripe stub on a free local port in a background thread; returns the server."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StripeStubHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------------------------------------------------------------------------
+# Virtual user
+# ---------------------------------------------------------------------------
+
+class VirtualUser:
+    """One keep-alive connection with its own cookies, recording every request."""
+
+    def __init__(self, host, port, record):
+        self.host, self.port = host, port
+        self.record = record  # callable(latency_s, status, queries, db_ms) or None
+        self.cookies = {}
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+
+    def request(self, method, path, body=None, headers=None):
+        headers = {'Connection': 'keep-alive', **(headers or {})}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        if method == 'POST' and 'csrftoken' in self.cookies:
+            headers.setdefault('X-CSRFToken', self.cookies['csrftoken'])
+        t0 = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+            resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            status, resp = None, None
+        elapsed = time.perf_counter() - t0
+        queries, db_ms = None, None
+        if resp is not None:
+            for cookie in resp.msg.get_all('Set-Cookie') or []:
+                name, _, rest = cookie.partition('=')
+                self.cookies[name.strip()] = rest.split(';', 1)[0]
+            match = _QUERIES.search(resp.getheader('Server-Timing', ''))
+            if match:
+                db_ms, queries = float(match.group(1)), int(match.group(2))
+        if self.record is not None:
+            self.record(elapsed, status, queries, db_ms)
+        return status
+
+    def get(self, path):
+        return self.request('GET', path)
+
+    def post(self, path, data=None):
+        return self.request('POST', path, body=urlencode(data or {}),
+                            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+
+    def login(self, username):
+        self.get('/login/')
+        if self.post('/login/', {'email': username, 'password': BENCH_PASSWORD}) != 302:
+            raise RuntimeError(f'login as {username} failed')
+
+    def close(self):
+        self.conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Scenarios: setup(user, fx) runs unmeasured, step(user, fx, rng) is one iteration
+# ---------------------------------------------------------------------------
+
+def _no_setup(user, fx):
+    pass
+
+
+def _browse(user, fx, rng):
+    user.get('/')
+    user.get('/products/products/')
+    user.get(f'/products/products/?page={rng.randint(2, 5)}')
+    user.get('/products/products/?category=furniture&sort=price')
+
+
+def _search(user, fx, rng):
+    user.get('/products/products/?' + urlencode({'q': rng.choice(SEARCH_TERMS)}))
+
+
+def _popular_product(fx, rng):
+    # Skewed towards the first (newest) products, like real traffic
+    ids = fx['product_ids'] or [fx['bench_product_id']]
+    return ids[min(len(ids) - 1, int(rng.paretovariate(1.2)) - 1)]
+
+
+def _product_detail(user, fx, rng):
+    user.get(f'/products/{_popular_product(fx, rng)}/')
+
+
+def _add_to_cart_setup(user, fx):
+    user.get(f"/products/{fx['bench_product_id']}/")  # csrftoken cookie
+
+
+def _add_to_cart(user, fx, rng):
+    user.post(f"/orders/cart/add/{fx['bench_product_id']}/", {'quantity': rng.randint(1, 3)})
+    user.get('/orders/cart/')
+
+
+def _customer_setup(user, fx):
+    user.login('bench_customer')
+
+
+def _cart_checkout(user, fx, rng):
+    user.post(f"/orders/cart/add/{fx['bench_product_id']}/", {'quantity': 1})
+    user.post('/orders/cart/checkout/', {'payment_method': 'bank', 'mobile_number': ''})
+
+
+def _stripe_checkout(user, fx, rng):
+    # Creates a pending order, then waits on the (stubbed) Stripe API before redirecting
+    user.post(f"/orders/stripe/checkout/{fx['bench_product_id']}/", {'quantity': 1})
+
+
+def _vendor_setup(user, fx):
+    user.login('bench_vendor')
+
+
+def _vendor_dashboard(user, fx, rng):
+    user.get('/products/vendor/dashboard/')
+    user.get('/orders/vendor-orders/')
+
+
+def _staff_setup(user, fx):
+    user.login('bench_staff')
+
+
+def _admin_dashboard(user, fx, rng):
+    user.get('/company-admin/')
+    user.get('/orders/enhanced-admin-dashboard/')
+
+
+def _webhook_burst(user, fx, rng):
+    # Stripe retries the same session; only the first delivery finalizes an order
+    order_id = rng.choice(fx['pending_order_ids'])
+    payload = json.dumps({
+        'id': f'evt_bench_{rng.getrandbits(64):x}',
+        'object': 'event',
+        'type': 'checkout.session.completed',
+        'data': {'object': {'id': f'cs_bench_{order_id}', 'object': 'checkout.session',
+                            'metadata': {'order_id': str(order_id)}}},
+    })
+    timestamp = int(time.time())
+    signature = hmac.new(fx['webhook_secret'].encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    user.request('POST', '/orders/stripe/webhook/', body=payload, headers={
+        'Content-Type': 'application/json',
+        'Stripe-Signature': f't={timestamp},v1={signature}',
+    })
+
+
+SCENARIOS = {
+    'browse': (_no_setup, _browse),
+    'search': (_no_setup, _search),
+    'product_detail': (_no_setup, _product_detail),
+    'add_to_cart': (_add_to_cart_setup, _add_to_cart),
+    'cart_checkout': (_customer_setup, _cart_checkout),
+    'stripe_checkout': (_customer_setup, _stripe_checkout),
+    'vendor_dashboard': (_vendor_setup, _vendor_dashboard),
+    'admin_dashboard': (_staff_setup, _admin_dashboard),
+    'webhook_burst': (_no_setup, _webhook_burst),
+}
+
+
+def run_scenario(name, host, port, fx, concurrency, duration, warmup, seed):
+    """Run one scenario and return its summary."""
+    setup, step = SCENARIOS[name]
+    samples = []  # (latency_s, status, queries, db_ms)
+    lock = threading.Lock()
+    setup_errors = []
+    bounds = {}
+
+    def start_clock():
+        # Runs once every virtual user has finished its setup (logins are not measured)
+        bounds['start'] = time.monotonic() + warmup
+        bounds['stop'] = bounds['start'] + duration
+
+    ready = threading.Barrier(concurrency, action=start_clock)
+
+    def virtual_user(n):
+        local = []
+        user = VirtualUser(host, port, None)
+        try:
+            setup(user, fx)
+        except RuntimeError as e:
+            setup_errors.append(str(e))
+        ready.wait()
+        rng = random.Random(seed * 1000 + n)
+
+        def record(latency, status, queries, db_ms):
+            if time.monotonic() >= bounds['start']:
+                local.append((latency, status, queries, db_ms))
+
+        user.record = record
+        while not setup_errors and time.monotonic() < bounds['stop']:
+            step(user, fx, rng)
+        user.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=virtual_user, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if setup_errors:
+        return {'error': setup_errors[0]}
+    return summarize(samples, duration)
+
+
+def summarize(samples, duration):
+    ok = sorted(s[0] for s in samples if s[1] is not None and s[1] < 500)
+    counted = [s for s in samples if s[2] is not None]
+    statuses = {}
+    for s in samples:
+        statuses[str(s[1])] = statuses.get(str(s[1]), 0) + 1
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(ok),
+        'rps': round(len(samples) / duration, 1),
+        'p50_ms': round(percentile(ok, 50) * 1000, 2),
+        'p95_ms': round(percentile(ok, 95) * 1000, 2),
+        'p99_ms': round(percentile(ok, 99) * 1000, 2),
+        'queries_per_request': round(sum(s[2] for s in counted) / len(counted), 2) if counted else None,
+        'max_queries': max((s[2] for s in counted), default=None),
+        'db_ms_per_request': round(sum(s[3] for s in counted) / len(counted), 2) if counted else None,
+        'statuses': dict(sorted(statuses.items())),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+COLUMNS = [('rps', 'rps'), ('p50_ms', 'p50 ms'), ('p95_ms', 'p95 ms'), ('p99_ms', 'p99 ms'),
+           ('queries_per_request', 'queries'), ('db_ms_per_request', 'db ms'), ('errors', 'errors')]
+
+
+def _fmt(value):
+    return '-' if value is None else str(value)
+
+
+def print_report(results):
+    header = f"{'scenario':<18}" + ''.join(f'{title:>10}' for _, title in COLUMNS)
+    print(header)
+    print('-' * len(header))
+    for name, r in results['scenarios'].items():
+        if 'error' in r:
+            print(f"{name:<18}  {r['error']}")
+            continue
+        print(f'{name:<18}' + ''.join(f'{_fmt(r[key]):>10}' for key, _ in COLUMNS))
+
+
+def print_comparison(old_path, new_path):
+    with open(old_path) as fh:
+        old = json.load(fh)
+    with open(new_path) as fh:
+        new = json.load(fh)
+    print(f'{old_path} -> {new_path}')
+    header = f"{'scenario':<18}" + ''.join(f'{title:>28}' for _, title in COLUMNS[:-1])
+    print(header)
+    print('-' * len(header))
+    for name, after in new['scenarios'].items():
+        before = old['scenarios'].get(name)
+        if not before or 'error' in before or 'error' in after:
+            continue
+        cells = []
+        for key, _ in COLUMNS[:-1]:
+            a, b = before.get(key), after.get(key)
+            if a is None or b is None:
+                cells.append(f'{"-":>28}')
+                continue
+            change = f' ({(b - a) / a * 100:+.0f}%)' if a else ''
+            cells.append(f'{f"{a} -> {b}{change}":>28}')
+        print(f'{name:<18}' + ''.join(cells))
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='Scenario to run (repeatable)')
+    parser.add_argument('--config', default='uvicorn', help='Server configuration, as in scripts/loadtest.py')
+    parser.add_argument('--url', help='Benchmark an already running server instead of starting gunicorn')
+    parser.add_argument('--concurrency', type=int, default=16, help='Virtual users per scenario')
+    parser.add_argument('--duration', type=float, default=15.0, help='Measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Unmeasured seconds before measuring')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the server started by this script')
+    parser.add_argument('--pending-orders', type=int, default=200, help='Pending orders for the webhook burst')
+    parser.add_argument('--webhook-secret', default=DEFAULT_WEBHOOK_SECRET, help='Stripe webhook signing secret')
+    parser.add_argument('--stripe-latency', type=float, default=250.0,
+                        help='Milliseconds the Stripe stub waits before answering (stripe_checkout)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the virtual users')
+    parser.add_argument('--json', metavar='FILE', help='Write the results as JSON (for --compare)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two JSON result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        print_comparison(*args.compare)
+        return
+
+    fx = prepare_fixtures(args.pending_orders)
+    fx['webhook_secret'] = args.webhook_secret
+    scenarios = args.scenario or list(SCENARIOS)
+    results = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'server': args.url or args.config,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'stripe_latency_ms': args.stripe_latency,
+            'dataset': fx['dataset'],
+        },
+        'scenarios': {},
+    }
+
+    def run_all(host, port):
+        for name in scenarios:
+            results['scenarios'][name] = run_scenario(name, host, port, fx, args.concurrency,
+                                                      args.duration, args.warmup, args.seed)
+
+    if args.url:
+        target = urlparse(args.url)
+        run_all(target.hostname, target.port or 80)
+    else:
+        stub = start_stripe_stub(args.stripe_latency)
+        extra_env = {
+            'PERF_SERVER_TIMING': 'all',
+            'STRIPE_WEBHOOK_SECRET': args.webhook_secret,
+            'STRIPE_API_KEY': 'sk_test_benchmark',
+            'STRIPE_API_BASE': f'http://127.0.0.1:{stub.server_port}',
+        }
+        try:
+            with gunicorn_server(args.config, args.port, extra_env):
+                run_all('127.0.0.1', args.port)
+        except RuntimeError as e:
+            raise SystemExit(str(e))
+        finally:
+            stub.shutdown()
+
+    print_report(results)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Compare gunicorn configurations under the same load.
+
+Starts gunicorn (with gunicorn.conf.py) once per configuration, drives it
+with concurrent keep-alive HTTP clients and prints throughput and latency
+percentiles side by side.
+
+    python scripts/loadtest.py                                  # sync vs gthread vs uvicorn
+    python scripts/loadtest.py --config sync --config gthread:threads=8
+    python scripts/loadtest.py --config gthread:workers=4,threads=2 --path / --path /products/?q=table
+    python scripts/loadtest.py --url http://127.0.0.1:8000      # load an already running server
+
+A configuration is ``<worker class>[:workers=N,threads=N,preload=0|1]``.
+Load some data first (e.g. ``python scripts/seed_sample_data.py``) so the pages
+have realistic content.
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PATHS = ['/', '/products/', '/products/?q=wood', '/pages/about/', '/core/api/exchange-rates/']
+DEFAULT_CONFIGS = ['sync', 'gthread', 'uvicorn']
+
+
+def parse_config(spec):
+    kind, _, options = spec.partition(':')
+    env = {'GUNICORN_WORKER_CLASS': kind}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        env_name = {
+            'workers': 'WEB_CONCURRENCY',
+            'threads': 'GUNICORN_THREADS',
+            'preload': 'GUNICORN_PRELOAD',
+        }.get(key)
+        if env_name is None:
+            raise SystemExit(f'Unknown option {key!r} in {spec!r}')
+        env[env_name] = value
+    return env
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def wait_until_up(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.25)
+    return False
+
+
+def run_load(host, port, paths, concurrency, duration, warmup):
+    """Hammer ``paths`` round-robin from ``concurrency`` keep-alive clients."""
+    latencies, errors, statuses = [], [0], {}
+    lock = threading.Lock()
+    start_at = time.monotonic() + warmup
+    stop_at = start_at + duration
+
+    def client(offset):
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        i = offset
+        local, local_errors, local_statuses = [], 0, {}
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            path = paths[i % len(paths)]
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                conn.request('GET', path, headers={'Connection': 'keep-alive'})
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                status = None
+            elapsed = time.perf_counter() - t0
+            if now < start_at:
+                continue  # warm-up request
+            if status is None or status >= 500:
+                local_errors += 1
+            else:
+                local.append(elapsed)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / duration, 1),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'statuses': {str(k): v for k, v in sorted(statuses.items(), key=lambda kv: str(kv[0]))},
+    }
+
+
+@contextmanager
+def gunicorn_server(spec, port, extra_env=None):
+    """Run gunicorn (gunicorn.conf.py) with configuration ``spec`` until the block exits.
+
+    Raises:
+        RuntimeError: If the server does not come up; carries the tail of its log
+    """
+    env = dict(os.environ, PORT=str(port), GUNICORN_ACCESS_LOG='/dev/null', **parse_config(spec), **(extra_env or {}))
+    # Worker recycling mid-run would show up as dropped connections
+    env.setdefault('GUNICORN_MAX_REQUESTS', '0')
+    # Server logs go to a file: an unread pipe fills up and stalls the workers
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+            cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=log,
+        )
+        try:
+            if not wait_until_up('127.0.0.1', port):
+                proc.terminate()
+                proc.wait(timeout=15)
+                log.seek(0)
+                raise RuntimeError(f"server did not start:\n{log.read().decode(errors='replace')[-2000:]}")
+            yield proc
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def run_config(spec, args, port):
+    try:
+        with gunicorn_server(spec, port):
+            result = run_load('127.0.0.1', port, args.path, args.concurrency, args.duration, args.warmup)
+    except RuntimeError as e:
+        return {'config': spec, 'error': str(e)}
+    return {'config': spec, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', action='append', help='Configuration to test (repeatable)')
+    parser.add_argument('--path', action='append', help='URL path to request (repeatable)')
+    parser.add_argument('--url', help='Load an already running server instead of starting gunicorn')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=15.0, help='Measured seconds per configuration')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Unmeasured seconds before measuring')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the servers started by this script')
+    parser.add_argument('--json', metavar='FILE', help='Also write the results as JSON')
+    args = parser.parse_args()
+    args.path = args.path or DEFAULT_PATHS
+
+    if args.url:
+        target = urlparse(args.url)
+        results = [{'config': args.url, **run_load(target.hostname, target.port or 80, args.path,
+                                                   args.concurrency, args.duration, args.warmup)}]
+    else:
+        results = [run_config(spec, args, args.port) for spec in (args.config or DEFAULT_CONFIGS)]
+
+    header = f"{'config':<32}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        if 'error' in r:
+            print(f"{r['config']:<32}  {r['error']}")
+            continue
+        print(f"{r['config']:<32}{r['rps']:>9}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'concurrency': args.concurrency, 'duration': args.duration,
+                       'paths': args.path, 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+/*
+ * Delivery tracking panels for the My Orders page.
+ *
+ * The page only renders an empty placeholder per order carrying the URL of
+ * its tracking JSON. A panel is filled the first time it is expanded with its
+ * "Track Order" button, or, for orders in transit, when it scrolls into view.
+ * Leaflet is fetched once, on the first map, and every map on the page is
+ * built by initTrackingMap.
+ */
+(function () {
+  'use strict';
+
+  const LEAFLET_JS = 'https://unpkg.com/leaflet@1.9.4/dist/leaflet.js';
+  const LEAFLET_CSS = 'https://unpkg.com/leaflet@1.9.4/dist/leaflet.css';
+  const KIGALI = [-1.9441, 30.0619];
+  const STEPS = [
+    ['pending', 'Awaiting pickup'],
+    ['picked_up', 'Picked up'],
+    ['in_transit', 'In transit'],
+    ['out_for_delivery', 'Out for delivery'],
+    ['delivered', 'Delivered'],
+  ];
+
+  let leaflet = null;
+
+  function loadLeaflet() {
+    if (!leaflet) {
+      leaflet = new Promise(function (resolve, reject) {
+        const css = document.createElement('link');
+        css.rel = 'stylesheet';
+        css.href = LEAFLET_CSS;
+        document.head.appendChild(css);
+
+        const script = document.createElement('script');
+        script.src = LEAFLET_JS;
+        script.onload = function () { resolve(window.L); };
+        script.onerror = function () { leaflet = null; reject(new Error('Leaflet failed to load')); };
+        document.head.appendChild(script);
+      });
+    }
+    return leaflet;
+  }
+
+  // Text is always set through textContent: driver names and notes are user input.
+  function el(tag, className, text) {
+    const node = document.createElement(tag);
+    if (className) node.className = className;
+    if (text !== undefined && text !== null) node.textContent = text;
+    return node;
+  }
+
+  function icon(name) {
+    return el('i', 'fas fa-' + name + ' me-2');
+  }
+
+  function formatTime(iso) {
+    if (!iso) return '';
+    return new Date(iso).toLocaleString(undefined, {
+      month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit',
+    });
+  }
+
+  function point(lat, lng) {
+    return lat === null || lng === null ? null : [lat, lng];
+  }
+
+  function initTrackingMap(container, data) {
+    return loadLeaflet().then(function (L) {
+      const current = point(data.current_latitude, data.current_longitude);
+      const destination = point(data.destination_latitude, data.destination_longitude);
+      const route = (data.history || []).map(function (p) { return [p.lat, p.lng]; });
+
+      const map = L.map(container).setView(current || destination || KIGALI, 13);
+      L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
+        attribution: '&copy; OpenStreetMap contributors',
+        maxZoom: 19,
+      }).addTo(map);
+
+      const bounds = route.slice();
+      if (route.length > 1) {
+        L.polyline(route, { color: '#007bff', weight: 3, opacity: 0.7 }).addTo(map);
+      }
+      if (current) {
+        L.marker(current, {
+          icon: L.divIcon({ html: '<i class="fas fa-truck"></i>', className: 'tracking-marker', iconSize: [24, 24] }),
+        }).addTo(map).bindPopup('Delivery driver');
+        bounds.push(current);
+      }
+      if (destination) {
+        L.marker(destination, {
+          icon: L.divIcon({ html: '<i class="fas fa-home"></i>', className: 'tracking-marker', iconSize: [24, 24] }),
+        }).addTo(map).bindPopup('Delivery address');
+        bounds.push(destination);
+      }
+      if (bounds.length > 1) map.fitBounds(bounds, { padding: [20, 20] });
+      return map;
+    });
+  }
+
+  function renderTimeline(data) {
+    const timeline = el('div', 'progress-timeline');
+    const reached = STEPS.findIndex(function (step) { return step[0] === data.status; });
+    STEPS.forEach(function (step, index) {
+      let state = '';
+      if (index < reached || data.status === 'delivered') state = ' completed';
+      else if (index === reached) state = ' pending';
+
+      const item = el('div', 'timeline-item' + state);
+      const marker = el('div', 'timeline-marker');
+      if (state === ' completed') marker.appendChild(el('i', 'fas fa-check'));
+      item.appendChild(marker);
+
+      const content = el('div', 'timeline-content');
+      content.appendChild(el('h6', null, step[1]));
+      if (step[0] === 'picked_up') content.appendChild(el('small', 'text-muted', formatTime(data.picked_up_at)));
+      if (step[0] === 'delivered') {
+        content.appendChild(el('small', 'text-muted', formatTime(data.delivered_at || data.estimated_delivery)));
+      }
+      item.appendChild(content);
+      timeline.appendChild(item);
+    });
+    if (data.status === 'failed') {
+      timeline.appendChild(el('div', 'alert alert-danger py-2 mb-0', 'Delivery attempt failed'));
+    }
+    return timeline;
+  }
+
+  function renderDriver(data) {
+    const box = el('div', 'small');
+    if (!data.driver_name) {
+      box.appendChild(el('p', 'text-muted mb-0', 'A driver has not been assigned yet.'));
+      return box;
+    }
+    box.appendChild(el('div', 'fw-bold', data.driver_name));
+    if (data.vehicle_number) box.appendChild(el('div', 'text-muted', data.vehicle_number));
+    if (data.driver_phone) {
+      const call = el('a', 'btn btn-outline-success btn-sm mt-2', 'Call driver');
+      call.href = 'tel:' + data.driver_phone;
+      box.appendChild(call);
+    }
+    if (data.estimated_delivery && data.status !== 'delivered') {
+      box.appendChild(el('div', 'mt-2', 'Estimated delivery: ' + formatTime(data.estimated_delivery)));
+    }
+    return box;
+  }
+
+  function renderHistory(data) {
+    const log = el('div', 'delivery-log');
+    const entries = (data.history || []).slice().reverse();
+    if (!entries.length) {
+      log.appendChild(el('p', 'text-muted small mb-0', 'No location updates yet.'));
+    }
+    entries.forEach(function (entry) {
+      const row = el('div', 'log-entry');
+      row.appendChild(el('div', 'log-time', formatTime(entry.at)));
+      const content = el('div', 'log-content');
+      content.appendChild(el('strong', null, entry.status.replace(/_/g, ' ')));
+      if (entry.note) {
+        content.appendChild(document.createElement('br'));
+        content.appendChild(el('small', 'text-muted', entry.note));
+      }
+      row.appendChild(content);
+      log.appendChild(row);
+    });
+    return log;
+  }
+
+  function renderPanel(panel, data) {
+    const card = el('div', 'card bg-light border-0');
+    const header = el('div', 'card-header bg-primary text-white');
+    const title = el('h6', 'mb-0');
+    title.appendChild(icon('truck'));
+    title.appendChild(document.createTextNode(data.tracking_number + ' – ' + data.status_display));
+    header.appendChild(title);
+    card.appendChild(header);
+
+    const body = el('div', 'card-body');
+    const row = el('div', 'row g-4');
+    const left = el('div', 'col-md-5');
+    left.appendChild(el('h6', 'fw-bold mb-3', 'Delivery Progress'));
+    left.appendChild(renderTimeline(data));
+    left.appendChild(el('h6', 'fw-bold mt-4 mb-2', 'Driver'));
+    left.appendChild(renderDriver(data));
+    const right = el('div', 'col-md-7');
+    const mapBox = el('div', 'delivery-map');
+    right.appendChild(mapBox);
+    right.appendChild(el('h6', 'fw-bold mt-4 mb-2', 'Delivery History'));
+    right.appendChild(renderHistory(data));
+    row.appendChild(left);
+    row.appendChild(right);
+    body.appendChild(row);
+    card.appendChild(body);
+
+    panel.replaceChildren(card);
+    initTrackingMap(mapBox, data).catch(function () {
+      mapBox.textContent = 'Map unavailable';
+    });
+  }
+
+  function loadPanel(panel) {
+    if (panel.dataset.state) return;
+    panel.dataset.state = 'loading';
+    panel.replaceChildren(el('div', 'text-muted small py-3', 'Loading tracking…'));
+
+    fetch(panel.dataset.trackingUrl, { credentials: 'same-origin', headers: { Accept: 'application/json' } })
+      .then(function (response) {
+        return response.json().then(function (data) { return { ok: response.ok, data: data }; });
+      })
+      .then(function (result) {
+        if (!result.ok) {
+          panel.dataset.state = 'error';
+          panel.replaceChildren(el('div', 'alert alert-secondary mb-0', result.data.error || 'Tracking unavailable'));
+          return;
+        }
+        panel.dataset.state = 'loaded';
+        renderPanel(panel, result.data);
+      })
+      .catch(function () {
+        delete panel.dataset.state;
+        panel.replaceChildren(el('div', 'alert alert-warning mb-0', 'Could not load tracking. Try again.'));
+      });
+  }
+
+  document.addEventListener('click', function (event) {
+    const button = event.target.closest('[data-tracking-panel]');
+    if (!button) return;
+    const panel = document.getElementById(button.dataset.trackingPanel);
+    panel.hidden = !panel.hidden;
+    button.setAttribute('aria-expanded', String(!panel.hidden));
+    if (!panel.hidden) loadPanel(panel);
+  });
+
+  // Panels rendered open (orders on the road) load once they come near the viewport.
+  document.addEventListener('DOMContentLoaded', function () {
+    const open = document.querySelectorAll('.tracking-panel:not([hidden])');
+    if (!('IntersectionObserver' in window)) {
+      open.forEach(loadPanel);
+      return;
+    }
+    const observer = new IntersectionObserver(function (entries) {
+      entries.forEach(function (entry) {
+        if (!entry.isIntersecting) return;
+        observer.unobserve(entry.target);
+        loadPanel(entry.target);
+      });
+    }, { rootMargin: '200px' });
+    open.forEach(function (panel) { observer.observe(panel); });
+  });
+
+  window.initTrackingMap = initTrackingMap;
+})();